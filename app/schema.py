@@ -0,0 +1,157 @@
+"""
+OpenAPI schema precomputed at build time.
+
+Generating the schema walks every viewset and serializer, which costs
+hundreds of milliseconds per request. `manage.py build_schema` renders it
+once into ``settings.OPENAPI_SCHEMA_DIR`` as YAML and JSON, each with a
+gzipped copy, and `SchemaView` serves those files with strong ETags. When
+the files are missing (e.g. in development) the schema is generated on
+the first request and kept in memory until the process exits.
+"""
+import gzip
+import hashlib
+import logging
+import pathlib
+import re
+import threading
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from drf_spectacular.renderers import (
+    OpenApiJsonRenderer, OpenApiJsonRenderer2, OpenApiYamlRenderer, OpenApiYamlRenderer2,
+)
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.utils import extend_schema
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+# renderer format -> file name
+FILES = {
+    "yaml": "openapi.yaml",
+    "json": "openapi.json",
+}
+ACCEPTS_GZIP = re.compile(r"\bgzip\b")
+
+
+def schema_dir() -> pathlib.Path:
+    return pathlib.Path(settings.OPENAPI_SCHEMA_DIR)
+
+
+def generate() -> dict[str, bytes]:
+    """The schema rendered in every format of `FILES`"""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(request=None, public=True)
+    return {
+        "yaml": OpenApiYamlRenderer().render(schema, renderer_context={}),
+        "json": OpenApiJsonRenderer().render(schema, renderer_context={}),
+    }
+
+
+def write(rendered: dict[str, bytes], directory: pathlib.Path):
+    directory.mkdir(parents=True, exist_ok=True)
+    for file_format, name in FILES.items():
+        (directory / name).write_bytes(rendered[file_format])
+        # mtime=0 keeps the compressed bytes, and their ETag, reproducible
+        (directory / f"{name}.gz").write_bytes(gzip.compress(rendered[file_format], mtime=0))
+
+
+def stale_formats(rendered: dict[str, bytes], directory: pathlib.Path) -> list[str]:
+    """Formats whose stored file is missing or differs from `rendered`"""
+    stale = []
+    for file_format, name in FILES.items():
+        path = directory / name
+        if not path.exists() or path.read_bytes() != rendered[file_format]:
+            stale.append(file_format)
+    return stale
+
+
+@dataclass(frozen=True)
+class Representation:
+    content: bytes
+    etag: str
+
+
+class SchemaFiles:
+    """The stored (or generated) schema with its gzipped copy, loaded once"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._representations = None
+
+    def get(self, file_format: str, gzipped: bool) -> Representation:
+        with self._lock:
+            if self._representations is None:
+                self._representations = self._load()
+        return self._representations[file_format, gzipped]
+
+    def clear(self):
+        with self._lock:
+            self._representations = None
+
+    @staticmethod
+    def _load() -> dict:
+        directory = schema_dir()
+        if all((directory / name).exists() for name in FILES.values()):
+            rendered = {file_format: (directory / name).read_bytes() for file_format, name in FILES.items()}
+        else:
+            logger.warning("No schema in %s, generating it, run `manage.py build_schema`", directory)
+            rendered = generate()
+
+        representations = {}
+        for file_format, name in FILES.items():
+            compressed = directory / f"{name}.gz"
+            content = rendered[file_format]
+            digest = hashlib.sha256(content).hexdigest()[:32]
+            representations[file_format, False] = Representation(content, f'"{digest}"')
+            representations[file_format, True] = Representation(
+                compressed.read_bytes() if compressed.exists() else gzip.compress(content, mtime=0),
+                # a strong ETag differs between encodings of the same content
+                f'"{digest}-gzip"'
+            )
+        return representations
+
+
+schema_files = SchemaFiles()
+
+
+@receiver(setting_changed)
+def _reload_schema(setting, **kwargs):
+    if setting == "OPENAPI_SCHEMA_DIR":
+        schema_files.clear()
+
+
+class SchemaView(APIView):
+    """
+    OpenAPI schema of this API, format can be selected via content negotiation.
+
+    - YAML: application/vnd.oai.openapi
+    - JSON: application/vnd.oai.openapi+json
+    """
+    renderer_classes = [
+        OpenApiYamlRenderer, OpenApiYamlRenderer2, OpenApiJsonRenderer, OpenApiJsonRenderer2
+    ]
+    permission_classes = spectacular_settings.SERVE_PERMISSIONS
+
+    @extend_schema(exclude=True)
+    def get(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        gzipped = bool(ACCEPTS_GZIP.search(request.META.get("HTTP_ACCEPT_ENCODING", "")))
+        representation = schema_files.get(renderer.format, gzipped)
+
+        response = get_conditional_response(request, etag=representation.etag)
+        if response is None:
+            content_type = request.accepted_media_type
+            if renderer.charset:
+                content_type = f"{content_type}; charset={renderer.charset}"
+            response = HttpResponse(representation.content, content_type=content_type)
+            if gzipped:
+                response["Content-Encoding"] = "gzip"
+        response["ETag"] = representation.etag
+        patch_vary_headers(response, ("Accept", "Accept-Encoding"))
+        patch_cache_control(response, public=True, max_age=settings.OPENAPI_SCHEMA_MAX_AGE)
+        return response
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 from datetime import timedelta
 from pathlib import Path
+import os
 
 # Build paths inside the project like this: BASE_DIR / "subdir".
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -49,12 +50,14 @@ AUTH_USER_MODEL = "user.User"
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "station.middleware.ReplicaRoutingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "station.middleware.RequestMetricsMiddleware",
 ]
 
 ROOT_URLCONF = "app.urls"
@@ -77,15 +80,96 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "app.wsgi.application"
 
+# runs the tests with in-memory stand-ins for the response cache and the throttle store
+TEST_RUNNER = "app.test_runner.TestRunner"
+
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# SQLITE_PRODUCTION=1 tunes SQLite for concurrent workers: WAL, persistent
+# connections, write transactions that wait for the lock, and bookings
+# written through the single-writer queue of station.booking
+SQLITE_PRODUCTION = os.environ.get("SQLITE_PRODUCTION") == "1"
+
+SQLITE_PRODUCTION_OPTIONS = {
+    # seconds a connection waits for the write lock
+    "timeout": 20,
+    "transaction_mode": "IMMEDIATE",
+    "pragmas": {
+        "journal_mode": "wal",
+        "synchronous": "normal",
+        "cache_size": -64000,
+        "temp_store": "memory",
+        "mmap_size": 256 * 1024 * 1024,
+    },
+}
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
+        "ENGINE": "app.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": SQLITE_PRODUCTION_OPTIONS if SQLITE_PRODUCTION else {},
+        "CONN_MAX_AGE": 600 if SQLITE_PRODUCTION else 0,
+        "CONN_HEALTH_CHECKS": SQLITE_PRODUCTION,
+    }
+}
+
+# Read replicas, e.g. DATABASE_REPLICA_PATHS=/srv/replica1.sqlite3,/srv/replica2.sqlite3
+# kept up to date with `manage.py sync_replicas`
+DATABASE_REPLICAS = []
+for number, path in enumerate(filter(None, os.environ.get("DATABASE_REPLICA_PATHS", "").split(","))):
+    DATABASE_REPLICAS.append(f"replica{number + 1}")
+    DATABASES[DATABASE_REPLICAS[-1]] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": path.strip(),
+        "TEST": {"MIRROR": "default"},
     }
+
+DATABASE_ROUTERS = ["station.replicas.PrimaryReplicaRouter"]
+
+# seconds the reads of a user stay on the primary after they changed something
+REPLICA_STICKY_SECONDS = 10
+# cache keeping those marks, shared by every worker (see station.checks)
+REPLICA_STICKY_CACHE = "replicas"
+
+BOOKING_QUEUE = {
+    "ENABLED": SQLITE_PRODUCTION,
+    # bookings waiting for the writer before new ones are refused
+    "MAX_PENDING": 200,
+    # seconds a booking may wait for the writer
+    "MAX_WAIT": 5.0,
+    # bookings committed in one transaction
+    "BATCH_SIZE": 50,
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Read endpoint responses (station.caching). Their versions are kept in
+    # the database, so a worker never serves a stale entry, but local memory
+    # is per worker; use django.core.cache.backends.filebased.FileBasedCache with
+    # "LOCATION": BASE_DIR / "cache" to share entries between workers.
+    "responses": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "responses",
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+    # Users recently writing to the primary (station.replicas), seen by every
+    # worker on this host; replicas spread over hosts need e.g. Redis here
+    "replicas": (
+        {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": BASE_DIR / "cache" / "replicas",
+        } if DATABASE_REPLICAS
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "replicas"}
+    ),
 }
 
 
@@ -129,6 +213,9 @@ MEDIA_ROOT = BASE_DIR / "media"
 
 MEDIA_URL = "/media/"
 
+# Processes rendering resized bus images (station.images)
+IMAGE_VARIANT_WORKERS = 2
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -140,19 +227,32 @@ REST_FRAMEWORK = {
         "station.permissions.IsAdminAllOrAuthenticatedReadOnly"
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication"
+        "user.authentication.CachedJWTAuthentication"
     ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle"
+        "station.throttling.AnonRateThrottle",
+        "station.throttling.UserRateThrottle"
     ],
     "DEFAULT_THROTTLE_RATES": {
         "anon": "100/day",
-        "user": "1000/day"
+        "user": "1000/day",
+        "order_create": "30/hour",
+        "autocomplete": "120/minute"
     }
 }
 
+# Token buckets of the throttles, one SQLite file shared by the workers of a host
+THROTTLE_STORE = {
+    "ENABLED": True,
+    "PATH": str(BASE_DIR / "throttle.sqlite3"),
+}
+
+# written by `manage.py build_schema`, served by app.schema.SchemaView
+OPENAPI_SCHEMA_DIR = BASE_DIR / "schema"
+# seconds clients may use the schema before revalidating its ETag
+OPENAPI_SCHEMA_MAX_AGE = 300
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Buss Station API",
     "DESCRIPTION": "Order tickets for your bus",
@@ -166,6 +266,65 @@ SPECTACULAR_SETTINGS = {
     }
 }
 
+# How long seats reserved through the seat-hold API stay blocked for others
+SEAT_HOLD_MINUTES = 10
+
+ROUTE_PLANNER = {
+    # trips departing further ahead are not loaded into the connection index
+    "HORIZON_DAYS": 30,
+    # how far after the requested departure a journey may leave its last leg
+    "SEARCH_WINDOW_HOURS": 24,
+    # seconds before a worker rebuilds its index to pick up other workers' changes
+    "REFRESH_INTERVAL": 300,
+    "MAX_TRANSFERS": 3,
+}
+
+# `manage.py archive_trips` moves trips departed more than AFTER_DAYS days ago
+# out of the hot tables, BATCH_SIZE trips per transaction
+TRIP_ARCHIVE = {
+    "AFTER_DAYS": 90,
+    "BATCH_SIZE": 500,
+}
+
+STATION_AUTOCOMPLETE = {
+    # seconds before a worker rebuilds its index to pick up other workers' changes
+    "REFRESH_INTERVAL": 300,
+    "MAX_RESULTS": 20,
+    # trigram (Jaccard) similarity a name needs to be suggested for a misspelt query
+    "MIN_SIMILARITY": 0.3,
+    # answers kept per worker until the next change of stations or trips
+    "CACHE_SIZE": 10000,
+}
+
+# Per-view latency and SQL statistics, served at /api/v1/stations/metrics/
+REQUEST_METRICS = {
+    "ENABLED": os.environ.get("REQUEST_METRICS_ENABLED") == "1",
+    # fraction of requests measured while enabled
+    "SAMPLE_RATE": float(os.environ.get("REQUEST_METRICS_SAMPLE_RATE", "0.1")),
+    "LOG": True,
+    "MAX_DUPLICATES": 20,
+}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        # one JSON line per sampled request
+        "station.metrics": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
+}
+
+# Users resolved from JWTs are cached per process, see user.authentication
+AUTH_USER_CACHE = {
+    "MAX_SIZE": 10000,
+    # seconds, how long another process may still authenticate a user
+    # after it was deactivated, demoted or changed its password
+    "TIMEOUT": 5,
+}
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=15),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=3),
@@ -0,0 +1,44 @@
+"""
+SQLite backend for running the project on SQLite in production.
+
+On top of the stock backend it reads two extra OPTIONS:
+
+- "pragmas": ``{"journal_mode": "wal", ...}`` run on every new connection.
+- "transaction_mode": "IMMEDIATE" makes `atomic` take the write lock when
+  the transaction begins. In the default deferred mode a transaction that
+  has read something cannot wait for the lock held by another connection
+  and fails at once with "database is locked", whatever the timeout.
+  Django 5.1 supports the option natively.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ("DEFERRED", "EXCLUSIVE", "IMMEDIATE")
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        transaction_mode = kwargs.pop("transaction_mode", None)
+        if transaction_mode is not None and transaction_mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f"settings.DATABASES[{self.alias!r}]['OPTIONS']['transaction_mode'] "
+                f"must be one of {', '.join(TRANSACTION_MODES)}"
+            )
+        for name in kwargs.pop("pragmas", {}):
+            if not name.isidentifier():
+                raise ImproperlyConfigured(f"Invalid SQLite pragma {name!r}")
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.settings_dict["OPTIONS"].get("pragmas", {}).items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        transaction_mode = self.settings_dict["OPTIONS"].get("transaction_mode")
+        if transaction_mode is None:
+            super()._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute(f"BEGIN {transaction_mode.upper()}")
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Keep test runs from sharing state with each other or with a running
+    server: responses are not cached unless a test enables the cache, and
+    token buckets live in memory instead of the throttle store file
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._overrides = override_settings(
+            CACHES={
+                **settings.CACHES,
+                "responses": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+            },
+            THROTTLE_STORE={**settings.THROTTLE_STORE, "PATH": ":memory:"},
+        )
+        self._overrides.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._overrides.disable()
+        super().teardown_test_environment(**kwargs)
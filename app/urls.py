@@ -18,13 +18,16 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
+from drf_spectacular.views import SpectacularSwaggerView, SpectacularRedocView
+
+from app.schema import SchemaView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("api/v1/stations/", include("station.urls", namespace="station")),
+    path("api/v1/async/stations/", include("station.async_urls", namespace="station-async")),
     path("api/v1/user/", include("user.urls", namespace="user")),
-    path('api/v1/schema/', SpectacularAPIView.as_view(), name='schema'),
+    path('api/v1/schema/', SchemaView.as_view(), name='schema'),
     path('api/v1/doc/swagger-ui/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('api/v1/doc/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc')
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
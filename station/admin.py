@@ -1,5 +1,5 @@
 from django.contrib import admin
-from station.models import Buss, Ticket, Trip, Facility, Order
+from station.models import Buss, Ticket, Trip, Facility, Order, Station, ArchivedTrip, ArchivedTicket
 
 
 class TicketInline(admin.TabularInline):
@@ -15,8 +15,14 @@ admin.site.register(Buss)
 
 admin.site.register(Ticket)
 
+admin.site.register(Station)
+
 admin.site.register(Trip)
 
 admin.site.register(Facility)
 
 admin.site.register(Order, OrderAdmin)
+
+admin.site.register(ArchivedTrip)
+
+admin.site.register(ArchivedTicket)
@@ -0,0 +1,89 @@
+"""
+Archive of departed trips.
+
+`Trip` and `Ticket` otherwise keep every trip ever sold, and each list
+query, seat map lookup and the `unique_ticket_seat_trip` index pay for
+them. `archive_trips` (run by ``manage.py archive_trips``, e.g. nightly)
+moves trips that departed before a cutoff, with their tickets, into
+`ArchivedTrip` and `ArchivedTicket`, so the hot tables only hold the
+trips of the last TRIP_ARCHIVE["AFTER_DAYS"] days and the timetable ahead.
+
+Every batch is copied and deleted in one transaction, an interrupted run
+keeps the batches moved so far. Archived rows keep their ids, and orders
+list their archived tickets after the others (see `OrderSerializer`).
+"""
+import datetime
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from station import caching
+from station.models import ArchivedTicket, ArchivedTrip, Ticket, Trip
+
+
+def _setting(name: str):
+    defaults = {
+        "AFTER_DAYS": 90,
+        "BATCH_SIZE": 500,
+    }
+    return getattr(settings, "TRIP_ARCHIVE", {}).get(name, defaults[name])
+
+
+def default_cutoff() -> datetime.datetime:
+    return timezone.now() - datetime.timedelta(days=_setting("AFTER_DAYS"))
+
+
+@dataclass
+class ArchiveResult:
+    trips: int = 0
+    tickets: int = 0
+    batches: int = 0
+
+
+def archive_trips(before: datetime.datetime = None, batch_size: int = None, dry_run: bool = False) -> ArchiveResult:
+    """Move trips departed before `before` and their tickets into the archive tables"""
+    before = before or default_cutoff()
+    batch_size = batch_size or _setting("BATCH_SIZE")
+    departed = Trip.objects.filter(departure__lt=before).order_by("id")
+    result = ArchiveResult()
+
+    if dry_run:
+        result.trips = departed.count()
+        result.tickets = Ticket.objects.filter(trip__in=departed).count()
+        return result
+
+    while trip_ids := list(departed.values_list("id", flat=True)[:batch_size]):
+        with transaction.atomic():
+            result.tickets += _archive(trip_ids)
+        result.trips += len(trip_ids)
+        result.batches += 1
+    return result
+
+
+def _archive(trip_ids: list[int]) -> int:
+    trips = Trip.objects.filter(id__in=trip_ids).values_list(
+        "id", "source_id", "destination_id", "departure", "arrival",
+        "bus__info", "bus__num_seats", "seats_sold"
+    )
+    ArchivedTrip.objects.bulk_create(
+        ArchivedTrip(
+            id=trip_id, source_id=source_id, destination_id=destination_id,
+            departure=departure, arrival=arrival,
+            bus_info=bus_info, bus_num_seats=bus_num_seats, seats_sold=seats_sold
+        )
+        for trip_id, source_id, destination_id, departure, arrival, bus_info, bus_num_seats, seats_sold in trips
+    )
+    tickets = ArchivedTicket.objects.bulk_create(
+        ArchivedTicket(id=ticket_id, seat=seat, trip_id=trip_id, order_id=order_id)
+        for ticket_id, seat, trip_id, order_id in (
+            Ticket.objects.filter(trip_id__in=trip_ids).values_list("id", "seat", "trip_id", "order_id")
+        )
+    )
+    # cascades to tickets and holds, the receivers of `station.signals`
+    # drop the trips from the route index and invalidate cached responses,
+    # once per model rather than once per deleted row
+    with caching.deferred_bumps():
+        Trip.objects.filter(id__in=trip_ids).delete()
+    return len(tickets)
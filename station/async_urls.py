@@ -0,0 +1,13 @@
+from django.urls import path
+
+from station import async_views
+
+app_name = "station-async"
+
+urlpatterns = [
+    path("trips/", async_views.trip_list, name="trip-list"),
+    path("trips/<int:pk>/", async_views.trip_detail, name="trip-detail"),
+    path("buses/", async_views.bus_list, name="buss-list"),
+    path("buses/<int:pk>/", async_views.bus_detail, name="buss-detail"),
+    path("orders/", async_views.order_list, name="order-list"),
+]
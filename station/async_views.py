@@ -0,0 +1,222 @@
+"""
+Async versions of the busiest read endpoints.
+
+Under ASGI the DRF viewsets in `station.views` run in a thread pool.
+These views authenticate and query with the async ORM instead, and check
+the throttles' SQLite token buckets in a worker thread, so one worker can
+keep many slow clients in flight. They accept the same
+query params and return the same JSON as their viewset counterparts,
+except the trip list, which pages with a simpler forward-only cursor.
+"""
+import base64
+import functools
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import (
+    APIException,
+    NotAuthenticated,
+    NotFound,
+    Throttled,
+)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from station.models import Buss, Trip, Order
+from station.serializers import (
+    BussListSerializer,
+    BussRetrieveSerializer,
+    OrderListSerializer,
+    TripListSerializer,
+    TripRetrieveSerializer,
+)
+from station.views import (
+    OrderSetPagination,
+    TripSetPagination,
+    filter_buses,
+    filter_trips,
+)
+from user.authentication import AsyncJWTAuthentication
+
+_authentication = AsyncJWTAuthentication()
+_renderer = JSONRenderer()
+
+
+def _json_response(data, status_code=status.HTTP_200_OK) -> HttpResponse:
+    return HttpResponse(
+        _renderer.render(data),
+        status=status_code,
+        content_type="application/json"
+    )
+
+
+def _error_response(exc: APIException) -> HttpResponse:
+    if isinstance(exc.detail, (list, dict)):
+        data = exc.detail
+    else:
+        data = {"detail": exc.detail}
+    response = _json_response(data, exc.status_code)
+    if isinstance(exc, NotAuthenticated) or exc.status_code == status.HTTP_401_UNAUTHORIZED:
+        response["WWW-Authenticate"] = _authentication.authenticate_header(None)
+    if isinstance(exc, Throttled) and exc.wait is not None:
+        response["Retry-After"] = str(int(exc.wait))
+    return response
+
+
+def async_api_view(view):
+    """Authenticate, check read permission and throttle like the DRF viewsets"""
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != "GET":
+            return _json_response(
+                {"detail": f'Method "{request.method}" not allowed.'},
+                status.HTTP_405_METHOD_NOT_ALLOWED
+            )
+        try:
+            authenticated = await _authentication.aauthenticate(request)
+            if authenticated is None:
+                raise NotAuthenticated()
+            request.user = authenticated[0]
+
+            drf_request = Request(request)
+            drf_request.user = request.user
+            for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES:
+                throttle = throttle_class()
+                # the bucket store may wait for its SQLite write lock
+                allow_request = sync_to_async(throttle.allow_request, thread_sensitive=False)
+                if not await allow_request(drf_request, None):
+                    raise Throttled(throttle.wait())
+
+            return await view(request, *args, **kwargs)
+        except APIException as exc:
+            return _error_response(exc)
+
+    return wrapper
+
+
+def _encode_cursor(trip) -> str:
+    raw = f"{trip.departure.isoformat()}|{trip.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str):
+    try:
+        departure, trip_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        departure = parse_datetime(departure)
+        trip_id = int(trip_id)
+    except ValueError:
+        raise NotFound("Invalid cursor")
+    if departure is None:
+        raise NotFound("Invalid cursor")
+    return departure, trip_id
+
+
+def _page_size(request, pagination_class) -> int:
+    try:
+        page_size = int(request.GET[pagination_class.page_size_query_param])
+    except (KeyError, ValueError):
+        return pagination_class.page_size
+    if page_size <= 0:
+        return pagination_class.page_size
+    return min(page_size, pagination_class.max_page_size)
+
+
+@async_api_view
+async def trip_list(request):
+    queryset = filter_trips(Trip.objects.select_related("bus", "source", "destination"), request.GET)
+    cursor = request.GET.get("cursor")
+    if cursor:
+        departure, trip_id = _decode_cursor(cursor)
+        queryset = queryset.filter(departure__gte=departure).exclude(
+            departure=departure, id__lte=trip_id
+        )
+
+    page_size = _page_size(request, TripSetPagination)
+    trips = [
+        trip async for trip in queryset.order_by("departure", "id")[:page_size + 1]
+    ]
+    next_url = None
+    if len(trips) > page_size:
+        trips = trips[:page_size]
+        next_url = replace_query_param(
+            request.build_absolute_uri(), "cursor", _encode_cursor(trips[-1])
+        )
+
+    return _json_response({
+        "next": next_url,
+        "previous": None,
+        "results": TripListSerializer(trips, many=True).data
+    })
+
+
+@async_api_view
+async def trip_detail(request, pk):
+    try:
+        trip = await (
+            Trip.objects
+            .select_related("bus", "source", "destination")
+            .prefetch_related("bus__facilities")
+            .aget(pk=pk)
+        )
+    except (Trip.DoesNotExist, ValueError):
+        raise NotFound("No Trip matches the given query.")
+    return _json_response(TripRetrieveSerializer(trip).data)
+
+
+@async_api_view
+async def bus_list(request):
+    queryset = filter_buses(Buss.objects.prefetch_related("facilities"), request.GET)
+    buses = [bus async for bus in queryset]
+    return _json_response(BussListSerializer(buses, many=True).data)
+
+
+@async_api_view
+async def bus_detail(request, pk):
+    try:
+        bus = await Buss.objects.prefetch_related("facilities").aget(pk=pk)
+    except (Buss.DoesNotExist, ValueError):
+        raise NotFound("No Buss matches the given query.")
+    return _json_response(BussRetrieveSerializer(bus).data)
+
+
+@async_api_view
+async def order_list(request):
+    queryset = Order.objects.filter(user=request.user.id)
+    page_size = _page_size(request, OrderSetPagination)
+    try:
+        page = int(request.GET.get("page", 1))
+    except ValueError:
+        page = 0
+    count = await queryset.acount()
+    last_page = max(1, -(-count // page_size))
+    if not (1 <= page <= last_page):
+        raise NotFound("Invalid page.")
+
+    offset = (page - 1) * page_size
+    orders = [
+        order async for order in
+        queryset.prefetch_related(
+            "tickets__trip__bus", "tickets__trip__source", "tickets__trip__destination",
+            "archived_tickets__trip__source", "archived_tickets__trip__destination"
+        )[offset:offset + page_size]
+    ]
+
+    url = request.build_absolute_uri()
+    next_url = replace_query_param(url, "page", page + 1) if page < last_page else None
+    previous_url = None
+    if page == 2:
+        previous_url = remove_query_param(url, "page")
+    elif page > 2:
+        previous_url = replace_query_param(url, "page", page - 1)
+
+    return _json_response({
+        "count": count,
+        "next": next_url,
+        "previous": previous_url,
+        "results": OrderListSerializer(orders, many=True).data
+    })
@@ -0,0 +1,226 @@
+"""
+In-memory station name autocomplete.
+
+Every station is indexed under each word of its normalised name (see
+`Station.normalize`), kept in one sorted list, so the stations matching a
+typed prefix are a contiguous slice found by bisection: "fr" finds
+"Frankfurt" and "Ivano-Frankivsk". Punctuation counts as a space, so
+"kyiv pas" finds "Kyiv-Pasazhyrskyi". Matches are ranked by trip volume,
+the number of trips departing from or arriving at the station. When no
+name has a word starting with the query (a typo, "frankfrut"), stations
+sharing enough trigrams with it are suggested instead.
+
+Like the route planner's index, it is built on the first query of a
+process, kept up to date by the receivers in `station.signals` and
+rebuilt periodically to pick up changes made by other worker processes.
+Queries never touch the database otherwise.
+"""
+import bisect
+import dataclasses
+import heapq
+import math
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Count
+
+from station.models import Station, Trip
+
+
+def _setting(name: str):
+    defaults = {
+        "REFRESH_INTERVAL": 300,
+        "MAX_RESULTS": 20,
+        "MIN_SIMILARITY": 0.3,
+        "CACHE_SIZE": 10000,
+    }
+    return getattr(settings, "STATION_AUTOCOMPLETE", {}).get(name, defaults[name])
+
+
+def max_results() -> int:
+    return _setting("MAX_RESULTS")
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Suggestion:
+    id: int
+    name: str
+    # `searchable(name)`
+    text: str
+    trips: int = 0
+    # number of `trigrams(text)`
+    grams: int = 0
+
+
+def searchable(name: str) -> str:
+    """`Station.normalize(name)` with punctuation as spaces: "ivano frankivsk" """
+    return " ".join(re.findall(r"\w+", Station.normalize(name)))
+
+
+def words(text: str) -> list[str]:
+    """`searchable` text from the start of each word: "ivano frankivsk" -> [..., "frankivsk"]"""
+    return [text[match.start():] for match in re.finditer(r"\w+", text)]
+
+
+def trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[start:start + 3] for start in range(len(padded) - 2)}
+
+
+class StationIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._stations: dict[int, Suggestion] = {}
+        # (`words` of the station text, station id), sorted
+        self._words: list[tuple[str, int]] = []
+        self._trigrams: dict[str, set[int]] = {}
+        # (text, limit) -> suggestions, emptied on every change
+        self._results: dict[tuple[str, int], list[Suggestion]] = {}
+        self._loaded_at = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def clear(self):
+        """Drop the index, it is rebuilt from the database on the next query"""
+        with self._lock:
+            self._stations, self._words, self._trigrams = {}, [], {}
+            self._results = {}
+            self._loaded_at = None
+
+    def load(self):
+        # under the lock, so changes made by the receivers meanwhile wait for the new index
+        with self._lock:
+            trips = {}
+            for field in ("source", "destination"):
+                for station_id, count in Trip.objects.values_list(field).annotate(count=Count("id")).order_by():
+                    trips[station_id] = trips.get(station_id, 0) + count
+
+            stations = {
+                station_id: self._suggestion(station_id, name, trips.get(station_id, 0))
+                for station_id, name in Station.objects.values_list("id", "name").iterator()
+            }
+            index = sorted((word, station.id) for station in stations.values() for word in words(station.text))
+            grams = {}
+            for station in stations.values():
+                for gram in trigrams(station.text):
+                    grams.setdefault(gram, set()).add(station.id)
+
+            self._stations, self._words, self._trigrams = stations, index, grams
+            self._results = {}
+            self._loaded_at = time.monotonic()
+
+    def _is_stale(self) -> bool:
+        return (
+            self._loaded_at is None
+            or time.monotonic() - self._loaded_at > _setting("REFRESH_INTERVAL")
+        )
+
+    def ensure_loaded(self):
+        if self._is_stale():
+            with self._lock:
+                # another thread may have loaded it while this one waited
+                if self._is_stale():
+                    self.load()
+
+    @staticmethod
+    def _suggestion(station_id: int, name: str, trips: int) -> Suggestion:
+        text = searchable(name)
+        return Suggestion(station_id, name, text, trips, len(trigrams(text)))
+
+    def upsert_station(self, station_id: int, name: str):
+        """Add a station or index it under its new name"""
+        if not self.is_loaded:
+            return
+        with self._lock:
+            self._results = {}
+            station = self._stations.pop(station_id, None)
+            if station is not None:
+                self._unindex(station)
+            station = self._stations[station_id] = self._suggestion(
+                station_id, name, station.trips if station else 0
+            )
+            for word in words(station.text):
+                bisect.insort(self._words, (word, station_id))
+            for gram in trigrams(station.text):
+                self._trigrams.setdefault(gram, set()).add(station_id)
+
+    def remove_station(self, station_id: int):
+        with self._lock:
+            self._results = {}
+            station = self._stations.pop(station_id, None)
+            if station is not None:
+                self._unindex(station)
+
+    def _unindex(self, station: Suggestion):
+        for word in words(station.text):
+            position = bisect.bisect_left(self._words, (word, station.id))
+            del self._words[position]
+        for gram in trigrams(station.text):
+            ids = self._trigrams[gram]
+            ids.discard(station.id)
+            if not ids:
+                del self._trigrams[gram]
+
+    def count_trips(self, station_ids, change: int):
+        """Add `change` to the trip volume of each of `station_ids`"""
+        if not self.is_loaded:
+            return
+        with self._lock:
+            self._results = {}
+            for station_id in station_ids:
+                station = self._stations.get(station_id)
+                if station is not None:
+                    self._stations[station_id] = dataclasses.replace(
+                        station, trips=max(0, station.trips + change)
+                    )
+
+    def search(self, query: str, limit: int = 10) -> list[Suggestion]:
+        """Stations whose name has a word starting with `query`, or else similar names"""
+        self.ensure_loaded()
+        text = searchable(query)
+        if not text or limit < 1:
+            return []
+
+        with self._lock:
+            found = self._results.get((text, limit))
+            if found is None:
+                found = self._prefixed(text, limit) or self._similar(text, limit)
+                if len(self._results) >= _setting("CACHE_SIZE"):
+                    self._results = {}
+                self._results[text, limit] = found
+            return found
+
+    def _prefixed(self, text: str, limit: int) -> list[Suggestion]:
+        first = bisect.bisect_left(self._words, (text,))
+        # every word starting with `text` sorts before `text` followed by the largest character
+        last = bisect.bisect_left(self._words, (text + chr(0x10ffff),), first)
+        matched = {station_id for _, station_id in self._words[first:last]}
+        return heapq.nsmallest(
+            limit,
+            (self._stations[station_id] for station_id in matched),
+            key=lambda station: (-station.trips, station.name)
+        )
+
+    def _similar(self, text: str, limit: int) -> list[Suggestion]:
+        minimum = _setting("MIN_SIMILARITY")
+        postings = sorted((self._trigrams.get(gram, set()) for gram in trigrams(text)), key=len)
+        # the Jaccard similarity of the trigram sets is at most shared / len(postings), so
+        # a similar station shares `needed` trigrams and one of the rarest that many of the rest
+        needed = max(1, math.ceil(minimum * len(postings)))
+        candidates = set().union(*postings[:len(postings) - needed + 1])
+
+        scored = []
+        for station_id in candidates:
+            station = self._stations[station_id]
+            shared = sum(station_id in ids for ids in postings)
+            similarity = shared / (len(postings) + station.grams - shared)
+            if similarity >= minimum:
+                scored.append((-similarity, -station.trips, station.name, station))
+        return [item[3] for item in heapq.nsmallest(limit, scored, key=lambda item: item[:3])]
+
+
+index = StationIndex()
@@ -0,0 +1,347 @@
+"""
+Synthetic dataset generator and endpoint benchmark harness.
+
+`generate_dataset` bulk-inserts buses, trips, users, orders and tickets
+in bounded batches, so memory stays flat at millions of rows, and keeps
+trip seat maps consistent with the tickets it creates.
+
+`discover_endpoints` lists every GET route registered on the station
+router, plus the user endpoints. `measure` replays each endpoint and
+reports latency percentiles and SQL query counts as plain dicts that
+can be dumped to JSON and compared between commits.
+"""
+import contextlib
+import datetime
+import itertools
+import random
+import statistics
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from station import seats
+from station.models import Buss, Facility, Trip, Order, Station, Ticket
+
+SCALES = {
+    "tiny": {"buses": 10, "trips": 200, "tickets": 2_000, "users": 50},
+    "small": {"buses": 50, "trips": 5_000, "tickets": 100_000, "users": 5_000},
+    "medium": {"buses": 200, "trips": 20_000, "tickets": 500_000, "users": 50_000},
+    "large": {"buses": 1_000, "trips": 100_000, "tickets": 5_000_000, "users": 500_000},
+}
+
+CITIES = (
+    "Kyiv", "Lviv", "Odesa", "Kharkiv", "Dnipro", "Zaporizhzhia", "Vinnytsia",
+    "Poltava", "Chernihiv", "Cherkasy", "Zhytomyr", "Sumy", "Rivne", "Ternopil",
+    "Lutsk", "Uzhhorod", "Chernivtsi", "Ivano-Frankivsk", "Khmelnytskyi", "Mykolaiv",
+)
+FACILITIES = ("Wifi", "WC", "USB", "Air conditioning", "Coffee machine", "TV")
+PASSWORD = "benchmark-password"
+
+# no response cache, every request reaches the database
+BENCHMARK_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+    "responses": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+}
+
+
+def benchmark_settings(cache_responses: bool = False):
+    caches = dict(BENCHMARK_CACHES)
+    if cache_responses:
+        caches["responses"] = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    return override_settings(
+        CACHES=caches,
+        ALLOWED_HOSTS=["testserver"],
+        THROTTLE_STORE={"ENABLED": False}
+    )
+
+
+@contextlib.contextmanager
+def throwaway_database(name: Optional[str] = None):
+    """
+    Run against a fresh test database of the default connection,
+    stored in the file `name` if given (SQLite defaults to memory)
+    """
+    test_settings = connection.settings_dict["TEST"]
+    old_test_name = test_settings["NAME"]
+    if name is not None:
+        test_settings["NAME"] = name
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings["NAME"] = old_test_name
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def generate_dataset(
+        buses: int,
+        trips: int,
+        tickets: int,
+        users: int,
+        seed: int = 0,
+        batch_size: int = 5000,
+        log: Callable[[str], None] = lambda message: None,
+) -> dict:
+    """Insert a synthetic dataset and return the number of rows per model"""
+    if min(buses, users) < 1:
+        raise ValueError("At least one bus and one user are required")
+    rng = random.Random(seed)
+    user_model = get_user_model()
+
+    facilities = [Facility.objects.get_or_create(name=name)[0] for name in FACILITIES]
+
+    # hashing once keeps user generation fast, every user gets PASSWORD
+    password = make_password(PASSWORD)
+    user_ids = []
+    for batch in _batched(range(users), batch_size):
+        created = user_model.objects.bulk_create(
+            user_model(email=f"user{number}.{seed}@bench.test", password=password)
+            for number in batch
+        )
+        user_ids.extend(user.id for user in created)
+    log(f"users: {users}")
+
+    bus_facilities = [rng.sample(facilities, rng.randint(0, len(facilities))) for _ in range(buses)]
+    bus_rows = Buss.objects.bulk_create(
+        Buss(info=f"BN {number:04} {rng.choice('ABCEHKMOPT')}{rng.choice('ABCEHKMOPT')}",
+             num_seats=rng.choice((30, 40, 50, 60)),
+             facility_mask=sum(facility.mask for facility in bus_facilities[number]))
+        for number in range(buses)
+    )
+    Buss.facilities.through.objects.bulk_create(
+        Buss.facilities.through(buss_id=bus.id, facility_id=facility.id)
+        for bus, chosen in zip(bus_rows, bus_facilities)
+        for facility in chosen
+    )
+    log(f"buses: {buses}")
+
+    stations = Station.objects.bulk_create(Station(name=city, key=Station.normalize(city)) for city in CITIES)
+
+    # spread tickets over trips, never more than a bus can seat
+    tickets_per_trip = tickets / trips if trips else 0
+    start = timezone.now() - datetime.timedelta(days=30)
+    trip_count = ticket_count = order_count = 0
+    for batch in _batched(range(trips), batch_size):
+        plans = []
+        for number in batch:
+            bus = bus_rows[number % len(bus_rows)]
+            sold = min(bus.num_seats, round(rng.uniform(0.5, 1.5) * tickets_per_trip))
+            sold = min(sold, tickets - ticket_count - sum(plan[2] for plan in plans))
+            departure = start + datetime.timedelta(minutes=rng.randint(0, 60 * 24 * 90))
+            source, destination = rng.sample(stations, 2)
+            plans.append((
+                Trip(
+                    source=source,
+                    destination=destination,
+                    departure=departure,
+                    arrival=departure + datetime.timedelta(minutes=rng.randint(60, 600)),
+                    bus=bus,
+                    seat_map=seats.occupy(b"", range(1, sold + 1)),
+                    seats_sold=sold
+                ),
+                bus,
+                sold
+            ))
+
+        with transaction.atomic():
+            trip_rows = Trip.objects.bulk_create(plan[0] for plan in plans)
+            ticket_rows = []
+            order_users = []
+            for trip, (_, _, sold) in zip(trip_rows, plans):
+                seat = 1
+                while seat <= sold:
+                    group = min(rng.randint(1, 4), sold - seat + 1)
+                    order_users.append(rng.choice(user_ids))
+                    ticket_rows.extend((trip.id, len(order_users) - 1, number)
+                                       for number in range(seat, seat + group))
+                    seat += group
+            orders = Order.objects.bulk_create(
+                (Order(user_id=user_id) for user_id in order_users), batch_size=batch_size
+            )
+            Ticket.objects.bulk_create(
+                (Ticket(trip_id=trip_id, order_id=orders[order].id, seat=seat)
+                 for trip_id, order, seat in ticket_rows),
+                batch_size=batch_size
+            )
+        trip_count += len(trip_rows)
+        ticket_count += len(ticket_rows)
+        order_count += len(orders)
+        log(f"trips: {trip_count}, orders: {order_count}, tickets: {ticket_count}")
+
+    return {
+        "users": users,
+        "buses": buses,
+        "facilities": len(facilities),
+        "trips": trip_count,
+        "orders": order_count,
+        "tickets": ticket_count,
+    }
+
+
+@dataclass
+class Endpoint:
+    name: str
+    path: str
+    method: str = "get"
+    params: dict = field(default_factory=dict)
+    # called before each request, for payloads that must be unique
+    payload: Optional[Callable[[], dict]] = None
+    # creates users or issues tokens, not for databases kept afterwards
+    writes: bool = False
+
+
+def _sample(queryset):
+    return queryset.order_by("pk").values_list("pk", flat=True).first()
+
+
+def discover_endpoints(user, include_writes: bool = True) -> tuple[list[Endpoint], list[str]]:
+    """Return the endpoints to measure and names of the ones that were skipped"""
+    from station.urls import router
+
+    endpoints, skipped = [], []
+    trip = Trip.objects.order_by("pk").first()
+    samples = {
+        "order": _sample(Order.objects.filter(user=user)),
+        "seathold": None,
+    }
+    params = {
+        "route-list": (
+            {"source": trip.source.name, "destination": trip.destination.name,
+             "departure_after": trip.departure.isoformat()}
+            if trip else {}
+        ),
+        # a search results page worth of trips
+        "trip-availability": {
+            "ids": ",".join(map(str, Trip.objects.order_by("pk").values_list("pk", flat=True)[:50])),
+            "seat_map": "rle",
+        },
+        # a few keystrokes of a station name
+        "station-autocomplete": {"q": trip.source.name[:3] if trip else "ky"},
+    }
+    for prefix, viewset, basename in router.registry:
+        for route in router.get_routes(viewset):
+            if "get" not in route.mapping or not hasattr(viewset, route.mapping["get"]):
+                continue
+            name = route.name.format(basename=basename)
+            if route.detail:
+                pk = samples.get(basename, _sample(viewset.queryset) if hasattr(viewset, "queryset") else None)
+                if pk is None:
+                    skipped.append(f"station:{name}")
+                    continue
+                path = reverse(f"station:{name}", args=(pk,))
+            else:
+                path = reverse(f"station:{name}")
+            endpoints.append(Endpoint(f"station:{name}", path, params=params.get(name, {})))
+
+    refresh = RefreshToken.for_user(user)
+    endpoints += [
+        Endpoint("user:manage_user", reverse("user:manage_user")),
+        Endpoint(
+            "user:token_obtain_pair", reverse("user:token_obtain_pair"), "post",
+            payload=lambda: {"email": user.email, "password": PASSWORD}, writes=True
+        ),
+        Endpoint(
+            "user:token_refresh", reverse("user:token_refresh"), "post",
+            payload=lambda: {"refresh": str(refresh)}, writes=True
+        ),
+        Endpoint(
+            "user:token_verify", reverse("user:token_verify"), "post",
+            payload=lambda: {"token": str(refresh.access_token)}, writes=True
+        ),
+        Endpoint(
+            "user:create", reverse("user:create"), "post",
+            payload=lambda: {"email": f"{uuid.uuid4().hex}@bench.test", "password": PASSWORD}, writes=True
+        ),
+    ]
+    if not include_writes:
+        endpoints = [endpoint for endpoint in endpoints if not endpoint.writes]
+    return endpoints, skipped
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def measure(endpoint: Endpoint, user, requests: int, warmup: int = 3) -> dict:
+    """Replay `endpoint` sequentially and summarise latency and queries"""
+    client = Client(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+    send = getattr(client, endpoint.method)
+
+    def request():
+        if endpoint.payload is not None:
+            return send(endpoint.path, endpoint.payload(), content_type="application/json")
+        return send(endpoint.path, endpoint.params)
+
+    for _ in range(warmup):
+        request()
+
+    latencies, query_counts, statuses = [], [], set()
+    for _ in range(requests):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = request()
+            latencies.append((time.perf_counter() - started) * 1000)
+        query_counts.append(len(queries))
+        statuses.add(response.status_code)
+
+    return {
+        "endpoint": endpoint.name,
+        "method": endpoint.method.upper(),
+        "path": endpoint.path,
+        "requests": requests,
+        "statuses": sorted(statuses),
+        "p50_ms": round(_percentile(latencies, 50), 3),
+        "p95_ms": round(_percentile(latencies, 95), 3),
+        "p99_ms": round(_percentile(latencies, 99), 3),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "queries": round(statistics.fmean(query_counts), 2),
+        "max_queries": max(query_counts),
+    }
+
+
+def benchmark_user():
+    """A generated user that has orders, so per-user endpoints return data"""
+    user_id = Order.objects.order_by("pk").values_list("user_id", flat=True).first()
+    user_model = get_user_model()
+    if user_id is None:
+        return user_model.objects.filter(email__endswith="@bench.test").order_by("pk").first()
+    return user_model.objects.get(pk=user_id)
+
+
+def compare(previous: dict, current: dict, threshold: float = 0.1) -> list[dict]:
+    """Diff two result files, flagging endpoints slower by more than `threshold`"""
+    before = {result["endpoint"]: result for result in previous["results"]}
+    rows = []
+    for result in current["results"]:
+        old = before.get(result["endpoint"])
+        if old is None:
+            continue
+        change = (result["p95_ms"] - old["p95_ms"]) / old["p95_ms"] if old["p95_ms"] else 0.0
+        rows.append({
+            "endpoint": result["endpoint"],
+            "p95_before_ms": old["p95_ms"],
+            "p95_after_ms": result["p95_ms"],
+            "p95_change": round(change, 3),
+            "queries_before": old["queries"],
+            "queries_after": result["queries"],
+            "regression": change > threshold or result["queries"] > old["queries"],
+        })
+    return rows
@@ -0,0 +1,178 @@
+"""
+Single-writer queue for bookings.
+
+SQLite lets one connection write at a time. When every request thread
+commits its own order, they queue up on the database lock, each paying
+for a commit of its own, and those waiting longer than the timeout fail
+with "database is locked". With the queue enabled the bookings of a
+process are handed to one writer thread instead. It takes whatever is
+pending, up to BATCH_SIZE bookings, and writes them in one transaction,
+each booking in a savepoint so a failing one does not undo the others.
+
+The queue is bounded: with MAX_PENDING bookings waiting `submit` refuses
+new ones at once, and a booking the writer has not started within
+MAX_WAIT seconds is cancelled. Both are answered with 503 and a
+Retry-After header. Every process runs its own writer, the writers take
+turns on the database lock with IMMEDIATE transactions (see app.sqlite3).
+"""
+import math
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections, connection, transaction
+from django.dispatch import receiver
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+def _setting(name: str):
+    defaults = {
+        "ENABLED": False,
+        "MAX_PENDING": 200,
+        "MAX_WAIT": 5.0,
+        "BATCH_SIZE": 50,
+    }
+    return getattr(settings, "BOOKING_QUEUE", {}).get(name, defaults[name])
+
+
+class BookingUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many bookings at the moment, try again shortly."
+    default_code = "booking_unavailable"
+
+    def __init__(self, detail=None, code=None, wait: float = 1):
+        super().__init__(detail, code)
+        # sent as Retry-After by the DRF exception handler
+        self.wait = max(1, math.ceil(wait))
+
+
+class QueueFull(BookingUnavailable):
+    default_code = "booking_queue_full"
+
+
+class QueueTimeout(BookingUnavailable):
+    default_detail = "The booking was not processed in time and nothing was bought, try again shortly."
+    default_code = "booking_timeout"
+
+
+@dataclass
+class Job:
+    function: Callable
+    future: Future
+
+
+class BookingQueue:
+    def __init__(self, max_pending: int, max_wait: float, batch_size: int):
+        self.max_wait = max_wait
+        self.batch_size = batch_size
+        self.batches = 0
+        self._jobs = queue.Queue(maxsize=max_pending)
+        self._writer = threading.Thread(target=self._run, name="booking-writer", daemon=True)
+        self._writer.start()
+
+    def submit(self, function: Callable):
+        """Run `function` on the writer thread and return its result"""
+        job = Job(function, Future())
+        try:
+            self._jobs.put_nowait(job)
+        except queue.Full:
+            raise QueueFull(wait=self.max_wait)
+
+        try:
+            return job.future.result(timeout=self.max_wait)
+        except TimeoutError:
+            if job.future.cancel():
+                raise QueueTimeout(wait=self.max_wait)
+            # the writer has started it, its outcome follows shortly
+            return job.future.result()
+
+    def close(self):
+        """Stop the writer once the pending bookings are written"""
+        self._jobs.put(None)
+        self._writer.join()
+
+    def _run(self):
+        while True:
+            jobs = [self._jobs.get()]
+            while len(jobs) < self.batch_size and jobs[-1] is not None:
+                try:
+                    jobs.append(self._jobs.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = jobs[-1] is None
+            jobs = [job for job in jobs if job is not None and job.future.set_running_or_notify_cancel()]
+            if jobs:
+                self._write(jobs)
+            if stop:
+                connection.close()
+                return
+
+    def _write(self, jobs: list[Job]):
+        close_old_connections()
+        outcomes = []
+        try:
+            with transaction.atomic():
+                for job in jobs:
+                    try:
+                        with transaction.atomic():
+                            outcomes.append((job, job.function(), None))
+                    except Exception as error:
+                        outcomes.append((job, None, error))
+        except Exception as error:
+            # nothing of the batch was committed
+            for job in jobs:
+                job.future.set_exception(error)
+            return
+
+        self.batches += 1
+        for job, result, error in outcomes:
+            if error is None:
+                job.future.set_result(result)
+            else:
+                job.future.set_exception(error)
+
+
+_queue = None
+_pid = None
+_queue_lock = threading.Lock()
+
+
+def get_queue() -> BookingQueue:
+    global _queue, _pid
+    with _queue_lock:
+        # the writer thread of a parent process does not survive a fork
+        if _queue is None or _pid != os.getpid():
+            _queue = BookingQueue(
+                max_pending=_setting("MAX_PENDING"),
+                max_wait=_setting("MAX_WAIT"),
+                batch_size=_setting("BATCH_SIZE"),
+            )
+            _pid = os.getpid()
+        return _queue
+
+
+@receiver(setting_changed)
+def _reset_queue(setting, **kwargs):
+    global _queue
+    if setting == "BOOKING_QUEUE":
+        with _queue_lock:
+            if _queue is not None and _pid == os.getpid():
+                _queue.close()
+            _queue = None
+
+
+def submit(function: Callable):
+    """
+    Write a booking through the queue when it is enabled, otherwise
+    (or inside a transaction, whose data the writer could not see) directly
+    """
+    if not _setting("ENABLED") or connection.in_atomic_block:
+        return function()
+    return get_queue().submit(function)
@@ -0,0 +1,158 @@
+"""
+Versioned response cache for read endpoints.
+
+Every cached model has a version counter in the `CacheVersion` table. The
+receivers in `station.signals` bump it whenever a row of that model
+changes, in the transaction of the change, and cached responses are keyed
+on the versions of the models they depend on, so a change makes every
+stale entry unreachable without having to find and delete it. The
+counters are shared by every worker through the database, so the
+``responses`` cache itself may be local to each worker.
+
+The same key is the ETag of the response, and the time of the last bump,
+kept next to the counter, its Last-Modified, so every worker derives the
+same validators and conditional requests are answered with 304 Not
+Modified after one query for the versions instead of the whole view.
+"""
+import contextlib
+import contextvars
+import datetime
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from station.models import CacheVersion
+
+CACHE_ALIAS = "responses"
+
+# models whose bumps are postponed to the end of `deferred_bumps`
+_deferred = contextvars.ContextVar("deferred_bumps", default=None)
+
+
+def get_versions(models) -> tuple[list[int], datetime.datetime | None]:
+    """Version of each of `models` and the time of the last change to any of them, if known"""
+    labels = [model._meta.label_lower for model in models]
+    rows = {
+        label: (version, modified)
+        for label, version, modified in CacheVersion.objects.filter(label__in=labels).values_list(
+            "label", "version", "modified"
+        )
+    }
+    versions = [rows[label][0] if label in rows else 0 for label in labels]
+    modified = max((modified for _, modified in rows.values()), default=None) if len(rows) == len(labels) else None
+    return versions, modified
+
+
+@contextlib.contextmanager
+def deferred_bumps():
+    """
+    Bump the version of every model changed in the block once, at its end,
+    instead of once per row, e.g. for the receivers of a cascading delete
+    """
+    models = {}
+    token = _deferred.set(models)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+    for model in models:
+        bump_version(model)
+
+
+def bump_version(model):
+    """Invalidate responses depending on `model` once the current transaction commits"""
+    deferred = _deferred.get()
+    if deferred is not None:
+        deferred[model] = None
+        return
+    label = model._meta.label_lower
+    changes = CacheVersion.objects.filter(label=label)
+    now = timezone.now()
+    if not changes.update(version=F("version") + 1, modified=now):
+        # a fresh counter must not collide with versions of a previous database
+        CacheVersion.objects.bulk_create(
+            [CacheVersion(label=label, version=time.time_ns(), modified=now)], ignore_conflicts=True
+        )
+
+    def touch():
+        # the change became visible now, maybe a second after the bump
+        now = timezone.now()
+        changes.filter(modified__lt=now).update(modified=now)
+
+    transaction.on_commit(touch)
+
+
+def last_modified(modified: datetime.datetime | None) -> int | None:
+    """
+    `modified` as a timestamp, None if it is unknown or still the current
+    second, when another change could follow unnoticed by
+    If-Modified-Since's one-second resolution
+    """
+    if modified is None:
+        return None
+    modified = int(modified.timestamp())
+    return modified if modified < int(time.time()) else None
+
+
+def response_key(request, versions) -> str:
+    params = urlencode(sorted(request.query_params.lists()), doseq=True)
+    versions = ",".join(str(version) for version in versions)
+    renderer = getattr(getattr(request, "accepted_renderer", None), "format", "")
+    raw = f"{request.get_host()}{request.path}?{params}|{renderer}|{versions}"
+    return "station:response:" + hashlib.sha1(raw.encode()).hexdigest()
+
+
+class CachedResponseMixin:
+    """
+    Serve `list` and `retrieve` from the response cache
+    until one of `cache_dependencies` changes, or answer
+    conditional requests with 304 Not Modified
+    """
+    cache_dependencies = ()
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(super().retrieve, request, *args, **kwargs)
+
+    def _cached_response(self, handler, request, *args, **kwargs):
+        cache = caches[CACHE_ALIAS]
+        versions, modified = get_versions(self.cache_dependencies)
+        key = response_key(request, versions)
+        etag = f'W/"{key.rsplit(":", 1)[-1]}"'
+        modified = last_modified(modified)
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=modified)
+        if not_modified is not None:
+            return self._with_validators(not_modified, etag, modified)
+
+        data = cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+            return self._with_validators(response, etag, modified)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data)
+            response["X-Cache"] = "MISS"
+            self._with_validators(response, etag, modified)
+        return response
+
+    @staticmethod
+    def _with_validators(response, etag, modified):
+        response["ETag"] = etag
+        if modified is not None:
+            response["Last-Modified"] = http_date(modified)
+        # clients may keep the body but have to revalidate it every time
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
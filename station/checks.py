@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core import checks
+
+from station import replicas
+
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@checks.register(checks.Tags.caches, checks.Tags.database)
+def check_replica_sticky_cache(app_configs, **kwargs):
+    """Sticky marks of `station.replicas` have to reach every worker"""
+    if not replicas.replica_aliases():
+        return []
+    alias = replicas.sticky_cache_alias()
+    backend = settings.CACHES.get(alias, {}).get("BACKEND")
+    if backend is None:
+        return [checks.Error(
+            f"REPLICA_STICKY_CACHE names the cache '{alias}', which is not in CACHES.",
+            id="station.E001",
+        )]
+    if backend in PROCESS_LOCAL_CACHES:
+        return [checks.Error(
+            f"The cache '{alias}' keeping users on the primary after a write is local to one process.",
+            hint="Use a cache shared by all workers, e.g. FileBasedCache, Redis or Memcached.",
+            id="station.E002",
+        )]
+    return []
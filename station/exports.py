@@ -0,0 +1,160 @@
+"""
+Streaming CSV/JSONL exports of orders, tickets and trips, and of the
+trips and tickets moved to the archive by `station.archive`.
+
+Rows come from `values_list().iterator()`, so the database is read in
+chunks and no model instances or serialized dicts are built. Encoded
+rows are joined into blocks of about `BLOCK_SIZE` bytes before they are
+yielded to the streaming response.
+"""
+import csv
+import datetime
+import io
+import json
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+
+from station.models import ArchivedTicket, ArchivedTrip, Order, Ticket, Trip
+
+FORMATS = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+}
+CHUNK_SIZE = 2000
+BLOCK_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class Export:
+    model: type
+    # output column -> lookup passed to values_list
+    columns: dict
+    # lookup the date range filters apply to
+    date_field: str
+
+    def queryset(self, after: Optional[datetime.datetime] = None, before: Optional[datetime.datetime] = None):
+        queryset = self.model.objects.all()
+        if after is not None:
+            queryset = queryset.filter(**{f"{self.date_field}__gte": after})
+        if before is not None:
+            queryset = queryset.filter(**{f"{self.date_field}__lte": before})
+        return queryset.order_by("id").values_list(*self.columns.values())
+
+
+EXPORTS = {
+    "orders": Export(
+        Order,
+        {
+            "id": "id",
+            "created_at": "created_at",
+            "user_id": "user_id",
+            "user_email": "user__email",
+        },
+        "created_at"
+    ),
+    "tickets": Export(
+        Ticket,
+        {
+            "id": "id",
+            "order_id": "order_id",
+            "order_created_at": "order__created_at",
+            "user_id": "order__user_id",
+            "trip_id": "trip_id",
+            "source": "trip__source__name",
+            "destination": "trip__destination__name",
+            "departure": "trip__departure",
+            "seat": "seat",
+        },
+        "order__created_at"
+    ),
+    "trips": Export(
+        Trip,
+        {
+            "id": "id",
+            "source": "source__name",
+            "destination": "destination__name",
+            "departure": "departure",
+            "arrival": "arrival",
+            "bus_id": "bus_id",
+            "bus_info": "bus__info",
+            "bus_num_seats": "bus__num_seats",
+        },
+        "departure"
+    ),
+    # the same columns as "tickets" and "trips", the bus as it was when archived
+    "archived_tickets": Export(
+        ArchivedTicket,
+        {
+            "id": "id",
+            "order_id": "order_id",
+            "order_created_at": "order__created_at",
+            "user_id": "order__user_id",
+            "trip_id": "trip_id",
+            "source": "trip__source__name",
+            "destination": "trip__destination__name",
+            "departure": "trip__departure",
+            "seat": "seat",
+        },
+        "order__created_at"
+    ),
+    "archived_trips": Export(
+        ArchivedTrip,
+        {
+            "id": "id",
+            "source": "source__name",
+            "destination": "destination__name",
+            "departure": "departure",
+            "arrival": "arrival",
+            "bus_info": "bus_info",
+            "bus_num_seats": "bus_num_seats",
+        },
+        "departure"
+    ),
+}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _csv_lines(columns: list, rows: Iterable[tuple]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(values) -> str:
+        writer.writerow(values)
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+    yield line(columns)
+    for row in rows:
+        yield line(
+            value.isoformat() if isinstance(value, datetime.datetime) else value
+            for value in row
+        )
+
+
+def _jsonl_lines(columns: list, rows: Iterable[tuple]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), default=_json_default) + "\n"
+
+
+def stream(kind: str, file_format: str, after=None, before=None) -> Iterator[bytes]:
+    """Encoded export of `kind` in blocks of roughly `BLOCK_SIZE` bytes"""
+    export = EXPORTS[kind]
+    rows = export.queryset(after, before).iterator(chunk_size=CHUNK_SIZE)
+    lines = (_csv_lines if file_format == "csv" else _jsonl_lines)(list(export.columns), rows)
+
+    block, size = [], 0
+    for line in lines:
+        block.append(line)
+        size += len(line)
+        if size >= BLOCK_SIZE:
+            yield "".join(block).encode()
+            block, size = [], 0
+    if block:
+        yield "".join(block).encode()
@@ -0,0 +1,132 @@
+"""
+Resized variants of bus images.
+
+Uploading a bus image schedules `render_variants` in a process pool once
+the upload is committed. The worker writes a recompressed JPEG per entry
+of `VARIANTS` next to the original, and the parent process stores their
+names and sizes in `Buss.image_variants` for the serializers.
+
+Worker code only needs Pillow, Django is imported lazily in the parent.
+"""
+import logging
+import multiprocessing
+import pathlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# variant name -> maximum width in pixels, smallest first
+VARIANTS = {
+    "thumbnail": 160,
+    "card": 480,
+    "full": 1280,
+}
+JPEG_QUALITY = 80
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variant_name(image_name: str, variant: str) -> str:
+    path = pathlib.PurePosixPath(image_name)
+    return str(path.with_name(f"{path.stem}-{variant}.jpg"))
+
+
+def render_variants(media_root: str, image_name: str) -> dict:
+    """Write every variant of `image_name` and return their names and sizes"""
+    root = pathlib.Path(media_root)
+    variants = {}
+    with Image.open(root / image_name) as original:
+        original = ImageOps.exif_transpose(original).convert("RGB")
+        for variant, max_width in VARIANTS.items():
+            image = original.copy()
+            if image.width > max_width:
+                image = image.resize(
+                    (max_width, round(image.height * max_width / image.width)),
+                    Image.LANCZOS
+                )
+            name = variant_name(image_name, variant)
+            image.save(
+                root / name,
+                "JPEG",
+                quality=JPEG_QUALITY,
+                optimize=True,
+                progressive=True
+            )
+            variants[variant] = {"name": name, "width": image.width, "height": image.height}
+    return variants
+
+
+def store_variants(bus_id: int, image_name: str, variants: dict):
+    """Save rendered variants unless the bus image was replaced meanwhile"""
+    from django.db import close_old_connections
+
+    from station import caching
+    from station.models import Buss
+
+    try:
+        updated = Buss.objects.filter(pk=bus_id, image=image_name).update(image_variants=variants)
+        if updated:
+            caching.bump_version(Buss)
+        else:
+            delete_variants(variants)
+    finally:
+        close_old_connections()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    from django.conf import settings
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_VARIANT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+
+def _on_rendered(bus_id: int, image_name: str, future):
+    try:
+        variants = future.result()
+    except Exception:
+        logger.exception("Rendering variants of %s failed", image_name)
+        return
+    store_variants(bus_id, image_name, variants)
+
+
+def delete_variants(variants: dict):
+    """Delete the files of `Buss.image_variants`"""
+    from django.core.files.storage import default_storage
+
+    for variant in variants.values():
+        default_storage.delete(variant["name"])
+
+
+def replace_variants(bus, previous: dict):
+    """Delete the `previous` variants of the bus image and render those of its new image after commit"""
+    from django.db import transaction
+
+    if previous:
+        transaction.on_commit(lambda: delete_variants(previous))
+    schedule_variants(bus)
+
+
+def schedule_variants(bus):
+    """Render variants of the bus image off the request path after commit"""
+    from django.conf import settings
+    from django.db import transaction
+
+    if not bus.image:
+        return
+    bus_id, image_name = bus.id, bus.image.name
+
+    def submit():
+        future = _get_executor().submit(render_variants, str(settings.MEDIA_ROOT), image_name)
+        future.add_done_callback(lambda done: _on_rendered(bus_id, image_name, done))
+
+    transaction.on_commit(submit)
@@ -0,0 +1,300 @@
+"""
+Streaming importer for bus and trip (timetable) files.
+
+Rows are read one at a time from CSV (with a header line) or JSONL,
+validated in chunks against in-memory lookups of buses and facilities,
+and written with `bulk_create`, one transaction per chunk. Invalid rows
+are handed to a callback with their line number and errors (the import
+command writes them to a JSONL file) instead of aborting the import, so
+memory use only depends on the chunk size.
+
+Bulk inserts skip model signals, so the importer invalidates the
+response cache and the route planner index itself once it is done.
+"""
+import csv
+import dataclasses
+import io
+import json
+import re
+from typing import Callable, Iterator, Optional, TextIO
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from station import autocomplete, caching, routing
+from station.models import Buss, Facility, Station, Trip
+
+FORMATS = ("csv", "jsonl")
+KINDS = ("buses", "trips")
+CHUNK_SIZE = 2000
+# bytes that are not UTF-8, decoded by `text_stream` as lone surrogates
+UNDECODABLE = re.compile("[\udc80-\udcff]")
+
+
+class RowError(Exception):
+    def __init__(self, errors: dict):
+        super().__init__(errors)
+        self.errors = errors
+
+
+@dataclasses.dataclass
+class ImportResult:
+    kind: str
+    rows: int = 0
+    created: int = 0
+    rejected: int = 0
+
+    def as_dict(self) -> dict:
+        return dataclasses.asdict(self)
+
+
+def detect_format(filename: str) -> str:
+    return "jsonl" if filename.lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def read_rows(stream: TextIO, file_format: str) -> Iterator[tuple[int, dict]]:
+    """Yield ``(line number, row)`` without loading the whole file"""
+    if file_format == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # cells beyond the header are collected in a list under the None key
+            cells = [*row, *row.get(None, ())]
+            cells += [value for value in row.values() if not isinstance(value, list)]
+            if any(UNDECODABLE.search(cell) for cell in cells if cell is not None):
+                row = {"__error__": "the row is not valid UTF-8"}
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        if UNDECODABLE.search(line):
+            yield line_number, {"__error__": "the line is not valid UTF-8"}
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            yield line_number, {"__error__": f"invalid JSON: {error}"}
+            continue
+        if not isinstance(row, dict):
+            row = {"__error__": "a JSON object is expected"}
+        yield line_number, row
+
+
+def _text(row: dict, name: str, max_length: int, errors: dict, required=True) -> Optional[str]:
+    value = row.get(name)
+    value = "" if value is None else str(value).strip()
+    if not value:
+        if required:
+            errors[name] = "This field is required."
+        return None
+    if len(value) > max_length:
+        errors[name] = f"Ensure this field has no more than {max_length} characters."
+    return value
+
+
+def _datetime(row: dict, name: str, errors: dict, required=True):
+    value = row.get(name)
+    if value in (None, ""):
+        if required:
+            errors[name] = "This field is required."
+        return None
+    try:
+        parsed = parse_datetime(str(value).strip())
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        errors[name] = "Enter a valid ISO 8601 date and time."
+        return None
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class BusLookup:
+    """Resolve a bus reference, either its id or its unique `info`"""
+
+    def __init__(self):
+        self.by_id = {}
+        self.by_info = {}
+        for bus_id, info in Buss.objects.values_list("id", "info").iterator():
+            self.add(bus_id, info)
+
+    def add(self, bus_id: int, info: Optional[str]):
+        self.by_id[bus_id] = bus_id
+        if info:
+            # None marks an info shared by several buses
+            self.by_info[info] = None if info in self.by_info else bus_id
+
+    def resolve(self, reference) -> int:
+        reference = "" if reference is None else str(reference).strip()
+        if reference.isdigit() and int(reference) in self.by_id:
+            return int(reference)
+        if reference in self.by_info:
+            if self.by_info[reference] is None:
+                raise KeyError(f"Several buses have info {reference!r}, use the bus id.")
+            return self.by_info[reference]
+        raise KeyError(f"Unknown bus {reference!r}.")
+
+
+class StationLookup:
+    """Station ids by name ignoring case and spacing, creating missing stations"""
+
+    def __init__(self):
+        self.by_key = dict(Station.objects.values_list("key", "id").iterator())
+
+    def resolve(self, names) -> list[int]:
+        missing = {}
+        for name in names:
+            key = Station.normalize(name)
+            if key not in self.by_key:
+                missing.setdefault(key, Station(name=Station.clean_name(name), key=key))
+        if missing:
+            # another import may have created some of them meanwhile
+            Station.objects.bulk_create(missing.values(), ignore_conflicts=True)
+            self.by_key.update(Station.objects.filter(key__in=missing).values_list("key", "id"))
+        return [self.by_key[Station.normalize(name)] for name in names]
+
+
+class TripRows:
+    model = Trip
+
+    def __init__(self):
+        self.buses = BusLookup()
+        self.stations = StationLookup()
+
+    def build(self, row: dict) -> tuple[Trip, tuple[str, str]]:
+        errors = {}
+        source = _text(row, "source", 63, errors)
+        destination = _text(row, "destination", 63, errors)
+        departure = _datetime(row, "departure", errors)
+        arrival = _datetime(row, "arrival", errors, required=False)
+        bus_id = None
+        try:
+            bus_id = self.buses.resolve(row.get("bus"))
+        except KeyError as error:
+            errors["bus"] = error.args[0]
+        if arrival and departure and arrival <= departure:
+            errors["arrival"] = "arrival must be after departure"
+        if errors:
+            raise RowError(errors)
+        trip = Trip(departure=departure, arrival=arrival, bus_id=bus_id)
+        return trip, (source, destination)
+
+    def write(self, objects: list):
+        station_ids = iter(self.stations.resolve([name for _, names in objects for name in names]))
+        for trip, _ in objects:
+            trip.source_id = next(station_ids)
+            trip.destination_id = next(station_ids)
+        Trip.objects.bulk_create(trip for trip, _ in objects)
+
+    def finish(self):
+        caching.bump_version(Station)
+        caching.bump_version(Trip)
+        transaction.on_commit(routing.index.clear)
+        transaction.on_commit(autocomplete.index.clear)
+
+
+class BusRows:
+    model = Buss
+
+    def __init__(self):
+        self.facilities = {
+            name: (facility_id, bit)
+            for name, facility_id, bit in Facility.objects.values_list("name", "id", "bit")
+        }
+
+    def build(self, row: dict) -> tuple[Buss, list[int]]:
+        errors = {}
+        info = _text(row, "info", 255, errors, required=False)
+        try:
+            num_seats = int(row.get("num_seats"))
+            if num_seats < 1:
+                raise ValueError
+        except (TypeError, ValueError):
+            num_seats = None
+            errors["num_seats"] = "A positive integer is required."
+
+        names = row.get("facilities") or []
+        if isinstance(names, str):
+            names = [name.strip() for name in names.split(";") if name.strip()]
+        if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+            errors["facilities"] = "A list of facility names or names separated by ';' is expected."
+            names = []
+        unknown = [name for name in names if name not in self.facilities]
+        if unknown:
+            errors["facilities"] = f"Unknown facilities: {', '.join(unknown)}."
+        if errors:
+            raise RowError(errors)
+        facilities = [self.facilities[name] for name in names]
+        mask = 0
+        for _, bit in facilities:
+            mask |= 1 << bit
+        bus = Buss(info=info, num_seats=num_seats, facility_mask=mask)
+        return bus, [facility_id for facility_id, _ in facilities]
+
+    def write(self, objects: list):
+        buses = Buss.objects.bulk_create(bus for bus, _ in objects)
+        Buss.facilities.through.objects.bulk_create(
+            Buss.facilities.through(buss_id=bus.id, facility_id=facility_id)
+            for bus, (_, facility_ids) in zip(buses, objects)
+            for facility_id in facility_ids
+        )
+
+    def finish(self):
+        caching.bump_version(Buss)
+
+
+def import_rows(
+        kind: str,
+        stream: TextIO,
+        file_format: str = "csv",
+        on_reject: Optional[Callable[[dict], None]] = None,
+        chunk_size: int = CHUNK_SIZE,
+        dry_run: bool = False,
+) -> ImportResult:
+    """
+    Import `stream` into the `kind` table and return the row counts.
+
+    Every chunk is committed on its own, so an interrupted import keeps the
+    chunks written so far. Every rejected row is passed to `on_reject` as
+    ``{"line", "row", "errors"}``.
+    """
+    rows = {"buses": BusRows, "trips": TripRows}[kind]()
+    result = ImportResult(kind)
+
+    def flush(chunk):
+        if chunk and not dry_run:
+            with transaction.atomic():
+                rows.write(chunk)
+        result.created += len(chunk)
+
+    chunk = []
+    for line_number, row in read_rows(stream, file_format):
+        result.rows += 1
+        try:
+            if "__error__" in row:
+                raise RowError({"row": row.pop("__error__")})
+            chunk.append(rows.build(row))
+        except RowError as error:
+            result.rejected += 1
+            if on_reject is not None:
+                on_reject({"line": line_number, "row": row, "errors": error.errors})
+            continue
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+    flush(chunk)
+
+    if result.created and not dry_run:
+        rows.finish()
+    return result
+
+
+def text_stream(binary) -> io.TextIOWrapper:
+    """
+    Decode an uploaded or opened binary file lazily, tolerating a BOM.
+    Invalid bytes become `UNDECODABLE` characters, rejected by `read_rows`.
+    """
+    return io.TextIOWrapper(binary, encoding="utf-8-sig", errors="surrogateescape", newline="")
@@ -0,0 +1,57 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from station import archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Move trips departed before a cutoff, with their tickets, into the archive tables "
+        "in batches; orders keep listing the archived tickets"
+    )
+
+    def add_arguments(self, parser):
+        cutoff = parser.add_mutually_exclusive_group()
+        cutoff.add_argument("--before", help="Archive trips departed before this date or datetime")
+        cutoff.add_argument(
+            "--days", type=int,
+            help="Archive trips departed more than this many days ago (default: TRIP_ARCHIVE['AFTER_DAYS'])"
+        )
+        parser.add_argument("--batch-size", type=int, help="Trips moved per transaction")
+        parser.add_argument("--dry-run", action="store_true", help="Only count what would be archived")
+
+    def handle(self, *args, **options):
+        if options["before"]:
+            before = self._parse(options["before"])
+        elif options["days"] is not None:
+            before = timezone.now() - datetime.timedelta(days=options["days"])
+        else:
+            before = archive.default_cutoff()
+        if options["batch_size"] is not None and options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        result = archive.archive_trips(before, options["batch_size"], dry_run=options["dry_run"])
+
+        verb = "Would archive" if options["dry_run"] else "Archived"
+        self.stdout.write(
+            f"{verb} {result.trips} trip(s) and {result.tickets} ticket(s) departed before "
+            f"{before.isoformat()}" + ("" if options["dry_run"] else f" in {result.batches} batch(es)")
+        )
+
+    @staticmethod
+    def _parse(value: str) -> datetime.datetime:
+        try:
+            day = parse_date(value)
+            moment = None if day else parse_datetime(value)
+        except ValueError:
+            day = moment = None
+        if day is not None:
+            moment = datetime.datetime.combine(day, datetime.time.min)
+        if moment is None:
+            raise CommandError(f"--before expects a date or datetime, not '{value}'")
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
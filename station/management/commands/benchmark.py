@@ -0,0 +1,147 @@
+import json
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from station import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic dataset and measure p50/p95/p99 latency and query counts "
+        "of every station and user endpoint"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale",
+            choices=benchmark.SCALES,
+            default="tiny",
+            help="Dataset size, individual counts below override it"
+        )
+        for name in ("buses", "trips", "tickets", "users"):
+            parser.add_argument(f"--{name}", type=int)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--requests", type=int, default=50, help="Measured requests per endpoint")
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument("--endpoint", action="append", help="Only measure endpoints containing this name")
+        parser.add_argument(
+            "--use-existing",
+            action="store_true",
+            help="Measure the configured database as is instead of a generated throwaway one"
+        )
+        parser.add_argument(
+            "--include-writes",
+            action="store_true",
+            help="Also measure endpoints creating users and tokens with --use-existing"
+        )
+        parser.add_argument("--output", help="Write results as JSON to this file")
+        parser.add_argument("--compare", help="Results file of an earlier run to compare against")
+        parser.add_argument("--threshold", type=float, default=0.1, help="Allowed p95 slowdown, 0.1 is 10%%")
+
+    def handle(self, *args, **options):
+        previous = None
+        if options["compare"]:
+            with open(options["compare"]) as file:
+                previous = json.load(file)
+
+        with benchmark.benchmark_settings():
+            if options["use_existing"]:
+                results = self._run(options, dataset=None)
+            else:
+                with benchmark.throwaway_database():
+                    results = self._run(options, dataset=self._generate(options))
+
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(results, file, indent=2)
+
+        self._print_results(results["results"])
+        for name in results["skipped"]:
+            self.stdout.write(f"skipped {name}: no sample object")
+        if options["use_existing"] and not options["include_writes"]:
+            self.stdout.write("skipped endpoints creating users and tokens, see --include-writes")
+
+        if previous is not None:
+            rows = benchmark.compare(previous, results, options["threshold"])
+            self._print_comparison(rows)
+            if any(row["regression"] for row in rows):
+                raise CommandError("Performance regressed compared to " + options["compare"])
+
+    def _generate(self, options) -> dict:
+        counts = dict(benchmark.SCALES[options["scale"]])
+        counts.update({name: options[name] for name in counts if options[name] is not None})
+        return benchmark.generate_dataset(
+            **counts,
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+            log=lambda message: self.stderr.write(message) if options["verbosity"] > 1 else None
+        )
+
+    def _run(self, options, dataset) -> dict:
+        user = benchmark.benchmark_user()
+        if user is None:
+            raise CommandError("The database has no users to authenticate as")
+
+        # users created by the measured requests would stay in an existing database
+        endpoints, skipped = benchmark.discover_endpoints(
+            user, include_writes=dataset is not None or options["include_writes"]
+        )
+        if options["endpoint"]:
+            endpoints = [
+                endpoint for endpoint in endpoints
+                if any(name in endpoint.name for name in options["endpoint"])
+            ]
+
+        results = []
+        for endpoint in endpoints:
+            if options["verbosity"] > 1:
+                self.stderr.write(f"measuring {endpoint.name}")
+            results.append(benchmark.measure(endpoint, user, options["requests"], options["warmup"]))
+
+        return {
+            "commit": self._git_commit(),
+            "created_at": timezone.now().isoformat(),
+            "python": sys.version.split()[0],
+            "database": settings.DATABASES["default"]["ENGINE"],
+            "dataset": dataset,
+            "results": results,
+            "skipped": skipped,
+        }
+
+    @staticmethod
+    def _git_commit():
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "HEAD"],
+                cwd=settings.BASE_DIR,
+                capture_output=True,
+                text=True,
+                check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def _print_results(self, results):
+        self.stdout.write(
+            f"{'endpoint':<30}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>10}  status"
+        )
+        for result in results:
+            self.stdout.write(
+                f"{result['endpoint']:<30}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+                f"{result['p99_ms']:>10.2f}{result['queries']:>10.1f}  "
+                + ",".join(map(str, result["statuses"]))
+            )
+
+    def _print_comparison(self, rows):
+        self.stdout.write(f"\n{'endpoint':<30}{'p95 before':>12}{'p95 after':>12}{'change':>9}{'queries':>12}")
+        for row in rows:
+            line = (
+                f"{row['endpoint']:<30}{row['p95_before_ms']:>12.2f}{row['p95_after_ms']:>12.2f}"
+                f"{row['p95_change']:>+9.1%}{row['queries_before']:>6.1f}->{row['queries_after']:<5.1f}"
+            )
+            self.stdout.write(self.style.ERROR(line) if row["regression"] else line)
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.test import Client, AsyncClient
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from station import benchmark
+from station.models import Buss, Trip
+
+ENDPOINTS = (
+    ("trip-list", False),
+    ("trip-detail", True),
+    ("buss-list", False),
+    ("buss-detail", True),
+    ("order-list", False),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests/sec of the DRF read endpoints through the WSGI handler "
+        "with their async versions through the ASGI handler, on a throwaway database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint and handler")
+        parser.add_argument("--concurrency", type=int, default=20)
+        parser.add_argument("--buses", type=int, default=20)
+        parser.add_argument("--trips", type=int, default=500)
+        parser.add_argument("--json", action="store_true", help="Print results as JSON")
+
+    def handle(self, *args, **options):
+        with benchmark.benchmark_settings(), benchmark.throwaway_database():
+            benchmark.generate_dataset(
+                buses=options["buses"],
+                trips=options["trips"],
+                tickets=options["trips"] * 2,
+                users=20
+            )
+            results = self._run(options)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"{'endpoint':<14}{'wsgi req/s':>12}{'asgi req/s':>12}")
+        for result in results:
+            self.stdout.write(
+                f"{result['endpoint']:<14}{result['wsgi_rps']:>12.1f}{result['asgi_rps']:>12.1f}"
+            )
+
+    def _run(self, options):
+        user = benchmark.benchmark_user()
+        bus = Buss.objects.order_by("pk").first()
+        trip = Trip.objects.order_by("pk").first()
+        token = str(AccessToken.for_user(user))
+        total, concurrency = options["requests"], options["concurrency"]
+
+        results = []
+        for name, detail in ENDPOINTS:
+            pk = (trip.id if name.startswith("trip") else bus.id) if detail else None
+            args = (pk,) if detail else ()
+            results.append({
+                "endpoint": name,
+                "wsgi_rps": self._wsgi_rps(reverse(f"station:{name}", args=args), token, total, concurrency),
+                "asgi_rps": asyncio.run(
+                    self._asgi_rps(reverse(f"station-async:{name}", args=args), token, total, concurrency)
+                ),
+            })
+        return results
+
+    @staticmethod
+    def _wsgi_rps(url, token, total, concurrency) -> float:
+        def request(_):
+            response = Client().get(url, HTTP_AUTHORIZATION=f"Bearer {token}")
+            assert response.status_code == 200, response.content
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(request, range(total)))
+        return total / (time.perf_counter() - started)
+
+    @staticmethod
+    async def _asgi_rps(url, token, total, concurrency) -> float:
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def request():
+            async with semaphore:
+                response = await client.get(url, headers={"Authorization": f"Bearer {token}"})
+                assert response.status_code == 200, response.content
+
+        started = time.perf_counter()
+        await asyncio.gather(*(request() for _ in range(total)))
+        return total / (time.perf_counter() - started)
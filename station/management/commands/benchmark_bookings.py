@@ -0,0 +1,133 @@
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from station import benchmark, booking
+from station.models import Trip
+
+MODES = ("default", "production")
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure bookings/sec of concurrent order requests against a throwaway SQLite file, "
+        "with the stock settings and with the SQLite production mode (WAL, IMMEDIATE "
+        "transactions, single-writer booking queue)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bookings", type=int, default=500, help="Orders placed per mode")
+        parser.add_argument("--threads", type=int, default=16, help="Concurrent clients")
+        parser.add_argument("--trips", type=int, default=20)
+        parser.add_argument("--mode", choices=MODES, action="append", help="Modes to run, all by default")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--json", action="store_true", help="Print results as JSON")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite" or not hasattr(connection, "_start_transaction_under_autocommit"):
+            raise CommandError("The booking benchmark needs the SQLite backend of app.sqlite3")
+
+        results = [self._run_mode(mode, options) for mode in options["mode"] or MODES]
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f"{'mode':<12}{'bookings/s':>12}{'booked':>8}{'conflict':>10}"
+            f"{'refused':>9}{'failed':>8}{'commits':>9}"
+        )
+        for result in results:
+            self.stdout.write(
+                f"{result['mode']:<12}{result['bookings_per_second']:>12.1f}{result['booked']:>8}"
+                f"{result['conflicts']:>10}{result['refused']:>9}{result['failed']:>8}"
+                f"{result['commits']:>9}"
+            )
+
+    def _run_mode(self, mode: str, options: dict) -> dict:
+        production = mode == "production"
+        settings_dict = connection.settings_dict
+        saved = {key: settings_dict[key] for key in ("OPTIONS", "CONN_MAX_AGE")}
+        settings_dict["OPTIONS"] = dict(settings.SQLITE_PRODUCTION_OPTIONS) if production else {}
+        settings_dict["CONN_MAX_AGE"] = 600 if production else 0
+        connection.close()
+
+        queue_settings = {**settings.BOOKING_QUEUE, "ENABLED": production}
+        try:
+            with tempfile.TemporaryDirectory() as directory, \
+                    benchmark.benchmark_settings(), \
+                    override_settings(BOOKING_QUEUE=queue_settings), \
+                    benchmark.throwaway_database(os.path.join(directory, "bookings.sqlite3")):
+                benchmark.generate_dataset(
+                    buses=max(1, options["trips"] // 2),
+                    trips=options["trips"],
+                    tickets=0,
+                    users=1,
+                    seed=options["seed"]
+                )
+                result = self._book(options)
+                result["commits"] = booking.get_queue().batches if production else result["booked"]
+        finally:
+            settings_dict.update(saved)
+            connection.close()
+
+        result["mode"] = mode
+        return result
+
+    @staticmethod
+    def _book(options: dict) -> dict:
+        user = get_user_model().objects.create_user(
+            email="booking@bench.test", password=benchmark.PASSWORD, is_staff=True
+        )
+        token = str(AccessToken.for_user(user))
+        free_seats = [
+            (trip.id, seat)
+            for trip in Trip.objects.select_related("bus")
+            for seat in range(1, trip.bus.num_seats + 1)
+        ]
+        random.Random(options["seed"]).shuffle(free_seats)
+        if len(free_seats) < options["bookings"]:
+            raise CommandError(f"Only {len(free_seats)} seats, use more --trips")
+        url = reverse("station:order-list")
+
+        def request(seat) -> int:
+            response = Client(raise_request_exception=False).post(
+                url,
+                {"tickets": [{"trip": seat[0], "seat": seat[1]}]},
+                content_type="application/json",
+                HTTP_AUTHORIZATION=f"Bearer {token}"
+            )
+            return response.status_code
+
+        # "database is locked" errors would log a traceback per request
+        request_logger = logging.getLogger("django.request")
+        disabled, request_logger.disabled = request_logger.disabled, True
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=options["threads"]) as executor:
+                statuses = list(executor.map(request, free_seats[:options["bookings"]]))
+        finally:
+            request_logger.disabled = disabled
+        elapsed = time.perf_counter() - started
+
+        booked = statuses.count(201)
+        return {
+            "bookings": len(statuses),
+            "booked": booked,
+            "conflicts": statuses.count(400),
+            "refused": statuses.count(503),
+            "failed": sum(1 for status in statuses if status not in (201, 400, 503)),
+            "seconds": round(elapsed, 3),
+            "bookings_per_second": booked / elapsed,
+        }
@@ -0,0 +1,37 @@
+import pathlib
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app import schema
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the OpenAPI schema into OPENAPI_SCHEMA_DIR for app.schema.SchemaView, "
+        "or with --check fail if the stored schema is out of date"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", help="Directory to write to, OPENAPI_SCHEMA_DIR by default")
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only compare the stored schema with the code, exit with an error if it differs"
+        )
+
+    def handle(self, *args, **options):
+        directory = pathlib.Path(options["output"]) if options["output"] else schema.schema_dir()
+        rendered = schema.generate()
+
+        if options["check"]:
+            stale = schema.stale_formats(rendered, directory)
+            if stale:
+                raise CommandError(
+                    f"The schema in {directory} is out of date ({', '.join(stale)}), "
+                    f"run `manage.py build_schema`"
+                )
+            self.stdout.write(f"The schema in {directory} is up to date")
+            return
+
+        schema.write(rendered, directory)
+        self.stdout.write(f"Wrote {', '.join(schema.FILES.values())} to {directory}")
@@ -0,0 +1,50 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from station import importer
+
+
+class Command(BaseCommand):
+    help = "Stream buses or trips from a CSV (with header) or JSONL file into the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=importer.KINDS)
+        parser.add_argument("path", help="File to import, - reads stdin")
+        parser.add_argument("--format", choices=importer.FORMATS, help="Guessed from the file name by default")
+        parser.add_argument("--rejects", help="Write rejected rows as JSONL to this file")
+        parser.add_argument("--chunk-size", type=int, default=importer.CHUNK_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="Validate without writing")
+
+    def handle(self, *args, **options):
+        file_format = options["format"] or importer.detect_format(options["path"])
+        rejects = open(options["rejects"], "w") if options["rejects"] else None
+        try:
+            if options["path"] == "-":
+                stream = importer.text_stream(sys.stdin.buffer)
+            else:
+                try:
+                    stream = importer.text_stream(open(options["path"], "rb"))
+                except OSError as error:
+                    raise CommandError(error)
+            with stream:
+                result = importer.import_rows(
+                    options["kind"],
+                    stream,
+                    file_format,
+                    on_reject=(
+                        (lambda record: rejects.write(json.dumps(record, default=str) + "\n"))
+                        if rejects else None
+                    ),
+                    chunk_size=options["chunk_size"],
+                    dry_run=options["dry_run"]
+                )
+        finally:
+            if rejects is not None:
+                rejects.close()
+
+        verb = "Validated" if options["dry_run"] else "Imported"
+        self.stdout.write(
+            f"{verb} {result.created} of {result.rows} {result.kind} row(s), rejected {result.rejected}"
+        )
@@ -0,0 +1,59 @@
+import itertools
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from station import seats
+from station.models import Trip, Ticket
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare every trip's seat map and seats_sold counter with its tickets, "
+        "and with --fix rewrite the trips that drifted"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", help="Repair drifted trips")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        checked = drifted = 0
+        trip_ids = Trip.objects.order_by("id").values_list("id", flat=True).iterator()
+        while batch := list(itertools.islice(trip_ids, options["batch_size"])):
+            checked += len(batch)
+            for trip_id in self._drifted(batch):
+                drifted += 1
+                if options["fix"]:
+                    self._repair(trip_id)
+
+        action = "repaired" if options["fix"] else "drifted"
+        self.stdout.write(f"Checked {checked} trip(s), {drifted} {action}")
+
+    def _drifted(self, trip_ids) -> list[int]:
+        sold = {}
+        for trip_id, seat in Ticket.objects.filter(trip_id__in=trip_ids).values_list("trip_id", "seat"):
+            sold.setdefault(trip_id, []).append(seat)
+
+        drifted = []
+        rows = Trip.objects.filter(id__in=trip_ids).values_list("id", "seat_map", "seats_sold")
+        for trip_id, seat_map, seats_sold in rows:
+            expected = seats.occupy(b"", sold.get(trip_id, ()))
+            actual = seats.taken_seats(seat_map)
+            if actual != seats.taken_seats(expected) or seats_sold != len(actual):
+                if self.verbosity > 1:
+                    self.stdout.write(
+                        f"trip {trip_id}: seat map {actual}, "
+                        f"seats_sold {seats_sold}, tickets {sorted(sold.get(trip_id, ()))}"
+                    )
+                drifted.append(trip_id)
+        return drifted
+
+    @staticmethod
+    def _repair(trip_id: int):
+        with transaction.atomic():
+            trip = Trip.objects.select_for_update().only("held_seat_map").get(pk=trip_id)
+            seat_map = seats.occupy(b"", Ticket.objects.filter(trip_id=trip_id).values_list("seat", flat=True))
+            Trip.objects.filter(pk=trip_id).update(seat_map=seat_map, seats_sold=seats.count(seat_map))
+            Trip.seat_map_changed(trip_id, seats.union(seat_map, trip.held_seat_map))
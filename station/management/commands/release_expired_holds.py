@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from station.models import SeatHold
+
+
+class Command(BaseCommand):
+    help = "Free the seats of expired seat holds"
+
+    def handle(self, *args, **options):
+        released = SeatHold.release_expired()
+        self.stdout.write(f"Released {released} expired hold(s)")
@@ -0,0 +1,32 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database onto every configured read replica"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pages", type=int, default=1024, help="Pages copied per backup step")
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            self.stdout.write("No replicas configured, set DATABASE_REPLICA_PATHS")
+            return
+
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != "sqlite":
+            raise CommandError("Replicas of a non-SQLite primary are kept by the database itself")
+        primary.ensure_connection()
+
+        for alias in settings.DATABASE_REPLICAS:
+            connections[alias].close()
+            target = sqlite3.connect(connections[alias].settings_dict["NAME"])
+            try:
+                # the backup API copies a consistent snapshot while writers keep going
+                primary.connection.backup(target, pages=options["pages"])
+            finally:
+                target.close()
+            self.stdout.write(f"Synced {alias}")
@@ -0,0 +1,181 @@
+"""
+In-process request metrics.
+
+`station.middleware.RequestMetricsMiddleware` feeds one `RequestSample`
+per sampled request into the module `registry`, which keeps fixed-bucket
+histograms of latency, SQL query count and SQL time per view action,
+plus the queries most often repeated within a single request (the
+fingerprint of an N+1 pattern). Every worker process aggregates its own
+requests, `registry.snapshot()` is served by `MetricsView`.
+"""
+import bisect
+import collections
+import dataclasses
+import re
+import threading
+
+from django.conf import settings
+
+
+def _setting(name: str):
+    defaults = {
+        "ENABLED": False,
+        # fraction of requests that are measured, 0 keeps only the sampling check
+        "SAMPLE_RATE": 1.0,
+        # emit a JSON log line to the "station.metrics" logger per sampled request
+        "LOG": True,
+        # duplicate fingerprints kept per view action
+        "MAX_DUPLICATES": 20,
+    }
+    return getattr(settings, "REQUEST_METRICS", {}).get(name, defaults[name])
+
+
+def enabled() -> bool:
+    return _setting("ENABLED")
+
+
+def sample_rate() -> float:
+    return _setting("SAMPLE_RATE")
+
+
+def log_enabled() -> bool:
+    return _setting("LOG")
+
+
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+_placeholder_list = re.compile(r"%s(?:\s*,\s*%s)+")
+_string_literal = re.compile(r"'(?:[^']|'')*'")
+_number_literal = re.compile(r"\b\d+(?:\.\d+)?\b")
+_whitespace = re.compile(r"\s+")
+
+
+def fingerprint(sql: str) -> str:
+    """Normalise SQL so queries differing only in parameters compare equal"""
+    sql = _string_literal.sub("?", sql)
+    sql = _number_literal.sub("?", sql)
+    sql = _placeholder_list.sub("%s, ...", sql)
+    return _whitespace.sub(" ", sql).strip()
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        # the last bucket counts values above the highest bound
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.sum = 0.0
+
+    def add(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += 1
+        self.sum += value
+
+    def percentile(self, percent: float):
+        """Upper bound of the bucket holding the percentile, None above all bounds"""
+        if not self.total:
+            return None
+        rank = percent / 100 * self.total
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return None
+
+    def as_dict(self) -> dict:
+        buckets = {f"le_{bound}": count for bound, count in zip(self.bounds, self.counts)}
+        buckets["inf"] = self.counts[-1]
+        return {
+            "count": self.total,
+            "sum": round(self.sum, 3),
+            "mean": round(self.sum / self.total, 3) if self.total else None,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "buckets": buckets,
+        }
+
+
+@dataclasses.dataclass
+class RequestSample:
+    view: str
+    method: str
+    status: int
+    duration_ms: float
+    queries: int
+    sql_ms: float
+    # fingerprint -> executions within the request, only those run more than once
+    duplicates: dict
+
+    def as_log(self) -> dict:
+        return {
+            "view": self.view,
+            "method": self.method,
+            "status": self.status,
+            "duration_ms": round(self.duration_ms, 3),
+            "queries": self.queries,
+            "sql_ms": round(self.sql_ms, 3),
+            "duplicate_queries": sum(count - 1 for count in self.duplicates.values()),
+        }
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.errors = 0
+        self.latency = Histogram(LATENCY_BUCKETS_MS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.sql_time = Histogram(LATENCY_BUCKETS_MS)
+        self.duplicates = collections.Counter()
+
+    def add(self, sample: RequestSample):
+        if sample.status >= 500:
+            self.errors += 1
+        self.latency.add(sample.duration_ms)
+        self.queries.add(sample.queries)
+        self.sql_time.add(sample.sql_ms)
+        for query, count in sample.duplicates.items():
+            self.duplicates[query] += count - 1
+        limit = _setting("MAX_DUPLICATES")
+        if len(self.duplicates) > 2 * limit:
+            self.duplicates = collections.Counter(dict(self.duplicates.most_common(limit)))
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.latency.total,
+            "errors": self.errors,
+            "latency_ms": self.latency.as_dict(),
+            "queries": self.queries.as_dict(),
+            "sql_ms": self.sql_time.as_dict(),
+            "duplicate_queries": [
+                {"fingerprint": query, "extra_executions": count}
+                for query, count in self.duplicates.most_common(_setting("MAX_DUPLICATES"))
+            ],
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = collections.defaultdict(ViewMetrics)
+
+    def record(self, sample: RequestSample):
+        with self._lock:
+            self._views[sample.view].add(sample)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            views = {view: metrics.as_dict() for view, metrics in sorted(self._views.items())}
+        return {
+            "enabled": enabled(),
+            "sample_rate": sample_rate(),
+            "views": views,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+registry = MetricsRegistry()
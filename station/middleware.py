@@ -0,0 +1,121 @@
+import collections
+import contextlib
+import json
+import logging
+import random
+import time
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from station import metrics, replicas
+
+logger = logging.getLogger("station.metrics")
+
+
+def view_action(view_func, method: str) -> str:
+    """`TripViewSet.list` for viewsets, the view name for anything else"""
+    view_class = getattr(view_func, "cls", None) or getattr(view_func, "view_class", None)
+    if view_class is None:
+        return f"{view_func.__module__}.{view_func.__qualname__}"
+    actions = getattr(view_func, "actions", None) or {}
+    return f"{view_class.__name__}.{actions.get(method.lower(), method.lower())}"
+
+
+class QueryRecorder:
+    """`connection.execute_wrapper` counting queries, their time and repeats"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = collections.Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.fingerprints[sql] += 1
+
+    def duplicates(self) -> dict:
+        repeated = collections.Counter()
+        for sql, count in self.fingerprints.items():
+            repeated[metrics.fingerprint(sql)] += count
+        return {query: count for query, count in repeated.items() if count > 1}
+
+
+class RequestMetricsMiddleware:
+    """
+    Record latency and SQL statistics of a sample of requests.
+
+    Removes itself from the chain unless REQUEST_METRICS["ENABLED"] is set,
+    so it costs nothing when switched off. Queries run on every database
+    connection in the request thread are seen, replicas included, which
+    excludes the ORM calls of async views.
+    """
+
+    def __init__(self, get_response):
+        if not metrics.enabled():
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sample_rate = metrics.sample_rate()
+        if sample_rate <= 0 or (sample_rate < 1 and random.random() >= sample_rate):
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with contextlib.ExitStack() as wrappers:
+            for alias in connections:
+                wrappers.enter_context(connections[alias].execute_wrapper(recorder))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        sample = metrics.RequestSample(
+            view=getattr(request, "metrics_view", "unresolved"),
+            method=request.method,
+            status=response.status_code,
+            duration_ms=duration * 1000,
+            queries=recorder.count,
+            sql_ms=recorder.duration * 1000,
+            duplicates=recorder.duplicates()
+        )
+        metrics.registry.record(sample)
+        if metrics.log_enabled():
+            logger.info(json.dumps(sample.as_log()))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = view_action(view_func, request.method)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Expose the request to `replicas.PrimaryReplicaRouter`, and keep the
+    reads of a user on the primary after a successful write
+    """
+
+    def __init__(self, get_response):
+        if not replicas.replica_aliases():
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = replicas.begin_request(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            replicas.end_request(token)
+
+        user = getattr(request, "user", None)
+        if (
+            request.method not in replicas.SAFE_METHODS
+            and response.status_code < 400
+            and user is not None
+            and user.is_authenticated
+        ):
+            replicas.stick_to_primary(user.pk)
+        return response
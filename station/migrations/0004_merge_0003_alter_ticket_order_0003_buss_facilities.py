@@ -0,0 +1,14 @@
+# Generated by Django 5.0.6 on 2026-10-18 07:50
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('station', '0003_alter_ticket_order'),
+        ('station', '0003_buss_facilities'),
+    ]
+
+    operations = [
+    ]
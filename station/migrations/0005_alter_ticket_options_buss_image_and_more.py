@@ -0,0 +1,39 @@
+# Generated by Django 5.0.6 on 2026-10-18 07:50
+
+import django.db.models.deletion
+import station.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('station', '0004_merge_0003_alter_ticket_order_0003_buss_facilities'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='ticket',
+            options={'ordering': ('seat',)},
+        ),
+        migrations.AddField(
+            model_name='buss',
+            name='image',
+            field=models.ImageField(null=True, upload_to=station.models.bus_image_path),
+        ),
+        migrations.AlterField(
+            model_name='buss',
+            name='facilities',
+            field=models.ManyToManyField(blank=True, related_name='busses', to='station.facility'),
+        ),
+        migrations.AlterField(
+            model_name='facility',
+            name='name',
+            field=models.CharField(max_length=255, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='ticket',
+            name='trip',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tickets', to='station.trip'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.6 on 2026-10-18 07:52
+
+from django.db import migrations, models
+
+from station import seats
+
+
+def fill_seat_maps(apps, schema_editor):
+    Trip = apps.get_model("station", "Trip")
+    Ticket = apps.get_model("station", "Ticket")
+
+    taken = {}
+    for trip_id, seat in Ticket.objects.values_list("trip_id", "seat").iterator():
+        taken.setdefault(trip_id, []).append(seat)
+
+    for trip_id, trip_seats in taken.items():
+        Trip.objects.filter(pk=trip_id).update(seat_map=seats.occupy(b"", trip_seats))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('station', '0005_alter_ticket_options_buss_image_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trip',
+            name='seat_map',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.RunPython(fill_seat_maps, migrations.RunPython.noop),
+    ]
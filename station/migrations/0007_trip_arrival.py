@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 07:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('station', '0006_trip_seat_map'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trip',
+            name='arrival',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 08:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('station', '0008_seat_hold'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='buss',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+from station import seats
+
+
+def fill_seats_sold(apps, schema_editor):
+    Trip = apps.get_model("station", "Trip")
+
+    for trip_id, seat_map in Trip.objects.exclude(seat_map=b"").values_list("id", "seat_map").iterator():
+        Trip.objects.filter(pk=trip_id).update(seats_sold=seats.count(bytes(seat_map)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('station', '0009_buss_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trip',
+            name='seats_sold',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_seats_sold, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations, models
+
+
+def fill_facility_masks(apps, schema_editor):
+    Facility = apps.get_model("station", "Facility")
+    Buss = apps.get_model("station", "Buss")
+
+    bits = {}
+    for bit, facility in enumerate(Facility.objects.order_by("id")):
+        facility.bit = bit
+        facility.save(update_fields=["bit"])
+        bits[facility.id] = bit
+
+    masks = {}
+    for bus_id, facility_id in Buss.facilities.through.objects.values_list("buss_id", "facility_id").iterator():
+        masks[bus_id] = masks.get(bus_id, 0) | 1 << bits[facility_id]
+    for bus_id, mask in masks.items():
+        Buss.objects.filter(pk=bus_id).update(facility_mask=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('station', '0010_trip_seats_sold'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='buss',
+            name='facility_mask',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='facility',
+            name='bit',
+            field=models.PositiveSmallIntegerField(editable=False, null=True, unique=True),
+        ),
+        migrations.RunPython(fill_facility_masks, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='facility',
+            name='bit',
+            field=models.PositiveSmallIntegerField(editable=False, unique=True),
+        ),
+    ]
@@ -0,0 +1,114 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def normalize(name):
+    return " ".join(name.split()).casefold()
+
+
+def create_stations(apps, schema_editor):
+    """One station per name ignoring case and spacing, called by its most used spelling"""
+    Station = apps.get_model("station", "Station")
+    Trip = apps.get_model("station", "Trip")
+
+    counts = {}
+    for field in ("source", "destination"):
+        for name, count in Trip.objects.values_list(field).annotate(count=models.Count("id")):
+            counts[name] = counts.get(name, 0) + count
+
+    spellings = {}
+    for name, count in counts.items():
+        spellings.setdefault(normalize(name), []).append((-count, " ".join(name.split())))
+    stations = {
+        key: Station.objects.create(key=key, name=min(names)[1])
+        for key, names in spellings.items()
+    }
+
+    for name in counts:
+        station = stations[normalize(name)]
+        Trip.objects.filter(source=name).update(source_station=station)
+        Trip.objects.filter(destination=name).update(destination_station=station)
+
+
+def restore_names(apps, schema_editor):
+    Station = apps.get_model("station", "Station")
+    Trip = apps.get_model("station", "Trip")
+    for station in Station.objects.all():
+        Trip.objects.filter(source_station=station).update(source=station.name)
+        Trip.objects.filter(destination_station=station).update(destination=station.name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('station', '0011_facility_bit_buss_facility_mask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Station',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=63)),
+                ('key', models.CharField(editable=False, max_length=255, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='source_station',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='station.station'),
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='destination_station',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='station.station'),
+        ),
+        # only nullable so the names can be filled in again when unapplied
+        migrations.AlterField(
+            model_name='trip',
+            name='source',
+            field=models.CharField(max_length=63, null=True),
+        ),
+        migrations.AlterField(
+            model_name='trip',
+            name='destination',
+            field=models.CharField(max_length=63, null=True),
+        ),
+        migrations.RunPython(create_stations, restore_names),
+        migrations.RemoveIndex(
+            model_name='trip',
+            name='station_tri_source_1ae98f_idx',
+        ),
+        migrations.RemoveField(
+            model_name='trip',
+            name='source',
+        ),
+        migrations.RemoveField(
+            model_name='trip',
+            name='destination',
+        ),
+        migrations.RenameField(
+            model_name='trip',
+            old_name='source_station',
+            new_name='source',
+        ),
+        migrations.RenameField(
+            model_name='trip',
+            old_name='destination_station',
+            new_name='destination',
+        ),
+        migrations.AlterField(
+            model_name='trip',
+            name='source',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='departures', to='station.station'),
+        ),
+        migrations.AlterField(
+            model_name='trip',
+            name='destination',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='arrivals', to='station.station'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['source', 'destination'], name='station_tri_source__b96324_idx'),
+        ),
+    ]
@@ -1,15 +1,41 @@
 import pathlib
 import uuid
 
-from django.db import models
-from django.db.models import UniqueConstraint
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Subquery, Sum, UniqueConstraint, Value
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
+from django.utils import timezone
 from django.utils.text import slugify
 
 from app import settings
+from station import seats
+
+
+# Sent with `trip_id` and a `seat_map` of its unavailable (sold or held) seats
+# once a change of sold or held seats is committed
+seat_map_changed = Signal()
+
+
+class CacheVersion(models.Model):
+    """Change counter of a model, the shared part of `station.caching`"""
+    # `Model._meta.label_lower`
+    label = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    # time of the last bump, the Last-Modified of responses depending on the model
+    modified = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.label} v{self.version}"
 
 
 class Facility(models.Model):
+    # facility_mask of a bus has this bit set while the bus has the facility
+    MAX_FACILITIES = 63
+
     name = models.CharField(max_length=255, unique=True)
+    bit = models.PositiveSmallIntegerField(unique=True, editable=False)
 
     class Meta:
         verbose_name = "facilities"
@@ -17,6 +43,45 @@ class Facility(models.Model):
     def __str__(self):
         return self.name
 
+    @property
+    def mask(self) -> int:
+        return 1 << self.bit
+
+    @classmethod
+    def free_bit(cls):
+        used = set(cls.objects.values_list("bit", flat=True))
+        return next((bit for bit in range(cls.MAX_FACILITIES) if bit not in used), None)
+
+    def save(self, *args, **kwargs):
+        if self.bit is not None:
+            return super().save(*args, **kwargs)
+        for _ in range(self.MAX_FACILITIES):
+            self.bit = self.free_bit()
+            if self.bit is None:
+                break
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                # a concurrent save took the bit, anything else is not retried
+                taken = Facility.objects.filter(bit=self.bit).exists()
+                self.bit = None
+                if not taken:
+                    raise
+        raise ValidationError(f"There can be at most {self.MAX_FACILITIES} facilities")
+
+    @classmethod
+    def mask_of(cls, facility_ids):
+        """
+        Expressions of the combined mask of `facility_ids` and of the number
+        of them that exist, evaluated as subqueries of the filtered query
+        """
+        facilities = cls.objects.filter(id__in=facility_ids).order_by().annotate(group=Value(0)).values("group")
+        # bits are unique, so their sum is their bitwise or
+        mask = facilities.annotate(mask=Sum(Value(1).bitleftshift(F("bit")))).values("mask")
+        found = facilities.annotate(found=Count("id")).values("found")
+        return Coalesce(Subquery(mask), 0), Coalesce(Subquery(found), 0)
+
 
 # image.jpg: upload_to="" --> media/image.jpg
 # image.jpg: upload_to="upload/busses/" --> media/upload/busses/image.jpg
@@ -34,10 +99,25 @@ class Buss(models.Model):
     num_seats = models.IntegerField()
     facilities = models.ManyToManyField(Facility, related_name="busses", blank=True)
     image = models.ImageField(null=True, upload_to=bus_image_path)
+    # resized copies of `image`, filled in by `station.images`
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    # OR of `Facility.mask` of `facilities`, kept in sync by `station.signals`
+    facility_mask = models.BigIntegerField(default=0, editable=False)
 
     class Meta:
         verbose_name_plural = "buses"
 
+    @classmethod
+    def refresh_facility_masks(cls, bus_ids):
+        """Recompute `facility_mask` of `bus_ids` from their facilities"""
+        bus_ids = set(bus_ids)
+        masks = dict.fromkeys(bus_ids, 0)
+        rows = cls.facilities.through.objects.filter(buss_id__in=bus_ids).values_list("buss_id", "facility__bit")
+        for bus_id, bit in rows:
+            masks[bus_id] |= 1 << bit
+        for bus_id, mask in masks.items():
+            cls.objects.filter(pk=bus_id).exclude(facility_mask=mask).update(facility_mask=mask)
+
     @property
     def is_small(self):
         return self.num_seats <= 25
@@ -46,11 +126,57 @@ class Buss(models.Model):
         return f"Bus: {self.info} (id: {self.id})"
 
 
+class Station(models.Model):
+    """A stop trips depart from or arrive at"""
+    name = models.CharField(max_length=63)
+    # `normalize(name)`: names differing only in case or spacing are one station
+    key = models.CharField(max_length=255, unique=True, editable=False)
+
+    def __str__(self):
+        return self.name
+
+    @staticmethod
+    def clean_name(name: str) -> str:
+        return " ".join(name.split())
+
+    @classmethod
+    def normalize(cls, name: str) -> str:
+        return cls.clean_name(name).casefold()
+
+    def clean(self):
+        # `key` is not editable, so forms leave it out of their unique checks
+        self.name = self.clean_name(self.name)
+        self.key = self.normalize(self.name)
+        if Station.objects.filter(key=self.key).exclude(pk=self.pk).exists():
+            raise ValidationError({"name": f"station {self.name} already exists"})
+
+    def save(self, *args, **kwargs):
+        self.name = self.clean_name(self.name)
+        self.key = self.normalize(self.name)
+        return super().save(*args, **kwargs)
+
+    @classmethod
+    def get_for_name(cls, name: str) -> "Station":
+        """The station called `name` (ignoring case and spacing), created if missing"""
+        station, _ = cls.objects.get_or_create(
+            key=cls.normalize(name),
+            defaults={"name": cls.clean_name(name)}
+        )
+        return station
+
+
 class Trip(models.Model):
-    source = models.CharField(max_length=63)
-    destination = models.CharField(max_length=63)
+    # the (source, destination) index serves lookups by source
+    source = models.ForeignKey(Station, on_delete=models.PROTECT, related_name="departures", db_index=False)
+    destination = models.ForeignKey(Station, on_delete=models.PROTECT, related_name="arrivals")
     departure = models.DateTimeField()
+    arrival = models.DateTimeField(null=True, blank=True)
     bus = models.ForeignKey("Buss", on_delete=models.CASCADE)
+    seat_map = models.BinaryField(default=b"", editable=False)
+    # number of seats set in `seat_map`
+    seats_sold = models.PositiveIntegerField(default=0, editable=False)
+    held_seat_map = models.BinaryField(default=b"", editable=False)
+    holds_expire_at = models.DateTimeField(null=True, editable=False)
 
     class Meta:
         indexes = [
@@ -61,6 +187,121 @@ class Trip(models.Model):
     def __str__(self):
         return f"{self.source} - {self.destination} ({self.departure})"
 
+    # written only by `update_seat_map` and `SeatHold.refresh_trip`
+    # so saving a stale instance cannot lose seats
+    maintained_fields = ("seat_map", "seats_sold", "held_seat_map", "holds_expire_at")
+
+    def save(
+            self,
+            force_insert=False,
+            force_update=False,
+            using=None,
+            update_fields=None
+    ):
+        if update_fields is None and not self._state.adding:
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.maintained_fields
+            ]
+        return super().save(force_insert, force_update, using, update_fields)
+
+    def clean(self):
+        if self.arrival and self.arrival <= self.departure:
+            raise ValidationError({"arrival": "arrival must be after departure"})
+
+    @property
+    def taken_seats(self) -> list[int]:
+        return seats.taken_seats(self.seat_map)
+
+    @staticmethod
+    def active_holds(held_seat_map: bytes, holds_expire_at) -> bytes:
+        """
+        `held_seat_map` until the first of the holds expires, then nothing:
+        the holds are not yet released by `SeatHold.release_expired`
+        """
+        if holds_expire_at is not None and holds_expire_at <= timezone.now():
+            return b""
+        return held_seat_map
+
+    @property
+    def held_seats(self) -> list[int]:
+        return seats.taken_seats(self.active_holds(self.held_seat_map, self.holds_expire_at))
+
+    @property
+    def unavailable_seat_map(self) -> bytes:
+        return seats.union(self.seat_map, self.active_holds(self.held_seat_map, self.holds_expire_at))
+
+    @property
+    def tickets_available(self) -> int:
+        return self.count_available(
+            self.bus.num_seats, self.seats_sold, self.held_seat_map, self.holds_expire_at
+        )
+
+    @classmethod
+    def count_available(cls, num_seats: int, seats_sold: int, held_seat_map: bytes, holds_expire_at=None) -> int:
+        # sold and held seats never overlap once a transaction commits
+        return num_seats - seats_sold - seats.count(cls.active_holds(held_seat_map, holds_expire_at))
+
+    def is_seat_taken(self, seat: int) -> bool:
+        return seats.is_taken(self.seat_map, seat)
+
+    def is_seat_held(self, seat: int) -> bool:
+        return seats.is_taken(self.active_holds(self.held_seat_map, self.holds_expire_at), seat)
+
+    @classmethod
+    def unavailable_seat_maps(cls, trip_ids) -> dict[int, tuple[int, bytes]]:
+        """
+        `(num_seats, seat map of sold or held seats)` by id of `trip_ids`,
+        in at most two queries and without writing
+        """
+        rows = cls.objects.filter(id__in=trip_ids).values_list(
+            "id", "bus__num_seats", "seat_map", "held_seat_map", "holds_expire_at"
+        )
+        now = timezone.now()
+        result, expired = {}, []
+        for trip_id, num_seats, seat_map, held_seat_map, holds_expire_at in rows:
+            result[trip_id] = (num_seats, seats.union(seat_map, held_seat_map))
+            if holds_expire_at is not None and holds_expire_at <= now:
+                # not yet released by SeatHold.release_expired
+                expired.append(trip_id)
+                result[trip_id] = (num_seats, bytes(seat_map))
+
+        if expired:
+            holds = SeatHold.objects.filter(trip_id__in=expired, expires_at__gt=now)
+            for trip_id, seat_map in holds.values_list("trip_id", "seat_map"):
+                num_seats, unavailable = result[trip_id]
+                result[trip_id] = (num_seats, seats.union(unavailable, seat_map))
+        return result
+
+    @classmethod
+    def update_seat_map(cls, trip_id: int, occupied=(), released=()):
+        """Mark seats of a trip as taken/free inside the current transaction"""
+        with transaction.atomic():
+            row = (
+                cls.objects
+                .select_for_update()
+                .filter(pk=trip_id)
+                .values_list("seat_map", "held_seat_map")
+                .first()
+            )
+            if row is None:
+                return
+            seat_map, held_seat_map = row
+            seat_map = seats.release(seats.occupy(bytes(seat_map), occupied), released)
+            cls.objects.filter(pk=trip_id).update(
+                seat_map=seat_map,
+                seats_sold=seats.count(seat_map)
+            )
+            cls.seat_map_changed(trip_id, seats.union(seat_map, held_seat_map))
+
+    @classmethod
+    def seat_map_changed(cls, trip_id: int, unavailable_seat_map: bytes):
+        transaction.on_commit(
+            lambda: seat_map_changed.send(
+                sender=cls, trip_id=trip_id, seat_map=unavailable_seat_map
+            )
+        )
+
 
 class Ticket(models.Model):
     seat = models.IntegerField()
@@ -82,10 +323,25 @@ class Ticket(models.Model):
         if not (1 <= seat <= num_seats):
             raise error_to_raise(
                 {
-                    "seat": f"seat must be in range [1, {seat}], not {num_seats}"
+                    "seat": f"seat must be in range [1, {num_seats}], not {seat}"
                 }
             )
 
+    @classmethod
+    def bulk_book(cls, tickets: list["Ticket"]) -> list["Ticket"]:
+        """
+        Insert already validated tickets with a single batched insert
+        and mark their seats on the trips' seat maps
+        """
+        with transaction.atomic():
+            created = cls.objects.bulk_create(tickets)
+            seats_by_trip = {}
+            for ticket in tickets:
+                seats_by_trip.setdefault(ticket.trip_id, []).append(ticket.seat)
+            for trip_id, trip_seats in seats_by_trip.items():
+                Trip.update_seat_map(trip_id, occupied=trip_seats)
+        return created
+
     def clean(self):
         Ticket.validate_seat(self.seat, self.trip.bus.num_seats, ValueError)
 
@@ -97,7 +353,21 @@ class Ticket(models.Model):
             update_fields=None
     ):
         self.full_clean()
-        return super(Ticket, self).save(force_insert, force_update, using, update_fields)
+        with transaction.atomic():
+            previous = None
+            if self.pk is not None:
+                previous = (
+                    Ticket.objects
+                    .filter(pk=self.pk)
+                    .values_list("trip_id", "seat")
+                    .first()
+                )
+            result = super(Ticket, self).save(force_insert, force_update, using, update_fields)
+            if previous != (self.trip_id, self.seat):
+                if previous is not None:
+                    Trip.update_seat_map(previous[0], released=[previous[1]])
+                Trip.update_seat_map(self.trip_id, occupied=[self.seat])
+            return result
 
 
 class Order(models.Model):
@@ -109,3 +379,157 @@ class Order(models.Model):
 
     def __str__(self):
         return str(self.created_at)
+
+
+class SeatHold(models.Model):
+    """Seats of a trip reserved for a user until `expires_at`"""
+    trip = models.ForeignKey("Trip", on_delete=models.CASCADE, related_name="holds")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    seat_map = models.BinaryField(default=b"")
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.trip} - (seats - {self.seats}, until {self.expires_at})"
+
+    @property
+    def seats(self) -> list[int]:
+        return seats.taken_seats(self.seat_map)
+
+    @property
+    def is_expired(self) -> bool:
+        return self.expires_at <= timezone.now()
+
+    @classmethod
+    def refresh_trip(cls, trip_id: int):
+        """Rebuild the held seat map of a trip from its current holds"""
+        with transaction.atomic():
+            trip = (
+                Trip.objects
+                .select_for_update()
+                .only("seat_map")
+                .filter(pk=trip_id)
+                .first()
+            )
+            if trip is None:
+                return
+            holds = list(cls.objects.filter(trip_id=trip_id).values_list("seat_map", "expires_at"))
+            held_seat_map = seats.union(*(seat_map for seat_map, _ in holds))
+            Trip.objects.filter(pk=trip_id).update(
+                held_seat_map=held_seat_map,
+                holds_expire_at=min((expires_at for _, expires_at in holds), default=None)
+            )
+            Trip.seat_map_changed(trip_id, seats.union(trip.seat_map, held_seat_map))
+
+    @classmethod
+    def release_expired(cls, trip_ids=None) -> int:
+        """Delete expired holds (of `trip_ids` only, if given) and free their seats"""
+        expired = cls.objects.filter(expires_at__lte=timezone.now())
+        if trip_ids is not None:
+            expired = expired.filter(trip_id__in=trip_ids)
+        expired = list(expired.values_list("id", "trip_id"))
+        if not expired:
+            return 0
+        with transaction.atomic():
+            cls.objects.filter(id__in=[hold_id for hold_id, _ in expired]).delete()
+            for trip_id in {trip_id for _, trip_id in expired}:
+                cls.refresh_trip(trip_id)
+        return len(expired)
+
+    @classmethod
+    def place(cls, trip_id: int, user, hold_seats: list[int], duration) -> "SeatHold":
+        """Hold free seats of a trip, raising ValidationError for unavailable ones"""
+        cls.release_expired([trip_id])
+        with transaction.atomic():
+            trip = Trip.objects.select_for_update().select_related("bus").get(pk=trip_id)
+            errors = []
+            if len(set(hold_seats)) != len(hold_seats):
+                errors.append("seats must not repeat")
+            for seat in hold_seats:
+                if not (1 <= seat <= trip.bus.num_seats):
+                    errors.append(f"seat must be in range [1, {trip.bus.num_seats}], not {seat}")
+                elif trip.is_seat_taken(seat) or trip.is_seat_held(seat):
+                    errors.append(f"seat {seat} is not available on trip {trip.id}")
+            if errors:
+                raise ValidationError({"seats": errors})
+
+            hold = cls.objects.create(
+                trip=trip,
+                user=user,
+                seat_map=seats.occupy(b"", hold_seats),
+                expires_at=timezone.now() + duration
+            )
+            cls.refresh_trip(trip.id)
+        return hold
+
+    def release(self):
+        with transaction.atomic():
+            trip_id = self.trip_id
+            self.delete()
+            SeatHold.refresh_trip(trip_id)
+
+    def confirm(self) -> "Order":
+        """Turn the hold into an order with a ticket for every held seat"""
+        try:
+            with transaction.atomic():
+                if not SeatHold.objects.select_for_update().filter(
+                        pk=self.pk, expires_at__gt=timezone.now()
+                ).exists():
+                    raise ValidationError("the hold has expired")
+                order = Order.objects.create(user=self.user)
+                Ticket.bulk_book(
+                    [Ticket(order=order, trip_id=self.trip_id, seat=seat) for seat in self.seats]
+                )
+                self.release()
+        except IntegrityError:
+            # Seats were sold past the hold, e.g. by an admin, the hold is kept
+            taken = Ticket.objects.filter(trip_id=self.trip_id, seat__in=self.seats).order_by("seat")
+            raise ValidationError({"seats": [
+                f"seat {seat} is already taken on trip {self.trip_id}"
+                for seat in taken.values_list("seat", flat=True)
+            ]})
+        return order
+
+
+class ArchivedTrip(models.Model):
+    """
+    A departed trip moved out of `Trip` by `station.archive`,
+    with its bus as it was then
+    """
+    id = models.BigIntegerField(primary_key=True)
+    source = models.ForeignKey(Station, on_delete=models.PROTECT, related_name="+")
+    destination = models.ForeignKey(Station, on_delete=models.PROTECT, related_name="+")
+    departure = models.DateTimeField()
+    arrival = models.DateTimeField(null=True, blank=True)
+    bus_info = models.CharField(max_length=255, null=True, blank=True)
+    bus_num_seats = models.IntegerField()
+    seats_sold = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.source} - {self.destination} ({self.departure})"
+
+    @property
+    def tickets_available(self) -> int:
+        return self.count_available(self.bus_num_seats, self.seats_sold)
+
+    @staticmethod
+    def count_available(bus_num_seats: int, seats_sold: int) -> int:
+        return bus_num_seats - seats_sold
+
+
+class ArchivedTicket(models.Model):
+    """A ticket of an `ArchivedTrip`, still listed with its order"""
+    id = models.BigIntegerField(primary_key=True)
+    seat = models.IntegerField()
+    trip = models.ForeignKey(ArchivedTrip, on_delete=models.CASCADE, related_name="tickets")
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="archived_tickets")
+
+    class Meta:
+        ordering = ("seat",)
+
+    def __str__(self):
+        return f"{self.trip} - (seat - {self.seat})"
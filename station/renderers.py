@@ -0,0 +1,41 @@
+"""
+JSON renderer encoding with orjson when it is installed.
+
+The output is byte for byte that of DRF's `JSONRenderer` with the default
+UNICODE_JSON and COMPACT_JSON settings, except for floats: orjson writes
+1e-05 as 0.00001 and infinity as null. It is therefore only used for the
+fast list responses of `station.rows`, which hold no floats. Values orjson
+would format differently (datetimes, decimals, lazy strings...) are handed
+to DRF's encoder, and the stock renderer is used for indented output,
+other settings and anything orjson cannot encode.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.encoder_class is not JSONEncoder
+            or not (api_settings.UNICODE_JSON and api_settings.COMPACT_JSON and api_settings.STRICT_JSON)
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            encoded = orjson.dumps(data, default=JSONEncoder().default, option=OPTIONS)
+        except (TypeError, orjson.JSONEncodeError):
+            return super().render(data, accepted_media_type, renderer_context)
+        # escaped by JSONRenderer for JavaScript
+        return encoded.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
@@ -0,0 +1,109 @@
+"""
+Primary/replica database routing.
+
+Reads of safe-method requests (GET, HEAD, OPTIONS) go to one of the
+aliases in ``settings.DATABASE_REPLICAS``, everything else - writes,
+reads of unsafe requests, reads inside a transaction and work outside of
+a request such as management commands - goes to ``default``. Users and
+sessions are always read from the primary: authentication must see an
+account or login the moment it is created, and users are cached by
+`user.authentication` anyway.
+
+Replicas lag behind the primary, so after a user changes something
+(places an order, edits in the admin) their reads stay on the primary
+for ``REPLICA_STICKY_SECONDS``. The mark is kept in the
+``REPLICA_STICKY_CACHE`` cache, which every worker has to share: a mark
+only the writing worker sees would let the next request read its own
+write from a stale replica, so `station.checks` refuses caches local to
+one process.
+"""
+import contextvars
+import random
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import SimpleLazyObject, empty
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+PRIMARY_ONLY_APPS = ("sessions",)
+
+_current_request = contextvars.ContextVar("replica_request", default=None)
+
+
+def replica_aliases() -> list[str]:
+    return list(getattr(settings, "DATABASE_REPLICAS", ()))
+
+
+def sticky_cache_alias() -> str:
+    return getattr(settings, "REPLICA_STICKY_CACHE", "default")
+
+
+def _sticky_key(user_id) -> str:
+    return f"station:replicas:sticky:{user_id}"
+
+
+def stick_to_primary(user_id):
+    """Send reads of `user_id` to the primary for a while"""
+    caches[sticky_cache_alias()].set(
+        _sticky_key(user_id), True, timeout=getattr(settings, "REPLICA_STICKY_SECONDS", 10)
+    )
+
+
+def is_sticky(user_id) -> bool:
+    return caches[sticky_cache_alias()].get(_sticky_key(user_id), False)
+
+
+def begin_request(request):
+    return _current_request.set(request)
+
+
+def end_request(token):
+    _current_request.reset(token)
+
+
+class RequestState:
+    """Routing decision of one request, made once its user is known"""
+
+    def __init__(self):
+        self.alias = None
+        self.user_checked = False
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        request = _current_request.get()
+        replicas = replica_aliases()
+        if request is None or not replicas or request.method not in SAFE_METHODS:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if model._meta.app_label in PRIMARY_ONLY_APPS or model is get_user_model():
+            return DEFAULT_DB_ALIAS
+
+        state = getattr(request, "replica_state", None)
+        if state is None:
+            state = request.replica_state = RequestState()
+            # one replica per request, so its reads see a single snapshot
+            state.alias = random.choice(replicas)
+
+        # the user is authenticated by the view, after its first queries
+        user = getattr(request, "user", None)
+        if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+            user = None
+        if not state.user_checked and user is not None and user.is_authenticated:
+            state.user_checked = True
+            if is_sticky(user.pk):
+                state.alias = DEFAULT_DB_ALIAS
+        return state.alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas are copies of the primary, see the sync_replicas command
+        return db not in replica_aliases()
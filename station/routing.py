@@ -0,0 +1,240 @@
+"""
+In-memory connection index for multi-leg route planning.
+
+Every trip with a known arrival is a connection ``source -> destination``.
+Connections are kept sorted by departure, so a query only scans the
+connections inside its time window. Queries run in rounds (one round per
+leg, like RAPTOR): round ``k`` only boards connections reachable with
+``k - 1`` legs, which yields the earliest arrival for every number of
+transfers in a single pass per round.
+
+The index is built lazily on the first query of a process and kept up to
+date by the receivers in `station.signals`. Changes made by other worker
+processes are picked up by a periodic full rebuild.
+"""
+import bisect
+import dataclasses
+import datetime
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from station import seats
+
+
+def _setting(name: str):
+    defaults = {
+        "HORIZON_DAYS": 30,
+        "SEARCH_WINDOW_HOURS": 24,
+        "REFRESH_INTERVAL": 300,
+        "MAX_TRANSFERS": 3,
+    }
+    return getattr(settings, "ROUTE_PLANNER", {}).get(name, defaults[name])
+
+
+def max_transfers() -> int:
+    return _setting("MAX_TRANSFERS")
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Connection:
+    trip_id: int
+    source: str
+    destination: str
+    departure: float
+    arrival: float
+    num_seats: int
+    seats_taken: int
+
+    @property
+    def tickets_available(self) -> int:
+        return self.num_seats - self.seats_taken
+
+    @property
+    def sort_key(self) -> tuple[float, int]:
+        return self.departure, self.trip_id
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Journey:
+    legs: tuple[Connection, ...]
+
+    @property
+    def departure(self) -> float:
+        return self.legs[0].departure
+
+    @property
+    def arrival(self) -> float:
+        return self.legs[-1].arrival
+
+    @property
+    def transfers(self) -> int:
+        return len(self.legs) - 1
+
+
+class ConnectionIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._connections: list[Connection] = []
+        self._keys: list[tuple[float, int]] = []
+        self._by_trip: dict[int, Connection] = {}
+        self._loaded_at = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def clear(self):
+        """Drop the index, it is rebuilt from the database on the next query"""
+        with self._lock:
+            self._connections, self._keys, self._by_trip = [], [], {}
+            self._loaded_at = None
+
+    def load(self):
+        from station.models import Trip
+
+        since = timezone.now() - datetime.timedelta(days=1)
+        until = timezone.now() + datetime.timedelta(days=_setting("HORIZON_DAYS"))
+        rows = (
+            Trip.objects
+            .filter(arrival__isnull=False, departure__gte=since, departure__lte=until)
+            .values_list(
+                "id", "source__name", "destination__name", "departure", "arrival",
+                "bus__num_seats", "seat_map", "held_seat_map", "holds_expire_at"
+            )
+        )
+        connections = sorted(
+            (
+                self._connection(*row[:6], seats.union(row[6], Trip.active_holds(*row[7:])))
+                for row in rows.iterator(chunk_size=5000)
+            ),
+            key=lambda connection: connection.sort_key
+        )
+        with self._lock:
+            self._connections = connections
+            self._keys = [connection.sort_key for connection in connections]
+            self._by_trip = {connection.trip_id: connection for connection in connections}
+            self._loaded_at = time.monotonic()
+
+    def ensure_loaded(self):
+        if (
+            self._loaded_at is None
+            or time.monotonic() - self._loaded_at > _setting("REFRESH_INTERVAL")
+        ):
+            self.load()
+
+    @staticmethod
+    def _connection(trip_id, source, destination, departure, arrival, num_seats, seat_map):
+        return Connection(
+            trip_id=trip_id,
+            source=source,
+            destination=destination,
+            departure=departure.timestamp(),
+            arrival=arrival.timestamp(),
+            num_seats=num_seats,
+            seats_taken=seats.count(seat_map),
+        )
+
+    def upsert(self, trip):
+        """Add or replace the connection of a saved trip"""
+        if not self.is_loaded:
+            return
+        with self._lock:
+            self._remove(trip.id)
+            if trip.arrival is None:
+                return
+            connection = self._connection(
+                trip.id, trip.source.name, trip.destination.name, trip.departure,
+                trip.arrival, trip.bus.num_seats, trip.unavailable_seat_map
+            )
+            position = bisect.bisect_left(self._keys, connection.sort_key)
+            self._keys.insert(position, connection.sort_key)
+            self._connections.insert(position, connection)
+            self._by_trip[trip.id] = connection
+
+    def remove(self, trip_id: int):
+        with self._lock:
+            self._remove(trip_id)
+
+    def _remove(self, trip_id: int):
+        connection = self._by_trip.pop(trip_id, None)
+        if connection is None:
+            return
+        position = bisect.bisect_left(self._keys, connection.sort_key)
+        del self._keys[position]
+        del self._connections[position]
+
+    def update_seats(self, trip_id: int, seat_map: bytes):
+        """Recount free seats of a trip from its sold and held seats"""
+        with self._lock:
+            connection = self._by_trip.get(trip_id)
+            if connection is None:
+                return
+            connection = dataclasses.replace(connection, seats_taken=seats.count(seat_map))
+            position = bisect.bisect_left(self._keys, connection.sort_key)
+            self._connections[position] = connection
+            self._by_trip[trip_id] = connection
+
+    def search(
+            self,
+            source: str,
+            destination: str,
+            departure_after: datetime.datetime,
+            max_transfers: int = 2,
+            min_connection: datetime.timedelta = datetime.timedelta(minutes=15),
+            tickets: int = 1,
+    ) -> list[Journey]:
+        """
+        Return Pareto-optimal journeys: the earliest arrival reachable with
+        each number of transfers, fewest transfers first. A journey is only
+        listed if it arrives earlier than every journey with fewer transfers.
+        """
+        self.ensure_loaded()
+        if source == destination:
+            return []
+
+        start = departure_after.timestamp()
+        end = start + _setting("SEARCH_WINDOW_HOURS") * 3600
+        transfer = min_connection.total_seconds()
+
+        with self._lock:
+            first = bisect.bisect_left(self._keys, (start, 0))
+            last = bisect.bisect_right(self._keys, (end, float("inf")))
+            window = [
+                connection for connection in self._connections[first:last]
+                if connection.tickets_available >= tickets
+            ]
+
+        # station -> (ready time, legs) reachable with the previous number of legs;
+        # the origin is "ready" one connection time early so the first leg can leave
+        # at `departure_after`
+        previous = {source: (start - transfer, ())}
+        best_arrival = float("inf")
+        journeys = []
+        for _ in range(max_transfers + 1):
+            current = dict(previous)
+            for connection in window:
+                if connection.departure >= best_arrival:
+                    break
+                label = previous.get(connection.source)
+                if label is None or label[0] + transfer > connection.departure:
+                    continue
+                reached = current.get(connection.destination)
+                if reached is None or connection.arrival < reached[0]:
+                    current[connection.destination] = (
+                        connection.arrival, label[1] + (connection,)
+                    )
+            reached = current.get(destination)
+            if reached is not None and reached[0] < best_arrival:
+                best_arrival = reached[0]
+                journeys.append(Journey(legs=reached[1]))
+            if current == previous:
+                break
+            previous = current
+
+        return journeys
+
+
+index = ConnectionIndex()
@@ -0,0 +1,239 @@
+"""
+Model-free serialization of the list endpoints.
+
+`TripListSerializer`, `BussListSerializer` and `OrderListSerializer`
+build a model instance per row and run every serializer field on it. The
+list views instead fetch `values()` rows of just the columns they render
+and turn them into dicts with a function built once per response from
+item getters of the columns. The output is the same as the serializers'
+(the tests compare the rendered JSON byte for byte), so any change of
+those serializers has to be made in the formats below as well.
+"""
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.serializers import DateTimeField
+from rest_framework.settings import api_settings
+
+from station.models import ArchivedTicket, ArchivedTrip, Facility, Ticket, Trip
+from station.renderers import FastJSONRenderer
+from station.serializers import ImageVariantsField
+
+
+@dataclass(frozen=True)
+class Column:
+    name: str
+    # values() lookups passed to `convert`, or rendered as is if there is one
+    lookups: tuple
+    convert: Optional[Callable] = None
+
+
+def compile_row(columns: list[Column]) -> Callable[[dict], dict]:
+    """Build the function turning a `values()` row into `{"id": row["id"], ...}` for `columns`"""
+    fields = []
+    for column in columns:
+        get = itemgetter(*column.lookups)
+        if column.convert is None:
+            # rendered as is, a single lookup
+            (_,) = column.lookups
+            value = get
+        elif len(column.lookups) == 1:
+            value = _converted(column.convert, get)
+        else:
+            value = _spread(column.convert, get)
+        fields.append((column.name, value))
+
+    def to_dict(row):
+        return {name: value(row) for name, value in fields}
+
+    return to_dict
+
+
+def _converted(convert, get):
+    return lambda row: convert(get(row))
+
+
+def _spread(convert, get):
+    return lambda row: convert(*get(row))
+
+
+def lookups(columns: list[Column]) -> list[str]:
+    return list(dict.fromkeys(lookup for column in columns for lookup in column.lookups))
+
+
+def datetime_format() -> Callable:
+    """`DateTimeField.to_representation` for the current time zone"""
+    if not settings.USE_TZ or (api_settings.DATETIME_FORMAT or "").lower() != ISO_8601:
+        return DateTimeField().to_representation
+    zone = timezone.get_current_timezone()
+
+    def represent(value):
+        if not value:
+            return None
+        value = value.astimezone(zone).isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+
+    return represent
+
+
+def _trip_columns() -> list[Column]:
+    represent = datetime_format()
+    return [
+        Column("id", ("id",)),
+        Column("source", ("source__name",)),
+        Column("destination", ("destination__name",)),
+        Column("departure", ("departure",), represent),
+        Column("arrival", ("arrival",), represent),
+        Column("bus_info", ("bus__info",)),
+        Column("bus_num_seats", ("bus__num_seats",)),
+        Column(
+            "tickets_available",
+            ("bus__num_seats", "seats_sold", "held_seat_map", "holds_expire_at"),
+            Trip.count_available
+        ),
+    ]
+
+
+def _archived_trip_columns() -> list[Column]:
+    # ArchivedTripListSerializer
+    represent = datetime_format()
+    return [
+        Column("id", ("id",)),
+        Column("source", ("source__name",)),
+        Column("destination", ("destination__name",)),
+        Column("departure", ("departure",), represent),
+        Column("arrival", ("arrival",), represent),
+        Column("bus_info", ("bus_info",)),
+        Column("bus_num_seats", ("bus_num_seats",)),
+        Column("tickets_available", ("bus_num_seats", "seats_sold"), ArchivedTrip.count_available),
+    ]
+
+
+def trip_rows(queryset):
+    """`queryset` of trips as `values()` rows for `trip_list`"""
+    return queryset.prefetch_related(None).values(*lookups(_trip_columns()))
+
+
+def trip_list(rows, request=None) -> list[dict]:
+    """`TripListSerializer(many=True).data` of `trip_rows`"""
+    return list(map(compile_row(_trip_columns()), rows))
+
+
+BUS_COLUMNS = [
+    Column("id", ("id",)),
+    Column("info", ("info",)),
+    Column("num_seats", ("num_seats",)),
+    Column("is_small", ("num_seats",), lambda num_seats: num_seats <= 25),
+]
+
+
+def bus_rows(queryset):
+    """`queryset` of buses as `values()` rows for `bus_list`"""
+    return queryset.prefetch_related(None).values(*lookups(BUS_COLUMNS), "image_variants")
+
+
+def bus_list(rows, request=None) -> list[dict]:
+    """`BussListSerializer(many=True).data` of `bus_rows`"""
+    rows = list(rows)
+    # the query of prefetch_related("facilities"), so names come in the same order
+    names = {}
+    facility_rows = (
+        Facility.objects
+        .filter(busses__in=[row["id"] for row in rows])
+        .values_list("busses__id", "name")
+    )
+    for bus_id, name in facility_rows:
+        names.setdefault(bus_id, []).append(name)
+
+    to_dict = compile_row(BUS_COLUMNS)
+    result = []
+    for row in rows:
+        data = to_dict(row)
+        data["facilities"] = names.get(row["id"], [])
+        data["image_variants"] = ImageVariantsField.represent(row["image_variants"], request)
+        result.append(data)
+    return result
+
+
+def order_rows(queryset):
+    """`queryset` of orders as `values()` rows for `order_list`"""
+    return queryset.prefetch_related(None).values("id", "created_at")
+
+
+def _order_tickets(order_ids, ticket_model, trip_model, trip_columns, tickets_by_order):
+    # the queries of prefetch_related("tickets__trip__bus"), or of the archived tickets
+    tickets = list(
+        ticket_model.objects
+        .filter(order__in=order_ids)
+        .values_list("order_id", "id", "seat", "trip_id")
+    )
+    trip_to_dict = compile_row(trip_columns)
+    trips = {
+        row["id"]: trip_to_dict(row)
+        for row in trip_model.objects.filter(id__in={ticket[3] for ticket in tickets}).values(
+            *lookups(trip_columns)
+        )
+    }
+    for order_id, ticket_id, seat, trip_id in tickets:
+        tickets_by_order.setdefault(order_id, []).append(
+            {"id": ticket_id, "seat": seat, "trip": trips[trip_id]}
+        )
+
+
+def order_list(rows, request=None) -> list[dict]:
+    """`OrderListSerializer(many=True).data` of `order_rows`"""
+    rows = list(rows)
+    order_ids = [row["id"] for row in rows]
+    tickets_by_order = {}
+    _order_tickets(order_ids, Ticket, Trip, _trip_columns(), tickets_by_order)
+    # listed after the other tickets, as by OrderSerializer
+    _order_tickets(order_ids, ArchivedTicket, ArchivedTrip, _archived_trip_columns(), tickets_by_order)
+
+    represent = datetime_format()
+    return [
+        {
+            "id": row["id"],
+            "created_at": represent(row["created_at"]),
+            "tickets": tickets_by_order.get(row["id"], []),
+        }
+        for row in rows
+    ]
+
+
+class FastListMixin:
+    """
+    Serve `list` through the `station.rows` functions instead of the
+    list serializer, rendered by `FastJSONRenderer`, with
+    `fast_list = False` falling back to both stock paths
+    """
+    fast_list = True
+    # (queryset -> values() rows, (rows, request) -> data), e.g. (trip_rows, trip_list)
+    list_format = None
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if self.action != "list" or not self.fast_list:
+            return renderers
+        return [
+            FastJSONRenderer() if type(renderer) is JSONRenderer else renderer
+            for renderer in renderers
+        ]
+
+    def list(self, request, *args, **kwargs):
+        if not self.fast_list:
+            return super().list(request, *args, **kwargs)
+
+        to_rows, to_data = self.list_format
+        rows = to_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(to_data(page, request))
+        return Response(to_data(rows, request))
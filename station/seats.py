@@ -0,0 +1,82 @@
+"""
+Helpers for the seat-occupancy bitmap stored in ``Trip.seat_map``.
+
+Seat ``n`` (1-based) is bit ``(n - 1) % 8`` of byte ``(n - 1) // 8``,
+so a 50-seat bus needs 7 bytes no matter how many tickets were sold.
+"""
+from typing import Iterable
+
+_BYTE_SEATS = tuple(
+    tuple(bit + 1 for bit in range(8) if byte >> bit & 1)
+    for byte in range(256)
+)
+
+
+def occupy(seat_map: bytes, seats: Iterable[int]) -> bytes:
+    """Return a copy of `seat_map` with `seats` marked as taken"""
+    buffer = bytearray(seat_map or b"")
+    for seat in seats:
+        index, bit = divmod(seat - 1, 8)
+        if index >= len(buffer):
+            buffer.extend(bytes(index + 1 - len(buffer)))
+        buffer[index] |= 1 << bit
+    return bytes(buffer)
+
+
+def release(seat_map: bytes, seats: Iterable[int]) -> bytes:
+    """Return a copy of `seat_map` with `seats` marked as free"""
+    buffer = bytearray(seat_map or b"")
+    for seat in seats:
+        index, bit = divmod(seat - 1, 8)
+        if index < len(buffer):
+            buffer[index] &= ~(1 << bit) & 0xFF
+    return bytes(buffer.rstrip(b"\x00"))
+
+
+def union(*seat_maps: bytes) -> bytes:
+    """Return a seat map with the seats taken in any of `seat_maps`"""
+    value = 0
+    for seat_map in seat_maps:
+        value |= int.from_bytes(seat_map or b"", "little")
+    return value.to_bytes((value.bit_length() + 7) // 8, "little")
+
+
+def is_taken(seat_map: bytes, seat: int) -> bool:
+    index, bit = divmod(seat - 1, 8)
+    return index < len(seat_map or b"") and bool(seat_map[index] >> bit & 1)
+
+
+def taken_seats(seat_map: bytes) -> list[int]:
+    """Return taken seat numbers in ascending order"""
+    result = []
+    for index, byte in enumerate(bytes(seat_map or b"")):
+        if byte:
+            offset = index * 8
+            result.extend(offset + seat for seat in _BYTE_SEATS[byte])
+    return result
+
+
+def count(seat_map: bytes) -> int:
+    return int.from_bytes(seat_map or b"", "little").bit_count()
+
+
+def to_bitstring(seat_map: bytes, num_seats: int) -> str:
+    """'0' for a free and '1' for a taken seat, seat 1 first"""
+    value = int.from_bytes(seat_map or b"", "little") & ((1 << num_seats) - 1)
+    return format(value, f"0{num_seats}b")[::-1] if num_seats > 0 else ""
+
+
+def to_runs(seat_map: bytes, num_seats: int) -> list[int]:
+    """
+    Lengths of alternating runs of free and taken seats, seat 1 first.
+    The first run is free seats and may be 0: "0,2,48" are seats 1-2 taken
+    """
+    runs = []
+    taken, length = False, 0
+    for seat_taken in to_bitstring(seat_map, num_seats):
+        if (seat_taken == "1") != taken:
+            runs.append(length)
+            taken, length = not taken, 0
+        length += 1
+    runs.append(length)
+    return runs
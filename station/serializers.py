@@ -1,12 +1,72 @@
-from django.db import transaction
+import datetime
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.storage import default_storage
+from django.db import transaction, IntegrityError
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
-from rest_framework.validators import UniqueTogetherValidator
 
-from station.models import Buss, Trip, Facility, Ticket, Order
+from station import booking, images, importer
+from station.models import (
+    Buss, Trip, Facility, Ticket, Order, SeatHold, Station, ArchivedTicket, ArchivedTrip,
+)
+
+
+@extend_schema_field({
+    "type": "object",
+    "properties": {
+        **{
+            variant: {
+                "type": "object",
+                "properties": {
+                    "url": {"type": "string", "format": "uri"},
+                    "width": {"type": "integer"},
+                    "height": {"type": "integer"},
+                },
+            }
+            for variant in images.VARIANTS
+        },
+        "srcset": {"type": "string"},
+    },
+})
+class ImageVariantsField(serializers.Field):
+    """
+    Render `Buss.image_variants` as absolute URLs with sizes
+    plus a `srcset` string, or an empty dict while they are being generated
+    """
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, variants):
+        return self.represent(variants, self.context.get("request"))
+
+    @staticmethod
+    def represent(variants, request=None) -> dict:
+        if not variants:
+            return {}
+        result = {}
+        for variant in images.VARIANTS:
+            if variant not in variants:
+                continue
+            url = default_storage.url(variants[variant]["name"])
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            result[variant] = {
+                "url": url,
+                "width": variants[variant]["width"],
+                "height": variants[variant]["height"]
+            }
+        result["srcset"] = ", ".join(f"{item['url']} {item['width']}w" for item in result.values())
+        return result
 
 
 class BussSerializer(serializers.ModelSerializer):
     # is_small = serializers.ReadOnlyField() # if fields = "__all__"
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Buss
         fields = [
@@ -14,7 +74,8 @@ class BussSerializer(serializers.ModelSerializer):
             "info",
             "num_seats",
             "is_small",
-            "facilities"
+            "facilities",
+            "image_variants"
         ]
         read_only_fields = ["id"]
     # id = serializers.IntegerField(read_only=True)
@@ -32,15 +93,56 @@ class BussSerializer(serializers.ModelSerializer):
 
 
 class BussImageSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Buss
         fields = [
             "id",
-            "image"
+            "image",
+            "image_variants"
         ]
 
 
+class TripPrimaryKeyField(serializers.PrimaryKeyRelatedField):
+    """Resolve trips from the batch preloaded by `TicketBulkListSerializer`"""
+
+    def to_internal_value(self, data):
+        trips = getattr(self.parent.parent, "trips", None)
+        if trips is None:
+            return super().to_internal_value(data)
+        try:
+            return trips[int(data)]
+        except KeyError:
+            self.fail("does_not_exist", pk_value=data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+
+class TicketBulkListSerializer(serializers.ListSerializer):
+    """
+    Validate all tickets of an order against their trips
+    with a single query instead of several queries per ticket
+    """
+
+    def to_internal_value(self, data):
+        self.claimed = set()
+        self.trips = {}
+        if isinstance(data, list):
+            trip_ids = set()
+            for item in data:
+                try:
+                    trip_ids.add(int(item["trip"]))
+                except (KeyError, TypeError, ValueError):
+                    continue
+            SeatHold.release_expired(trip_ids)
+            self.trips = Trip.objects.select_related("bus").in_bulk(trip_ids)
+        return super().to_internal_value(data)
+
+
 class TicketSerializer(serializers.ModelSerializer):
+    trip = TripPrimaryKeyField(queryset=Trip.objects.select_related("bus"))
+
     class Meta:
         model = Ticket
         fields = [
@@ -48,23 +150,47 @@ class TicketSerializer(serializers.ModelSerializer):
             "seat",
             "trip"
         ]
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Ticket.objects.all(),
-                fields=["seat", "trip"]
-            )
-        ]
+        list_serializer_class = TicketBulkListSerializer
+        # seat uniqueness is checked against the trip seat map in `validate`
+        # and enforced by the `unique_ticket_seat_trip` constraint on insert
+        validators = []
 
     def validate(self, attrs):
+        seat, trip = attrs["seat"], attrs["trip"]
         Ticket.validate_seat(
-            attrs["seat"],
-            attrs["trip"].bus.num_seats,
+            seat,
+            trip.bus.num_seats,
             serializers.ValidationError
         )
 
+        claimed = getattr(self.parent, "claimed", set())
+        if trip.is_seat_taken(seat) or (trip.id, seat) in claimed:
+            raise serializers.ValidationError(
+                {"seat": f"seat {seat} is already taken on trip {trip.id}"}
+            )
+        if trip.is_seat_held(seat):
+            raise serializers.ValidationError(
+                {"seat": f"seat {seat} is held on trip {trip.id}"}
+            )
+        claimed.add((trip.id, seat))
+
+        return attrs
+
+
+class ArchivedTicketSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedTicket
+        fields = [
+            "id",
+            "seat",
+            "trip"
+        ]
+
 
 class OrderSerializer(serializers.ModelSerializer):
     tickets = TicketSerializer(many=True, read_only=False, allow_empty=False)
+    # renders the tickets moved to the archive by `station.archive`
+    archived_ticket_serializer_class = ArchivedTicketSerializer
 
     class Meta:
         model = Order
@@ -74,16 +200,64 @@ class OrderSerializer(serializers.ModelSerializer):
             "tickets"
         ]
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data["tickets"] += self.archived_ticket_serializer_class(
+            instance.archived_tickets.all(), many=True, context=self.context
+        ).data
+        return data
+
     def create(self, validated_data):
+        tickets_data = validated_data.pop("tickets")
+        try:
+            return booking.submit(lambda: self._book(validated_data, tickets_data))
+        except IntegrityError:
+            # Seats were sold by a concurrent order after validation
+            raise serializers.ValidationError(
+                {"tickets": self._conflicts(tickets_data)}
+            )
+
+    @staticmethod
+    def _book(validated_data: dict, tickets_data: list[dict]) -> Order:
         with transaction.atomic():
-            tickets_data = validated_data.pop("tickets")
             order = Order.objects.create(**validated_data)
-            for ticket_data in tickets_data:
-                Ticket.objects.create(order=order, **ticket_data)
-            return order
+            Ticket.bulk_book(
+                [Ticket(order=order, **ticket_data) for ticket_data in tickets_data]
+            )
+        return order
+
+    @staticmethod
+    def _conflicts(tickets_data: list[dict]) -> list[dict]:
+        taken = set(
+            Ticket.objects
+            .filter(
+                trip__in={ticket["trip"] for ticket in tickets_data},
+                seat__in={ticket["seat"] for ticket in tickets_data}
+            )
+            .values_list("trip_id", "seat")
+        )
+        return [
+            {"seat": [f"seat {ticket['seat']} is already taken on trip {ticket['trip'].id}"]}
+            if (ticket["trip"].id, ticket["seat"]) in taken else {}
+            for ticket in tickets_data
+        ]
+
+
+class StationField(serializers.CharField):
+    """A `Station` by name, the station is looked up or created by `TripSerializer` on save"""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("max_length", Station._meta.get_field("name").max_length)
+        super().__init__(**kwargs)
+
+    def to_representation(self, station):
+        return station.name
 
 
 class TripSerializer(serializers.ModelSerializer):
+    source = StationField()
+    destination = StationField()
+
     class Meta:
         model = Trip
         fields = [
@@ -91,11 +265,34 @@ class TripSerializer(serializers.ModelSerializer):
             "source",
             "destination",
             "departure",
+            "arrival",
             "bus",
         ]
 
+    def validate(self, attrs):
+        departure = attrs.get("departure", getattr(self.instance, "departure", None))
+        arrival = attrs.get("arrival", getattr(self.instance, "arrival", None))
+        if arrival and departure and arrival <= departure:
+            raise serializers.ValidationError({"arrival": "arrival must be after departure"})
+        return attrs
+
+    @staticmethod
+    def _stations(validated_data: dict) -> dict:
+        for field in ("source", "destination"):
+            if field in validated_data:
+                validated_data[field] = Station.get_for_name(validated_data[field])
+        return validated_data
+
+    def create(self, validated_data):
+        return super().create(self._stations(validated_data))
+
+    def update(self, instance, validated_data):
+        return super().update(instance, self._stations(validated_data))
+
 
 class TripListSerializer(serializers.ModelSerializer):
+    source = StationField(read_only=True)
+    destination = StationField(read_only=True)
     bus_info = serializers.CharField(source="bus.info", read_only=True)
     bus_num_seats = serializers.IntegerField(source="bus.num_seats", read_only=True)
     tickets_available = serializers.IntegerField(read_only=True)
@@ -107,12 +304,27 @@ class TripListSerializer(serializers.ModelSerializer):
             "source",
             "destination",
             "departure",
+            "arrival",
             "bus_info",
             "bus_num_seats",
             "tickets_available"
         ]
 
 
+class TripAvailabilitySerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    num_seats = serializers.IntegerField()
+    tickets_available = serializers.IntegerField()
+    seat_map = serializers.CharField(
+        required=False,
+        help_text=(
+            "Sold or held seats, seat 1 first, if requested: "
+            "'bits' gives '1' for every unavailable and '0' for every free seat, "
+            "'rle' comma separated lengths of alternating runs of free and unavailable seats"
+        )
+    )
+
+
 class FacilitySerializer(serializers.ModelSerializer):
     class Meta:
         model = Facility
@@ -121,6 +333,13 @@ class FacilitySerializer(serializers.ModelSerializer):
             "name"
         ]
 
+    def validate(self, attrs):
+        if self.instance is None and Facility.free_bit() is None:
+            raise serializers.ValidationError(
+                f"There can be at most {Facility.MAX_FACILITIES} facilities"
+            )
+        return attrs
+
 
 class BussRetrieveSerializer(BussSerializer):
     facilities = FacilitySerializer(many=True)
@@ -128,11 +347,13 @@ class BussRetrieveSerializer(BussSerializer):
 
 class TripRetrieveSerializer(TripSerializer):
     bus = BussRetrieveSerializer(many=False, read_only=True)
-    taken_seats = serializers.SlugRelatedField(
-        slug_field="seat",
-        many=True,
-        read_only=True,
-        source="tickets"
+    taken_seats = serializers.ListField(
+        child=serializers.IntegerField(),
+        read_only=True
+    )
+    held_seats = serializers.ListField(
+        child=serializers.IntegerField(),
+        read_only=True
     )
 
     class Meta:
@@ -142,8 +363,10 @@ class TripRetrieveSerializer(TripSerializer):
             "source",
             "destination",
             "departure",
+            "arrival",
             "bus",
-            "taken_seats"
+            "taken_seats",
+            "held_seats"
         ]
 
 
@@ -151,9 +374,103 @@ class TicketListSerializer(TicketSerializer):
     trip = TripListSerializer(read_only=True)
 
 
+class ArchivedTripListSerializer(serializers.ModelSerializer):
+    source = StationField(read_only=True)
+    destination = StationField(read_only=True)
+    tickets_available = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = ArchivedTrip
+        fields = [
+            "id",
+            "source",
+            "destination",
+            "departure",
+            "arrival",
+            "bus_info",
+            "bus_num_seats",
+            "tickets_available"
+        ]
+
+
+class ArchivedTicketListSerializer(ArchivedTicketSerializer):
+    trip = ArchivedTripListSerializer(read_only=True)
+
+
 class OrderListSerializer(OrderSerializer):
     tickets = TicketListSerializer(read_only=True, many=True)
+    archived_ticket_serializer_class = ArchivedTicketListSerializer
 
 
 class BussListSerializer(BussSerializer):
     facilities = serializers.SlugRelatedField(many=True, read_only=True, slug_field="name")
+
+
+class SeatHoldSerializer(serializers.ModelSerializer):
+    seats = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False
+    )
+
+    class Meta:
+        model = SeatHold
+        fields = [
+            "id",
+            "trip",
+            "seats",
+            "created_at",
+            "expires_at"
+        ]
+        read_only_fields = ["id", "created_at", "expires_at"]
+
+    def create(self, validated_data):
+        try:
+            return SeatHold.place(
+                validated_data["trip"].id,
+                validated_data["user"],
+                validated_data["seats"],
+                datetime.timedelta(minutes=settings.SEAT_HOLD_MINUTES)
+            )
+        except DjangoValidationError as error:
+            raise serializers.ValidationError(serializers.as_serializer_error(error))
+
+
+class TimestampDateTimeField(serializers.DateTimeField):
+    """Render POSIX timestamps used by the route planner as datetimes"""
+
+    def to_representation(self, value):
+        return super().to_representation(
+            datetime.datetime.fromtimestamp(value, tz=datetime.timezone.utc)
+        )
+
+
+class ImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    format = serializers.ChoiceField(
+        choices=importer.FORMATS,
+        required=False,
+        help_text="Guessed from the file name by default"
+    )
+    dry_run = serializers.BooleanField(default=False)
+
+
+class RouteLegSerializer(serializers.Serializer):
+    trip = serializers.IntegerField(source="trip_id")
+    source = serializers.CharField()
+    destination = serializers.CharField()
+    departure = TimestampDateTimeField()
+    arrival = TimestampDateTimeField()
+    tickets_available = serializers.IntegerField()
+
+
+class StationSuggestionSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    trips = serializers.IntegerField(help_text="Trips departing from or arriving at the station")
+
+
+class JourneySerializer(serializers.Serializer):
+    departure = TimestampDateTimeField()
+    arrival = TimestampDateTimeField()
+    transfers = serializers.IntegerField()
+    legs = RouteLegSerializer(many=True)
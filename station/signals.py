@@ -0,0 +1,134 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save, m2m_changed
+from django.dispatch import receiver
+
+from station import autocomplete, routing, caching
+from station.models import Ticket, Trip, Buss, Facility, Station, seat_map_changed
+
+
+def _deleted_through(origin, model) -> bool:
+    """Whether a cascade delete was started from `model` rows"""
+    return isinstance(origin, model) or getattr(origin, "model", None) is model
+
+
+@receiver(post_delete, sender=Ticket)
+def release_ticket_seat(sender, instance, origin=None, **kwargs):
+    if _deleted_through(origin, Trip):
+        return
+    Trip.update_seat_map(instance.trip_id, released=[instance.seat])
+
+
+@receiver(post_save, sender=Trip)
+def index_trip(sender, instance, **kwargs):
+    if routing.index.is_loaded:
+        transaction.on_commit(lambda: routing.index.upsert(instance))
+
+
+@receiver(post_delete, sender=Trip)
+def unindex_trip(sender, instance, **kwargs):
+    trip_id = instance.id
+    transaction.on_commit(lambda: routing.index.remove(trip_id))
+
+
+@receiver(pre_save, sender=Trip)
+def remember_trip_stations(sender, instance, **kwargs):
+    if autocomplete.index.is_loaded and not instance._state.adding:
+        instance._saved_stations = (
+            Trip.objects.filter(pk=instance.pk).values_list("source_id", "destination_id").first()
+        )
+
+
+@receiver(post_save, sender=Trip)
+def count_trip_stations(sender, instance, created, **kwargs):
+    previous = instance.__dict__.pop("_saved_stations", None)
+    current = (instance.source_id, instance.destination_id)
+    if previous == current or not (created or previous):
+        return
+
+    def count():
+        if previous:
+            autocomplete.index.count_trips(previous, -1)
+        autocomplete.index.count_trips(current, 1)
+
+    transaction.on_commit(count)
+
+
+@receiver(post_delete, sender=Trip)
+def uncount_trip_stations(sender, instance, **kwargs):
+    stations = (instance.source_id, instance.destination_id)
+    transaction.on_commit(lambda: autocomplete.index.count_trips(stations, -1))
+
+
+@receiver(post_save, sender=Buss)
+def reindex_bus_trips(sender, instance, created, **kwargs):
+    if not created:
+        # seat counts of every trip of the bus may have changed
+        transaction.on_commit(routing.index.clear)
+
+
+@receiver(post_save, sender=Station)
+def reindex_station_trips(sender, instance, created, **kwargs):
+    if not created:
+        # the station may have been renamed
+        transaction.on_commit(routing.index.clear)
+    station_id, name = instance.id, instance.name
+    transaction.on_commit(lambda: autocomplete.index.upsert_station(station_id, name))
+
+
+@receiver(post_delete, sender=Station)
+def unindex_station(sender, instance, **kwargs):
+    station_id = instance.id
+    transaction.on_commit(lambda: autocomplete.index.remove_station(station_id))
+
+
+@receiver(m2m_changed, sender=Buss.facilities.through)
+def update_facility_masks(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        Buss.refresh_facility_masks([instance.pk])
+    elif action == "post_clear":
+        # the cleared rows are gone, but only buses having the bit can be affected
+        Buss.objects.filter(
+            facility_mask=F("facility_mask").bitor(instance.mask)
+        ).update(facility_mask=F("facility_mask").bitxor(instance.mask))
+    else:
+        Buss.refresh_facility_masks(pk_set)
+
+
+@receiver(post_delete, sender=Facility)
+def clear_facility_bit(sender, instance, **kwargs):
+    Buss.objects.filter(
+        facility_mask=F("facility_mask").bitor(instance.mask)
+    ).update(facility_mask=F("facility_mask").bitxor(instance.mask))
+
+
+@receiver(seat_map_changed)
+def update_trip_seats(sender, trip_id, seat_map, **kwargs):
+    routing.index.update_seats(trip_id, seat_map)
+
+
+@receiver(post_save, sender=Trip)
+@receiver(post_delete, sender=Trip)
+@receiver(post_save, sender=Buss)
+@receiver(post_delete, sender=Buss)
+@receiver(post_save, sender=Facility)
+@receiver(post_delete, sender=Facility)
+@receiver(post_save, sender=Station)
+@receiver(post_delete, sender=Station)
+@receiver(post_save, sender=Ticket)
+@receiver(post_delete, sender=Ticket)
+def invalidate_cached_responses(sender, **kwargs):
+    caching.bump_version(sender)
+
+
+@receiver(m2m_changed, sender=Buss.facilities.through)
+def invalidate_bus_facilities(sender, action, **kwargs):
+    if action.startswith("post_"):
+        caching.bump_version(Buss)
+
+
+@receiver(seat_map_changed)
+def invalidate_trip_seats(sender, **kwargs):
+    caching.bump_version(Ticket)
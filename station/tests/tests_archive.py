@@ -0,0 +1,103 @@
+import datetime
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from station import archive
+from station.models import ArchivedTicket, ArchivedTrip, Buss, Order, Station, Ticket, Trip
+
+
+class ArchiveTripsTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="test@test.test", password="testpassword")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.bus = Buss.objects.create(info="AA 0000 BB", num_seats=10)
+        now = timezone.now()
+        self.old = [self.trip(now - datetime.timedelta(days=days)) for days in (200, 120, 100)]
+        self.recent = self.trip(now - datetime.timedelta(days=1))
+        self.order = Order.objects.create(user=self.user)
+        Ticket.bulk_book([
+            Ticket(order=self.order, trip=self.old[0], seat=2),
+            Ticket(order=self.order, trip=self.old[1], seat=3),
+            Ticket(order=self.order, trip=self.recent, seat=1),
+        ])
+
+    def trip(self, departure) -> Trip:
+        return Trip.objects.create(
+            source=Station.get_for_name("Kyiv"),
+            destination=Station.get_for_name("Lviv"),
+            departure=departure,
+            bus=self.bus
+        )
+
+    def archive(self, *args) -> str:
+        out = io.StringIO()
+        call_command("archive_trips", *args, stdout=out)
+        return out.getvalue()
+
+    def test_moves_departed_trips_and_tickets_in_batches(self):
+        output = self.archive("--days", "90", "--batch-size", "2")
+
+        self.assertIn("Archived 3 trip(s) and 2 ticket(s)", output)
+        self.assertIn("in 2 batch(es)", output)
+        self.assertEqual(list(Trip.objects.values_list("id", flat=True)), [self.recent.id])
+        self.assertEqual(list(Ticket.objects.values_list("trip_id", flat=True)), [self.recent.id])
+        archived = ArchivedTrip.objects.get(id=self.old[0].id)
+        self.assertEqual(
+            (archived.source.name, archived.bus_info, archived.bus_num_seats, archived.tickets_available),
+            ("Kyiv", "AA 0000 BB", 10, 9)
+        )
+        self.assertEqual(
+            sorted(ArchivedTicket.objects.values_list("trip_id", "seat", "order_id")),
+            sorted([(self.old[0].id, 2, self.order.id), (self.old[1].id, 3, self.order.id)])
+        )
+
+    def test_query_count_does_not_grow_with_tickets(self):
+        Ticket.bulk_book([Ticket(order=self.order, trip=trip, seat=seat) for trip in self.old for seat in (5, 6, 7)])
+
+        # two batch selects, copies of trips and tickets, the cascade collecting
+        # and deleting holds, tickets and trips, one version bump of Ticket
+        # (created here) and Trip, and the savepoint
+        with self.assertNumQueries(16):
+            archive.archive_trips(timezone.now() - datetime.timedelta(days=90), batch_size=10)
+
+        self.assertEqual(ArchivedTicket.objects.count(), 11)
+
+    def test_dry_run_and_cutoff(self):
+        output = self.archive("--before", (timezone.now() - datetime.timedelta(days=150)).date().isoformat(), "--dry-run")
+
+        self.assertIn("Would archive 1 trip(s) and 1 ticket(s)", output)
+        self.assertEqual(Trip.objects.count(), 4)
+        self.assertFalse(ArchivedTrip.objects.exists())
+
+    def test_orders_still_show_archived_tickets(self):
+        self.archive()
+
+        detail = self.client.get(reverse("station:order-detail", args=(self.order.id,))).json()
+        self.assertEqual(
+            [(ticket["trip"], ticket["seat"]) for ticket in detail["tickets"]],
+            [(self.recent.id, 1), (self.old[0].id, 2), (self.old[1].id, 3)]
+        )
+
+        headers = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+        for url in (reverse("station:order-list"), reverse("station-async:order-list")):
+            (order,) = self.client.get(url, headers=headers).json()["results"]
+            self.assertEqual(
+                [(ticket["trip"]["id"], ticket["trip"]["tickets_available"]) for ticket in order["tickets"]],
+                [(self.recent.id, 9), (self.old[0].id, 9), (self.old[1].id, 9)]
+            )
+
+    def test_deleting_an_order_deletes_its_archived_tickets(self):
+        self.archive()
+
+        self.order.delete()
+
+        self.assertFalse(ArchivedTicket.objects.exists())
+        self.assertEqual(ArchivedTrip.objects.count(), 3)
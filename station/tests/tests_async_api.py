@@ -0,0 +1,123 @@
+import datetime
+import threading
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from station.models import Buss, Trip, Ticket, Order, Facility, Station
+from station.throttling import UserRateThrottle
+
+
+class AsyncReadApiTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test",
+            password="testpassword"
+        )
+        self.headers = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+        self.sync_client = APIClient()
+        self.sync_client.force_authenticate(self.user)
+
+        self.bus = Buss.objects.create(info="AA 0000 BB", num_seats=20)
+        self.wifi = Facility.objects.create(name="Wifi")
+        self.bus.facilities.add(self.wifi)
+        start = timezone.now() + datetime.timedelta(days=1)
+        self.trips = [
+            Trip.objects.create(
+                source=Station.get_for_name("Kyiv"),
+                destination=Station.get_for_name("Lviv"),
+                departure=start + datetime.timedelta(hours=hours),
+                bus=self.bus
+            )
+            for hours in range(3)
+        ]
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(seat=1, trip=self.trips[0], order=order)
+
+    async def test_auth_required(self):
+        res = await self.async_client.get(reverse("station-async:trip-list"))
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_bus_endpoints_match_sync_viewsets(self):
+        for name, args in (("buss-list", ()), ("buss-detail", (self.bus.id,))):
+            res = await self.async_client.get(
+                reverse(f"station-async:{name}", args=args), headers=self.headers
+            )
+            expected = await sync_to_async(self.sync_client.get)(
+                reverse(f"station:{name}", args=args), format="json"
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.content, expected.content)
+
+    async def test_trip_detail_and_orders_match_sync_viewsets(self):
+        for name, args in (("trip-detail", (self.trips[0].id,)), ("order-list", ())):
+            res = await self.async_client.get(
+                reverse(f"station-async:{name}", args=args), headers=self.headers
+            )
+            expected = await sync_to_async(self.sync_client.get)(
+                reverse(f"station:{name}", args=args), format="json"
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.json(), expected.json())
+
+    async def test_trip_list_pages_with_cursor(self):
+        url = reverse("station-async:trip-list")
+
+        first = await self.async_client.get(url, {"page_size": 2}, headers=self.headers)
+        second = await self.async_client.get(first.json()["next"], headers=self.headers)
+
+        self.assertEqual(
+            [trip["id"] for trip in first.json()["results"]],
+            [self.trips[0].id, self.trips[1].id]
+        )
+        self.assertEqual(first.json()["results"][0]["tickets_available"], 19)
+        self.assertEqual([trip["id"] for trip in second.json()["results"]], [self.trips[2].id])
+        self.assertIsNone(second.json()["next"])
+
+    async def test_lists_filtered_by_facilities(self):
+        wc = await Facility.objects.acreate(name="WC")
+        for name in ("buss-list", "trip-list"):
+            for params, found in (
+                ({"facilities": self.wifi.id}, True),
+                ({"facilities": f"{self.wifi.id},{wc.id}", "facilities_mode": "all"}, False),
+                ({"facilities": wc.id, "facilities_mode": "none"}, True),
+            ):
+                res = await self.async_client.get(
+                    reverse(f"station-async:{name}"), params, headers=self.headers
+                )
+
+                self.assertEqual(res.status_code, status.HTTP_200_OK, (name, params))
+                results = res.json()["results"] if name == "trip-list" else res.json()
+                self.assertEqual(bool(results), found, (name, params))
+
+    async def test_throttles_checked_off_the_event_loop(self):
+        threads = []
+
+        def allow_request(throttle, request, view):
+            threads.append(threading.current_thread())
+            return True
+
+        with mock.patch.object(UserRateThrottle, "allow_request", allow_request):
+            res = await self.async_client.get(reverse("station-async:buss-list"), headers=self.headers)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.current_thread())
+
+    async def test_missing_trip(self):
+        res = await self.async_client.get(
+            reverse("station-async:trip-detail", args=(self.trips[-1].id + 1,)),
+            headers=self.headers
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,136 @@
+import datetime
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from station import autocomplete
+from station.models import Buss, Station, Trip
+
+AUTOCOMPLETE_URL = reverse("station:station-autocomplete")
+
+
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        autocomplete.index.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(email="test@test.test", password="testpassword")
+        )
+        self.bus = Buss.objects.create(info="AA 0000 BB", num_seats=20)
+        self.stations = {
+            name: Station.get_for_name(name)
+            for name in ("Kyiv", "Kyiv-Pasazhyrskyi", "Lviv", "Ivano-Frankivsk", "Frankfurt")
+        }
+        for source, destination in [
+            ("Kyiv", "Lviv"), ("Lviv", "Kyiv"), ("Kyiv", "Ivano-Frankivsk"), ("Lviv", "Frankfurt"),
+            ("Frankfurt", "Ivano-Frankivsk"), ("Ivano-Frankivsk", "Lviv"),
+        ]:
+            self.trip(source, destination)
+
+    def tearDown(self):
+        autocomplete.index.clear()
+
+    def trip(self, source, destination) -> Trip:
+        return Trip.objects.create(
+            source=self.stations[source],
+            destination=self.stations[destination],
+            departure=timezone.now() + datetime.timedelta(days=1),
+            bus=self.bus
+        )
+
+    def names(self, query, limit=10):
+        return [suggestion.name for suggestion in autocomplete.index.search(query, limit)]
+
+    def test_prefix_of_any_word_ranked_by_trips(self):
+        self.assertEqual(self.names("fRank"), ["Ivano-Frankivsk", "Frankfurt"])
+        self.assertEqual(self.names("ky"), ["Kyiv", "Kyiv-Pasazhyrskyi"])
+        self.assertEqual(self.names("kyiv pas"), ["Kyiv-Pasazhyrskyi"])
+        self.assertEqual(self.names("l", limit=1), ["Lviv"])
+
+    def test_misspelt_names_suggested_without_prefix_matches(self):
+        self.assertEqual(self.names("frankfrut"), ["Frankfurt"])
+        self.assertEqual(self.names("ivano frankivks"), ["Ivano-Frankivsk"])
+        self.assertEqual(self.names("xyz"), [])
+
+    def test_index_follows_changes_without_queries(self):
+        autocomplete.index.search("k")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            odesa = Station.get_for_name("Odesa")
+            for _ in range(5):
+                trip = self.trip("Kyiv-Pasazhyrskyi", "Lviv")
+            trip.source = odesa
+            trip.save()
+            self.stations["Lviv"].name = "Lvov"
+            self.stations["Lviv"].save()
+
+        with self.assertNumQueries(0):
+            suggestions = autocomplete.index.search("k")
+            self.assertEqual(
+                [(suggestion.name, suggestion.trips) for suggestion in suggestions],
+                [("Kyiv-Pasazhyrskyi", 4), ("Kyiv", 3)]
+            )
+            self.assertEqual(self.names("lvo"), ["Lvov"])
+            self.assertEqual(self.names("od"), ["Odesa"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            trip.delete()
+            odesa.delete()
+        self.assertEqual(self.names("od"), [])
+
+    def test_keystrokes_answered_from_memory(self):
+        Station.objects.bulk_create(
+            Station(name=f"Station {number}", key=f"station {number}") for number in range(5000)
+        )
+        autocomplete.index.load()
+
+        # every one of the 5000 stations matches the first keystrokes
+        with self.assertNumQueries(0):
+            results = {length: self.names("station 499"[:length]) for length in range(1, 12)}
+            repeated = autocomplete.index.search("station 499")
+
+        self.assertEqual(
+            results[1], [f"Station {number}" for number in (0, 1, 10, 100, 1000, 1001, 1002, 1003, 1004, 1005)]
+        )
+        self.assertEqual(results[11], ["Station 499"] + [f"Station 499{digit}" for digit in range(9)])
+        self.assertIs(repeated, autocomplete.index.search("station 499"))
+
+    def test_concurrent_first_queries_load_once(self):
+        started = threading.Barrier(4)
+
+        def search():
+            started.wait()
+            autocomplete.index.search("ky")
+
+        def load():
+            # slow enough for the other threads to find the index missing too
+            time.sleep(0.05)
+            autocomplete.index._loaded_at = time.monotonic()
+
+        with mock.patch.object(autocomplete.index, "load", side_effect=load) as load:
+            threads = [threading.Thread(target=search) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(load.call_count, 1)
+
+    def test_api(self):
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "frank", "limit": 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        station = self.stations["Ivano-Frankivsk"]
+        self.assertEqual(res.data, [{"id": station.id, "name": "Ivano-Frankivsk", "trips": 3}])
+
+    def test_invalid_params(self):
+        for params in ({}, {"q": " "}, {"q": "ky", "limit": 0}, {"q": "ky", "limit": "x"}):
+            res = self.client.get(AUTOCOMPLETE_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, params)
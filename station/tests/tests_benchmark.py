@@ -0,0 +1,39 @@
+from django.test import TestCase
+
+from station import benchmark, seats
+from station.models import Trip, Ticket
+
+
+class BenchmarkHarnessTests(TestCase):
+    def setUp(self):
+        self.counts = benchmark.generate_dataset(buses=3, trips=20, tickets=150, users=5, batch_size=7)
+
+    def test_generated_seat_maps_match_tickets(self):
+        self.assertEqual(Ticket.objects.count(), self.counts["tickets"])
+        self.assertLessEqual(self.counts["tickets"], 150)
+        for trip in Trip.objects.select_related("bus"):
+            sold = sorted(trip.tickets.values_list("seat", flat=True))
+            self.assertEqual(seats.taken_seats(trip.seat_map), sold)
+            self.assertLessEqual(len(sold), trip.bus.num_seats)
+
+    def test_measures_every_get_endpoint(self):
+        user = benchmark.benchmark_user()
+        endpoints, skipped = benchmark.discover_endpoints(user)
+        names = {endpoint.name for endpoint in endpoints}
+
+        self.assertTrue({
+            "station:buss-list", "station:buss-detail", "station:trip-list", "station:trip-detail",
+            "station:order-detail", "station:route-list", "user:manage_user", "user:token_obtain_pair",
+        } <= names)
+        self.assertEqual(skipped, ["station:seathold-detail"])
+
+        with benchmark.benchmark_settings():
+            result = benchmark.measure(endpoints[0], user, requests=3, warmup=0)
+        self.assertEqual(result["statuses"], [200])
+        self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+
+    def test_existing_database_skips_writes(self):
+        endpoints, _ = benchmark.discover_endpoints(benchmark.benchmark_user(), include_writes=False)
+
+        self.assertTrue(endpoints)
+        self.assertEqual([endpoint.name for endpoint in endpoints if endpoint.method != "get"], [])
@@ -0,0 +1,175 @@
+import os
+import sqlite3
+import tempfile
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from station import booking
+from station.tests.tests_order_api import sample_trip
+
+ORDER_URL = reverse("station:order-list")
+
+
+class BookingQueueTests(SimpleTestCase):
+    def make_queue(self, **params) -> booking.BookingQueue:
+        params = {"max_pending": 10, "max_wait": 5.0, "batch_size": 10, **params}
+        queue = booking.BookingQueue(**params)
+        self.addCleanup(queue.close)
+        return queue
+
+    def blocked_writer(self, queue: booking.BookingQueue) -> threading.Event:
+        """Keep the writer busy until the returned event is set"""
+        started, release = threading.Event(), threading.Event()
+
+        def block():
+            started.set()
+            release.wait()
+
+        threading.Thread(target=queue.submit, args=(block,)).start()
+        started.wait()
+        self.addCleanup(release.set)
+        return release
+
+    def submit_all(self, queue, functions) -> list:
+        results = [None] * len(functions)
+
+        def submit(index):
+            try:
+                results[index] = queue.submit(functions[index])
+            except Exception as error:
+                results[index] = error
+
+        threads = [threading.Thread(target=submit, args=(index,)) for index in range(len(functions))]
+        for thread in threads:
+            thread.start()
+        return threads, results
+
+    def test_returns_result_of_writer(self):
+        queue = self.make_queue()
+        self.assertEqual(queue.submit(lambda: threading.current_thread().name), "booking-writer")
+
+    def test_pending_bookings_share_a_commit(self):
+        queue = self.make_queue()
+        release = self.blocked_writer(queue)
+        threads, results = self.submit_all(queue, [lambda number=number: number for number in range(5)])
+        while queue._jobs.qsize() < 5:
+            pass
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, list(range(5)))
+        self.assertEqual(queue.batches, 2)
+
+    def test_failing_booking_does_not_fail_the_batch(self):
+        queue = self.make_queue()
+        release = self.blocked_writer(queue)
+
+        def fail():
+            raise ValueError("no seats")
+
+        threads, results = self.submit_all(queue, [lambda: 1, fail, lambda: 3])
+        while queue._jobs.qsize() < 3:
+            pass
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results[0], 1)
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(results[2], 3)
+
+    def test_full_queue_refuses_bookings(self):
+        queue = self.make_queue(max_pending=1)
+        self.blocked_writer(queue)
+        threads, _ = self.submit_all(queue, [lambda: None])
+        while queue._jobs.qsize() < 1:
+            pass
+
+        with self.assertRaises(booking.QueueFull) as context:
+            queue.submit(lambda: None)
+        self.assertEqual(context.exception.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_booking_not_started_in_time_is_cancelled(self):
+        queue = self.make_queue(max_wait=0.05)
+        self.blocked_writer(queue)
+        booked = []
+
+        with self.assertRaises(booking.QueueTimeout) as context:
+            queue.submit(lambda: booked.append(True))
+        self.assertEqual(context.exception.wait, 1)
+
+        self.assertEqual(booked, [])
+
+
+class BookingSubmitTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="admin@test.test",
+            password="adminpassword",
+            is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+        self.trip = sample_trip()
+
+    @override_settings(BOOKING_QUEUE={"ENABLED": True})
+    def test_runs_inline_inside_transaction(self):
+        with mock.patch.object(booking, "get_queue") as get_queue:
+            self.assertEqual(booking.submit(lambda: 42), 42)
+        get_queue.assert_not_called()
+
+    def test_busy_queue_answers_503_with_retry_after(self):
+        with mock.patch.object(booking, "submit", side_effect=booking.QueueFull(wait=5)):
+            response = self.client.post(
+                ORDER_URL,
+                {"tickets": [{"trip": self.trip.id, "seat": 1}]},
+                format="json"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response["Retry-After"], "5")
+        self.assertEqual(response.data["detail"].code, "booking_queue_full")
+
+
+class SQLiteBackendTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "production.sqlite3")
+
+        connections.settings["production"] = {
+            **connections["default"].settings_dict,
+            "NAME": self.path,
+            "OPTIONS": {
+                "transaction_mode": "IMMEDIATE",
+                "pragmas": {"journal_mode": "wal", "synchronous": "normal"},
+            },
+        }
+        self.addCleanup(connections.settings.pop, "production")
+        self.addCleanup(connections.__delitem__, "production")
+        self.addCleanup(lambda: connections["production"].close())
+
+    def test_applies_pragmas(self):
+        with connections["production"].cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], "wal")
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_transactions_take_the_write_lock_at_once(self):
+        other = sqlite3.connect(self.path, timeout=0, isolation_level=None)
+        self.addCleanup(other.close)
+
+        with transaction.atomic(using="production"):
+            with self.assertRaisesRegex(sqlite3.OperationalError, "locked"):
+                other.execute("BEGIN IMMEDIATE")
+        other.execute("BEGIN IMMEDIATE")
+        other.execute("COMMIT")
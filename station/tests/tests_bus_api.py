@@ -1,9 +1,19 @@
+import tempfile
+from unittest import mock
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
 from rest_framework import status
 from rest_framework.reverse import reverse
 from rest_framework.test import APIClient
 
+from PIL import Image
+
+from station import images
 from station.models import Buss, Facility
 from station.serializers import BussListSerializer, BussRetrieveSerializer
 
@@ -23,6 +33,10 @@ def detail_url(bus_id: int):  #127.0.0.1:8000/api/v1/station/buses/<bus_id>
     return reverse("station:buss-detail", args=(bus_id,))
 
 
+def image_upload_url(bus_id: int):
+    return reverse("station:buss-upload-image", args=(bus_id,))
+
+
 class UnauthenticatedBusApiTests(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -83,6 +97,55 @@ class AuthenticatedBusApiTests(TestCase):
         self.assertIn(serializer_bus_facility_2.data, res.data)
         self.assertNotIn(serializer_without_facility.data, res.data)
 
+    def test_filter_busses_by_facilities_mode(self):
+        wifi = Facility.objects.create(name="Wifi")
+        wc = Facility.objects.create(name="WC")
+        bus_none = sample_bus()
+        bus_wifi = sample_bus(info="AA 0001 BB")
+        bus_both = sample_bus(info="AA 0002 BB")
+        bus_wifi.facilities.add(wifi)
+        bus_both.facilities.add(wifi, wc)
+
+        def ids(mode):
+            res = self.client.get(BUS_URL, {"facilities": f"{wifi.id},{wc.id}", "facilities_mode": mode})
+            return sorted(bus["id"] for bus in res.data)
+
+        self.assertEqual(ids("all"), [bus_both.id])
+        self.assertEqual(ids("any"), [bus_wifi.id, bus_both.id])
+        self.assertEqual(ids("none"), [bus_none.id])
+        self.assertEqual(
+            self.client.get(BUS_URL, {"facilities": wifi.id, "facilities_mode": "most"}).status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+
+    def test_facility_mask_follows_facilities(self):
+        wifi = Facility.objects.create(name="Wifi")
+        wc = Facility.objects.create(name="WC")
+        bus = sample_bus()
+
+        bus.facilities.set([wifi, wc])
+        bus.refresh_from_db()
+        self.assertEqual(bus.facility_mask, wifi.mask | wc.mask)
+
+        wc.busses.remove(bus)
+        bus.refresh_from_db()
+        self.assertEqual(bus.facility_mask, wifi.mask)
+
+        wifi.delete()
+        bus.refresh_from_db()
+        self.assertEqual(bus.facility_mask, 0)
+
+    def test_facility_bit_taken_concurrently_is_retried(self):
+        Facility.objects.create(name="Wifi")
+
+        # a second worker read the same free bit before Wifi was saved
+        with mock.patch.object(Facility, "free_bit", side_effect=[0, 1]):
+            wc = Facility.objects.create(name="WC")
+
+        self.assertEqual(wc.bit, 1)
+        with self.assertRaises(IntegrityError):
+            Facility.objects.create(name="Wifi")
+
     def test_retrieve_bus_detail(self):
         bus = sample_bus()
         bus.facilities.add(Facility.objects.create(name="Wifi"))
@@ -160,3 +223,79 @@ class AdminBussTests(TestCase):
         res = self.client.delete(url)
 
         self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class BussImageUploadTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="admin@test.test",
+            password="adminpassword",
+            is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+        self.bus = sample_bus()
+
+    def _upload(self):
+        with tempfile.NamedTemporaryFile(suffix=".png") as image_file:
+            Image.new("RGB", (2000, 1000), "blue").save(image_file, format="PNG")
+            image_file.seek(0)
+            upload = SimpleUploadedFile("bus.png", image_file.read(), content_type="image/png")
+        return self.client.post(image_upload_url(self.bus.id), {"image": upload}, format="multipart")
+
+    def test_upload_schedules_variants_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            res = self._upload()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["image_variants"], {})
+        self.assertIn(
+            "schedule_variants.<locals>.submit",
+            [callback.__qualname__ for callback in callbacks]
+        )
+
+    def test_variants_served_with_srcset(self):
+        with self.captureOnCommitCallbacks():
+            self._upload()
+        self.bus.refresh_from_db()
+
+        variants = images.render_variants(self.bus.image.storage.location, self.bus.image.name)
+        images.store_variants(self.bus.id, self.bus.image.name, variants)
+
+        res = self.client.get(detail_url(self.bus.id))
+        thumbnail = res.data["image_variants"]["thumbnail"]
+
+        self.assertEqual((thumbnail["width"], thumbnail["height"]), (160, 80))
+        self.assertEqual(res.data["image_variants"]["full"]["width"], 1280)
+        self.assertTrue(thumbnail["url"].startswith("http://testserver/media/"))
+        self.assertIn(f"{thumbnail['url']} 160w", res.data["image_variants"]["srcset"])
+
+    def test_stale_variants_not_stored(self):
+        name = default_storage.save("upload/busses/old-thumbnail.jpg", ContentFile(b"jpeg"))
+
+        images.store_variants(self.bus.id, "upload/busses/old.jpg", {"thumbnail": {"name": name}})
+
+        self.bus.refresh_from_db()
+        self.assertEqual(self.bus.image_variants, {})
+        self.assertFalse(default_storage.exists(name))
+
+    def test_new_image_deletes_old_variants(self):
+        with self.captureOnCommitCallbacks():
+            self._upload()
+        self.bus.refresh_from_db()
+        variants = images.render_variants(self.bus.image.storage.location, self.bus.image.name)
+        images.store_variants(self.bus.id, self.bus.image.name, variants)
+
+        with self.captureOnCommitCallbacks(execute=True), mock.patch.object(images, "schedule_variants"):
+            self._upload()
+
+        self.assertFalse(any(default_storage.exists(variant["name"]) for variant in variants.values()))
+
+    def test_no_variants_without_image(self):
+        self.bus.image = None
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            images.schedule_variants(self.bus)
+
+        self.assertEqual(callbacks, [])
@@ -0,0 +1,160 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.utils.http import http_date
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from station.models import Buss, CacheVersion, Facility
+
+BUS_URL = reverse("station:buss-list")
+FACILITY_URL = reverse("station:facility-list")
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "responses": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "responses-tests",
+    },
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        caches["responses"].clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        Buss.objects.create(info="AA 0000 BB", num_seats=50)
+
+    def test_repeated_list_served_with_one_query(self):
+        first = self.client.get(BUS_URL)
+
+        # the versions of the models the list depends on
+        with self.assertNumQueries(1):
+            second = self.client.get(BUS_URL)
+
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(first.data, second.data)
+
+    def test_query_params_normalised(self):
+        self.client.get(BUS_URL, {"facilities": "1", "format": "json"})
+
+        res = self.client.get(BUS_URL, {"format": "json", "facilities": "1"})
+
+        self.assertEqual(res["X-Cache"], "HIT")
+
+    def test_bus_change_invalidates_list(self):
+        self.client.get(BUS_URL)
+
+        Buss.objects.create(info="AA 0001 BB", num_seats=30)
+        res = self.client.get(BUS_URL)
+
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(len(res.data), 2)
+
+    def test_facility_added_to_bus_invalidates_list(self):
+        self.client.get(BUS_URL)
+        self.client.get(FACILITY_URL)
+
+        bus = Buss.objects.get()
+        bus.facilities.add(Facility.objects.create(name="Wifi"))
+
+        self.assertEqual(self.client.get(BUS_URL).data[0]["facilities"], ["Wifi"])
+        self.assertEqual(self.client.get(FACILITY_URL)["X-Cache"], "MISS")
+
+    def test_unrelated_change_keeps_cache(self):
+        self.client.get(FACILITY_URL)
+
+        Buss.objects.create(info="AA 0001 BB", num_seats=30)
+
+        self.assertEqual(self.client.get(FACILITY_URL)["X-Cache"], "HIT")
+
+    def test_change_made_by_another_worker_invalidates_list(self):
+        self.client.get(BUS_URL)
+
+        # another worker's change reaches this one through the database only
+        Buss.objects.update(info="AA 0001 BB")
+        CacheVersion.objects.filter(label="station.buss").update(version=F("version") + 1)
+        res = self.client.get(BUS_URL)
+
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data[0]["info"], "AA 0001 BB")
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ConditionalRequestTests(TestCase):
+    def setUp(self):
+        caches["responses"].clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.bus = Buss.objects.create(info="AA 0000 BB", num_seats=50)
+
+    def test_matching_etag_is_not_modified_with_one_query(self):
+        etag = self.client.get(BUS_URL)["ETag"]
+
+        with self.assertNumQueries(1):
+            res = self.client.get(BUS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res["ETag"], etag)
+        self.assertEqual(res.content, b"")
+
+    def test_change_produces_new_etag(self):
+        etag = self.client.get(reverse("station:buss-detail", args=(self.bus.id,)))["ETag"]
+
+        self.bus.num_seats = 40
+        self.bus.save()
+        res = self.client.get(reverse("station:buss-detail", args=(self.bus.id,)), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res["ETag"], etag)
+
+    def test_if_modified_since(self):
+        changed = datetime.datetime.fromtimestamp(1_000_000, datetime.timezone.utc)
+        with mock.patch("station.caching.timezone.now", return_value=changed):
+            self.bus.save()
+            Facility.objects.create(name="Wifi")
+        first = self.client.get(BUS_URL)
+
+        res = self.client.get(BUS_URL, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+
+        self.assertEqual(first["Last-Modified"], http_date(1_000_000))
+        self.assertEqual(res.status_code, 304)
+
+    def test_validators_shared_by_workers(self):
+        changed = datetime.datetime.fromtimestamp(1_000_000, datetime.timezone.utc)
+        with mock.patch("station.caching.timezone.now", return_value=changed):
+            self.bus.save()
+            Facility.objects.create(name="Wifi")
+        first = self.client.get(BUS_URL)
+
+        # a worker that has not served the list yet
+        caches["responses"].clear()
+        res = self.client.get(
+            BUS_URL, HTTP_IF_NONE_MATCH=first["ETag"], HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]
+        )
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual((res["ETag"], res["Last-Modified"]), (first["ETag"], first["Last-Modified"]))
+
+    def test_last_modified_omitted_within_the_changing_second(self):
+        self.bus.save()
+
+        res = self.client.get(BUS_URL)
+
+        self.assertFalse(res.has_header("Last-Modified"))
+        self.assertIn("no-cache", res["Cache-Control"])
@@ -0,0 +1,98 @@
+import csv
+import datetime
+import io
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from station import archive, exports
+from station.models import Buss, Trip, Order, Station, Ticket
+
+
+class ExportApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_superuser(
+            email="admin@test.test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.admin)
+
+        bus = Buss.objects.create(info="AA 0000 BB", num_seats=20)
+        self.trip = Trip.objects.create(
+            source=Station.get_for_name("Kyiv"),
+            destination=Station.get_for_name("Lviv"),
+            departure=timezone.now() + datetime.timedelta(days=1),
+            bus=bus
+        )
+        self.orders = []
+        for days_ago, seat in ((10, 1), (1, 2)):
+            order = Order.objects.create(user=self.admin)
+            Order.objects.filter(pk=order.pk).update(
+                created_at=timezone.now() - datetime.timedelta(days=days_ago)
+            )
+            Ticket.objects.create(order=order, trip=self.trip, seat=seat)
+            self.orders.append(order)
+
+    def _export(self, kind, **params):
+        res = self.client.get(reverse("station:export", args=(kind,)), params)
+        return res, b"".join(res.streaming_content).decode() if res.streaming else None
+
+    def test_tickets_csv(self):
+        res, content = self._export("tickets")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "text/csv")
+        self.assertIn("attachment;", res["Content-Disposition"])
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual([row["seat"] for row in rows], ["1", "2"])
+        self.assertEqual(rows[0]["source"], "Kyiv")
+        self.assertEqual(rows[0]["order_id"], str(self.orders[0].id))
+
+    def test_orders_jsonl_filtered_by_date(self):
+        after = (timezone.now() - datetime.timedelta(days=5)).date().isoformat()
+
+        res, content = self._export("orders", output="jsonl", after=after)
+
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row["id"] for row in rows], [self.orders[1].id])
+        self.assertEqual(rows[0]["user_email"], "admin@test.test")
+
+    def test_archived_trips_and_tickets(self):
+        Trip.objects.filter(pk=self.trip.pk).update(departure=timezone.now() - datetime.timedelta(days=200))
+        archive.archive_trips()
+
+        _, live = self._export("tickets")
+        _, tickets = self._export("archived_tickets")
+        res, trips = self._export("archived_trips", output="jsonl")
+
+        self.assertEqual(len(list(csv.DictReader(io.StringIO(live)))), 0)
+        rows = list(csv.DictReader(io.StringIO(tickets)))
+        self.assertEqual([(row["seat"], row["source"]) for row in rows], [("1", "Kyiv"), ("2", "Kyiv")])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        trip = json.loads(trips)
+        self.assertEqual((trip["id"], trip["bus_info"], trip["destination"]), (self.trip.id, "AA 0000 BB", "Lviv"))
+
+    def test_rows_are_streamed_in_blocks(self):
+        with mock.patch.object(exports, "BLOCK_SIZE", 10):
+            blocks = list(exports.stream("tickets", "csv"))
+
+        self.assertEqual(len(blocks), 3)
+        self.assertTrue(blocks[0].startswith(b"id,order_id,"))
+
+    def test_invalid_params(self):
+        self.assertEqual(self._export("users")[0].status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self._export("trips", output="xml")[0].status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._export("trips", after="soon")[0].status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_admin_only(self):
+        user = get_user_model().objects.create_user(email="test@test.test", password="testpassword")
+        self.client.force_authenticate(user)
+
+        self.assertEqual(self._export("orders")[0].status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,143 @@
+import io
+import json
+import pathlib
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from station.models import Buss, Facility, Station, Trip
+
+TRIPS_CSV = """source,destination,departure,arrival,bus
+Kyiv,Lviv,2030-06-01T08:00:00Z,2030-06-01T14:00:00Z,AA 0000 BB
+Kyiv,Odesa,2030-06-01 09:00,,{bus_id}
+Lviv,,2030-06-01T10:00:00Z,,AA 0000 BB
+Lviv,Kyiv,not a date,,AA 0000 BB
+Lviv,Kyiv,2030-06-01T10:00:00Z,2030-06-01T09:00:00Z,AA 0000 BB
+Lviv,Kyiv,2030-06-01T10:00:00Z,,XX 9999 XX
+"""
+
+
+class ImportTimetableCommandTests(TestCase):
+    def setUp(self):
+        self.bus = Buss.objects.create(info="AA 0000 BB", num_seats=40)
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_imports_valid_rows_and_writes_rejects(self):
+        source = self.path / "trips.csv"
+        source.write_text(TRIPS_CSV.format(bus_id=self.bus.id))
+        rejects = self.path / "rejects.jsonl"
+
+        call_command(
+            "import_timetable", "trips", str(source),
+            rejects=str(rejects), chunk_size=1, stdout=io.StringIO()
+        )
+
+        self.assertEqual(
+            list(Trip.objects.order_by("departure").values_list("destination__name", "bus")),
+            [("Lviv", self.bus.id), ("Odesa", self.bus.id)]
+        )
+        # rejected rows create no stations
+        self.assertEqual(
+            sorted(Station.objects.values_list("name", flat=True)), ["Kyiv", "Lviv", "Odesa"]
+        )
+        rejected = [json.loads(line) for line in rejects.read_text().splitlines()]
+        self.assertEqual([record["line"] for record in rejected], [4, 5, 6, 7])
+        self.assertEqual(
+            [set(record["errors"]) for record in rejected],
+            [{"destination"}, {"departure"}, {"arrival"}, {"bus"}]
+        )
+
+    def test_dry_run_writes_nothing(self):
+        source = self.path / "trips.csv"
+        source.write_text(TRIPS_CSV.format(bus_id=self.bus.id))
+        out = io.StringIO()
+
+        call_command("import_timetable", "trips", str(source), dry_run=True, stdout=out)
+
+        self.assertFalse(Trip.objects.exists())
+        self.assertFalse(Station.objects.exists())
+        self.assertIn("Validated 2 of 6", out.getvalue())
+
+    def test_imports_buses_from_jsonl(self):
+        Facility.objects.create(name="Wifi")
+        source = self.path / "buses.jsonl"
+        source.write_text(
+            '{"info": "BB 1111 CC", "num_seats": 30, "facilities": ["Wifi"]}\n'
+            '{"info": "BB 2222 CC", "num_seats": 0}\n'
+            "not json\n"
+        )
+
+        call_command("import_timetable", "buses", str(source), stdout=io.StringIO())
+
+        bus = Buss.objects.get(info="BB 1111 CC")
+        self.assertEqual(list(bus.facilities.values_list("name", flat=True)), ["Wifi"])
+        self.assertEqual(Buss.objects.count(), 2)
+
+
+class ImportApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.bus = Buss.objects.create(info="AA 0000 BB", num_seats=40)
+
+    def _upload(self, content, name="trips.jsonl", kind="trip"):
+        return self.client.post(
+            reverse(f"station:{kind}-import-rows"),
+            {"file": SimpleUploadedFile(name, content if isinstance(content, bytes) else content.encode())},
+            format="multipart"
+        )
+
+    def test_admin_upload(self):
+        admin = get_user_model().objects.create_superuser(email="admin@test.test", password="testpassword")
+        self.client.force_authenticate(admin)
+
+        res = self._upload(
+            json.dumps({"source": "Kyiv", "destination": "Lviv",
+                        "departure": "2030-06-01T08:00:00Z", "bus": self.bus.id}) + "\n"
+            + json.dumps({"source": "Kyiv", "bus": self.bus.id}) + "\n"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual((res.data["created"], res.data["rejected"]), (1, 1))
+        self.assertEqual(res.data["rejects"][0]["line"], 2)
+        self.assertEqual(Trip.objects.get().destination.name, "Lviv")
+
+    def test_malformed_rows_rejected_one_by_one(self):
+        admin = get_user_model().objects.create_superuser(email="admin@test.test", password="testpassword")
+        self.client.force_authenticate(admin)
+
+        trips = self._upload(
+            "source,destination,departure,bus\n".encode()
+            + "Kyiv,Lviv,2030-06-01T08:00:00Z,{}\n".format(self.bus.id).encode()
+            + "Ky\xefv,Lviv,2030-06-01T08:00:00Z,{}\n".format(self.bus.id).encode("latin-1"),
+            name="trips.csv"
+        )
+        buses = self._upload(
+            '{"num_seats": 30, "facilities": [["Wifi"]]}\n'
+            '{"num_seats": 30, "facilities": {"Wifi": true}}\n',
+            kind="buss"
+        )
+
+        self.assertEqual(trips.status_code, status.HTTP_200_OK)
+        self.assertEqual((trips.data["created"], trips.data["rejected"]), (1, 1))
+        self.assertEqual(trips.data["rejects"][0]["errors"], {"row": "the row is not valid UTF-8"})
+        self.assertEqual(buses.status_code, status.HTTP_200_OK)
+        self.assertEqual(buses.data["rejected"], 2)
+        self.assertEqual([*buses.data["rejects"][0]["errors"]], ["facilities"])
+
+    def test_upload_requires_admin(self):
+        user = get_user_model().objects.create_user(email="test@test.test", password="testpassword")
+        self.client.force_authenticate(user)
+
+        res = self._upload("{}\n")
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
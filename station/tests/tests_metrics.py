@@ -0,0 +1,105 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from station import metrics
+from station.middleware import RequestMetricsMiddleware
+from station.models import Buss, Facility
+
+METRICS_URL = reverse("station:metrics")
+METRICS_ON = {"ENABLED": True, "SAMPLE_RATE": 1.0, "LOG": False, "MAX_DUPLICATES": 20}
+
+
+@override_settings(REQUEST_METRICS=METRICS_ON)
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        metrics.registry.reset()
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_superuser(
+            email="admin@test.test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.admin)
+        bus = Buss.objects.create(info="AA 0000 BB", num_seats=20)
+        bus.facilities.add(Facility.objects.create(name="Wifi"))
+
+    def test_records_view_action(self):
+        self.client.get(reverse("station:buss-list"))
+        self.client.get(reverse("station:buss-list"))
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        bus_list = res.data["views"]["BusViewSet.list"]
+        self.assertEqual(bus_list["requests"], 2)
+        self.assertEqual(bus_list["latency_ms"]["count"], 2)
+        self.assertGreater(bus_list["queries"]["sum"], 0)
+
+    def test_reset(self):
+        self.client.get(reverse("station:buss-list"))
+
+        res = self.client.delete(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertNotIn("BusViewSet.list", self.client.get(METRICS_URL).data["views"])
+
+    def test_admin_only(self):
+        user = get_user_model().objects.create_user(email="test@test.test", password="testpassword")
+        self.client.force_authenticate(user)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_duplicate_queries_are_fingerprinted(self):
+        queries = [
+            'SELECT * FROM "station_trip" WHERE "id" IN (%s, %s)',
+            'SELECT * FROM "station_trip" WHERE "id" IN (%s, %s, %s)',
+            'SELECT * FROM "station_buss" WHERE "id" = %s LIMIT 21',
+        ]
+
+        fingerprints = {metrics.fingerprint(sql) for sql in queries}
+
+        self.assertEqual(len(fingerprints), 2)
+
+    def test_queries_of_every_database_are_counted(self):
+        # a second database, e.g. a replica, only for this test
+        connections.settings["metrics_test"] = {**connections["default"].settings_dict, "NAME": ":memory:"}
+        self.addCleanup(connections.settings.pop, "metrics_test")
+        self.addCleanup(connections.__delitem__, "metrics_test")
+        self.addCleanup(lambda: connections["metrics_test"].close())
+
+        def view(request):
+            for alias in ("default", "metrics_test"):
+                with connections[alias].cursor() as cursor:
+                    cursor.execute("SELECT 1")
+            return HttpResponse()
+
+        with mock.patch.object(metrics.registry, "record") as record:
+            RequestMetricsMiddleware(view)(RequestFactory().get("/"))
+
+        self.assertEqual(record.call_args.args[0].queries, 2)
+
+    @override_settings(REQUEST_METRICS={**METRICS_ON, "ENABLED": False})
+    def test_disabled_middleware_is_not_used(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            RequestMetricsMiddleware(lambda request: None)
+
+
+class HistogramTests(TestCase):
+    def test_percentiles_use_bucket_bounds(self):
+        histogram = metrics.Histogram((1, 10, 100))
+        for value in (0.5, 5, 5, 50, 500):
+            histogram.add(value)
+
+        self.assertEqual(histogram.percentile(50), 10)
+        self.assertEqual(histogram.percentile(80), 100)
+        self.assertIsNone(histogram.percentile(99))
+        self.assertEqual(histogram.as_dict()["buckets"]["inf"], 1)
@@ -0,0 +1,96 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from station.models import Buss, Trip, Ticket, Order, Station
+
+ORDER_URL = reverse("station:order-list")
+
+
+def sample_trip(**params) -> Trip:
+    if "bus" not in params:
+        params["bus"] = Buss.objects.create(info="AA 0000 BB", num_seats=50)
+    default = {
+        "source": "Kyiv",
+        "destination": "Lviv",
+        "departure": timezone.now() + datetime.timedelta(days=1)
+    }
+    default.update(params)
+    for field in ("source", "destination"):
+        default[field] = Station.get_for_name(default[field])
+    return Trip.objects.create(**default)
+
+
+class OrderCreateTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="admin@test.test",
+            password="adminpassword",
+            is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+        self.trip = sample_trip()
+
+    def _order(self, seats, trip=None):
+        trip = trip or self.trip
+        payload = {"tickets": [{"seat": seat, "trip": trip.id} for seat in seats]}
+        return self.client.post(ORDER_URL, payload, format="json")
+
+    def test_create_order_books_all_seats(self):
+        res = self._order([1, 2, 3])
+
+        self.trip.refresh_from_db()
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Ticket.objects.filter(order_id=res.data["id"]).count(), 3)
+        self.assertEqual(self.trip.taken_seats, [1, 2, 3])
+
+    def test_group_booking_query_count_does_not_grow_with_seats(self):
+        with CaptureQueriesContext(connection) as small:
+            self._order([1, 2])
+        with CaptureQueriesContext(connection) as large:
+            self._order(list(range(10, 50)))
+
+        self.assertEqual(len(small), len(large))
+
+    def test_taken_seats_reported_per_ticket(self):
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(seat=2, trip=self.trip, order=order)
+
+        res = self._order([1, 2])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data["tickets"][0], {})
+        self.assertIn("seat", res.data["tickets"][1])
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_duplicate_seats_in_one_order_rejected(self):
+        res = self._order([5, 5])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("seat", res.data["tickets"][1])
+
+    def test_seat_out_of_range_rejected(self):
+        res = self._order([51])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("seat", res.data["tickets"][0])
+
+    def test_unknown_trip_rejected(self):
+        res = self.client.post(
+            ORDER_URL,
+            {"tickets": [{"seat": 1, "trip": self.trip.id + 100}]},
+            format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("trip", res.data["tickets"][0])
+
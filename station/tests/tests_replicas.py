@@ -0,0 +1,154 @@
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from station import replicas
+from station.checks import check_replica_sticky_cache
+from station.middleware import ReplicaRoutingMiddleware
+from station.models import Trip
+from station.replicas import PrimaryReplicaRouter
+
+REPLICAS = override_settings(DATABASE_REPLICAS=["replica1"])
+
+
+@REPLICAS
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        caches["replicas"].clear()
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+        self.user = get_user_model()(pk=1, email="user@test.test")
+
+    def route(self, request, model=Trip):
+        token = replicas.begin_request(request)
+        try:
+            return self.router.db_for_read(model)
+        finally:
+            replicas.end_request(token)
+
+    def test_safe_request_reads_from_replica(self):
+        self.assertEqual(self.route(self.factory.get("/")), "replica1")
+
+    def test_unsafe_request_reads_from_primary(self):
+        self.assertEqual(self.route(self.factory.post("/")), "default")
+
+    def test_outside_request_reads_from_primary(self):
+        self.assertEqual(self.router.db_for_read(Trip), "default")
+
+    def test_users_and_sessions_read_from_primary(self):
+        request = self.factory.get("/")
+        self.assertEqual(self.route(request, get_user_model()), "default")
+        self.assertEqual(self.route(request, Session), "default")
+
+    def test_atomic_block_reads_from_primary(self):
+        request = self.factory.get("/")
+        with mock.patch.object(connections["default"], "in_atomic_block", True):
+            token = replicas.begin_request(request)
+            try:
+                self.assertEqual(self.router.db_for_read(Trip), "default")
+            finally:
+                replicas.end_request(token)
+
+    def test_sticky_user_reads_from_primary(self):
+        request = self.factory.get("/")
+        request.user = self.user
+        replicas.stick_to_primary(self.user.pk)
+        self.assertEqual(self.route(request), "default")
+
+        other = self.factory.get("/")
+        other.user = get_user_model()(pk=2, email="other@test.test")
+        self.assertEqual(self.route(other), "replica1")
+
+    def test_no_replicas(self):
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(self.route(self.factory.get("/")), "default")
+
+    def test_writes_and_migrations_use_primary(self):
+        self.assertEqual(self.router.db_for_write(Trip), "default")
+        self.assertFalse(self.router.allow_migrate("replica1", "station"))
+        self.assertTrue(self.router.allow_migrate("default", "station"))
+
+    def middleware(self, status_code):
+        def view(request):
+            request.user = self.user
+            return HttpResponse(status=status_code)
+
+        return ReplicaRoutingMiddleware(view)
+
+    def test_middleware_sticks_user_after_write(self):
+        self.middleware(201)(self.factory.post("/"))
+        self.assertTrue(replicas.is_sticky(self.user.pk))
+
+    def test_middleware_ignores_reads_and_failed_writes(self):
+        self.middleware(200)(self.factory.get("/"))
+        self.middleware(400)(self.factory.post("/"))
+        self.assertFalse(replicas.is_sticky(self.user.pk))
+
+    def test_middleware_unused_without_replicas(self):
+        with override_settings(DATABASE_REPLICAS=[]):
+            with self.assertRaises(MiddlewareNotUsed):
+                ReplicaRoutingMiddleware(lambda request: HttpResponse())
+
+
+class StickyCacheCheckTests(SimpleTestCase):
+    def test_process_local_cache_is_refused(self):
+        with REPLICAS:
+            errors = check_replica_sticky_cache(None)
+
+        self.assertEqual([error.id for error in errors], ["station.E002"])
+
+    def test_shared_cache_passes(self):
+        shared = {**settings.CACHES, "replicas": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": tempfile.gettempdir(),
+        }}
+        with REPLICAS, override_settings(CACHES=shared):
+            self.assertEqual(check_replica_sticky_cache(None), [])
+        with REPLICAS, override_settings(REPLICA_STICKY_CACHE="missing"):
+            self.assertEqual([error.id for error in check_replica_sticky_cache(None)], ["station.E001"])
+
+    def test_not_checked_without_replicas(self):
+        self.assertEqual(check_replica_sticky_cache(None), [])
+
+
+class SyncReplicasTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "replica.sqlite3")
+
+        # the replica alias only exists for this test
+        connections.settings["replica_test"] = {
+            **connections["default"].settings_dict,
+            "NAME": self.path,
+        }
+        self.addCleanup(connections.settings.pop, "replica_test")
+        self.addCleanup(connections.__delitem__, "replica_test")
+        self.addCleanup(lambda: connections["replica_test"].close())
+
+    def test_copies_primary(self):
+        out = StringIO()
+        with override_settings(DATABASE_REPLICAS=["replica_test"]):
+            call_command("sync_replicas", stdout=out)
+
+        self.assertIn("Synced replica_test", out.getvalue())
+        with sqlite3.connect(self.path) as replica:
+            tables = {row[0] for row in replica.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self.assertIn(Trip._meta.db_table, tables)
+
+    def test_no_replicas(self):
+        out = StringIO()
+        call_command("sync_replicas", stdout=out)
+        self.assertIn("No replicas configured", out.getvalue())
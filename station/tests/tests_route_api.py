@@ -0,0 +1,109 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from station import routing, seats
+from station.models import Buss, Station, Trip
+
+ROUTE_URL = reverse("station:route-list")
+START = (timezone.now() + datetime.timedelta(days=1)).replace(microsecond=0)
+
+
+def at(hours: float) -> datetime.datetime:
+    return START + datetime.timedelta(hours=hours)
+
+
+class RouteApiTests(TestCase):
+    def setUp(self):
+        routing.index.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.bus = Buss.objects.create(info="AA 0000 BB", num_seats=2)
+
+    def tearDown(self):
+        routing.index.clear()
+
+    def trip(self, source, destination, departure, arrival, **params) -> Trip:
+        return Trip.objects.create(
+            source=Station.get_for_name(source),
+            destination=Station.get_for_name(destination),
+            departure=at(departure),
+            arrival=at(arrival),
+            bus=self.bus,
+            **params
+        )
+
+    def search(self, **params):
+        params.setdefault("departure_after", START.isoformat())
+        return self.client.get(ROUTE_URL, {"source": "A", "destination": "C", **params})
+
+    def legs(self, res):
+        return [[leg["trip"] for leg in journey["legs"]] for journey in res.data]
+
+    def test_journey_with_transfer(self):
+        first = self.trip("A", "B", 1, 2)
+        second = self.trip("B", "C", 3, 4)
+
+        res = self.search()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.legs(res), [[first.id, second.id]])
+        self.assertEqual(res.data[0]["transfers"], 1)
+
+    def test_minimum_connection_time_respected(self):
+        self.trip("A", "B", 1, 2)
+        self.trip("B", "C", 2.1, 3)
+        later = self.trip("B", "C", 2.5, 3.5)
+
+        res = self.search(min_connection=20)
+
+        self.assertEqual(self.legs(res)[0][1], later.id)
+
+    def test_pareto_journeys_fewest_transfers_first(self):
+        direct = self.trip("A", "C", 1, 6)
+        first = self.trip("A", "B", 1, 2)
+        second = self.trip("B", "C", 3, 4)
+
+        res = self.search()
+
+        self.assertEqual(self.legs(res), [[direct.id], [first.id, second.id]])
+
+    def test_sold_out_leg_skipped(self):
+        self.trip("A", "B", 1, 2)
+        Trip.objects.filter(
+            id=self.trip("B", "C", 3, 4).id
+        ).update(seat_map=seats.occupy(b"", [1, 2]))
+        fallback = self.trip("B", "C", 5, 6)
+
+        res = self.search()
+
+        self.assertEqual(self.legs(res)[0][1], fallback.id)
+
+    def test_index_updated_when_trips_change(self):
+        self.search()
+        self.assertTrue(routing.index.is_loaded)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.trip("A", "B", 1, 2)
+            second = self.trip("B", "C", 3, 4)
+
+        self.assertEqual(self.legs(self.search()), [[first.id, second.id]])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+
+        self.assertEqual(self.search().data, [])
+
+    def test_source_and_destination_required(self):
+        res = self.client.get(ROUTE_URL, {"source": "A"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
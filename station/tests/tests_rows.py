@@ -0,0 +1,115 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from station import archive
+from station.models import Buss, Facility, Order, SeatHold, Station, Ticket, Trip
+from station.views import BusViewSet, OrderViewSet, TripViewSet
+
+
+class FastListTests(TestCase):
+    """The fast list path renders exactly the bytes of the list serializers"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@test.test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+
+        wifi = Facility.objects.create(name="Wifi")
+        usb = Facility.objects.create(name="USB – «Type C»")
+        big = Buss.objects.create(info="AA 0000 BB", num_seats=50)
+        big.facilities.add(usb, wifi)
+        small = Buss.objects.create(info=None, num_seats=20, image_variants={
+            "card": {"name": "upload/busses/small-card.jpg", "width": 480, "height": 320},
+            "thumbnail": {"name": "upload/busses/small-thumbnail.jpg", "width": 160, "height": 107},
+        })
+        small.facilities.add(wifi)
+        Buss.objects.create(info="Ключ ", num_seats=30)
+
+        departure = timezone.now().replace(microsecond=123456) + datetime.timedelta(days=1)
+        kyiv, lviv, odesa = map(Station.get_for_name, ("Kyiv", "Lviv", "Odesa"))
+        self.trips = [
+            Trip.objects.create(source=kyiv, destination=lviv, departure=departure, bus=big),
+            Trip.objects.create(
+                source=lviv, destination=odesa, departure=departure,
+                arrival=departure + datetime.timedelta(hours=9, seconds=1), bus=small
+            ),
+            Trip.objects.create(
+                source=odesa, destination=kyiv, departure=departure.replace(microsecond=0), bus=big
+            ),
+        ]
+        SeatHold.place(self.trips[0].id, self.user, [5, 6], datetime.timedelta(minutes=10))
+
+        for trip, order_seats in ((self.trips[0], (3, 1)), (self.trips[1], (2,)), (self.trips[0], (7,))):
+            order = Order.objects.create(user=self.user)
+            Ticket.bulk_book([Ticket(order=order, trip=trip, seat=seat) for seat in order_seats])
+        order = Order.objects.create(user=self.user)
+        Ticket.bulk_book([Ticket(order=order, trip=self.trips[1], seat=1), Ticket(order=order, trip=self.trips[2], seat=1)])
+        Order.objects.create(user=get_user_model().objects.create_user(email="other@test.test", password="testpassword"))
+
+    def assert_same_as_serializer(self, viewset, url, params=None):
+        with CaptureQueriesContext(connection) as fast_queries:
+            fast = self.client.get(url, params)
+        with mock.patch.object(viewset, "fast_list", False):
+            with CaptureQueriesContext(connection) as slow_queries:
+                slow = self.client.get(url, params)
+
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast.content, slow.content)
+        self.assertEqual(fast["Content-Type"], slow["Content-Type"])
+        self.assertLessEqual(len(fast_queries), len(slow_queries))
+        return fast
+
+    def test_trip_list(self):
+        response = self.assert_same_as_serializer(TripViewSet, reverse("station:trip-list"))
+        trips = {trip["id"]: trip for trip in response.json()["results"]}
+        # 3 sold and 2 held seats
+        self.assertEqual(trips[self.trips[0].id]["tickets_available"], 45)
+        for trip in Trip.objects.select_related("bus"):
+            self.assertEqual(trips[trip.id]["tickets_available"], trip.tickets_available)
+
+    def test_trip_list_pages(self):
+        url = reverse("station:trip-list")
+        response = self.assert_same_as_serializer(TripViewSet, url, {"page_size": 2})
+        self.assert_same_as_serializer(TripViewSet, response.json()["next"])
+        self.assert_same_as_serializer(TripViewSet, url, {"source": "Lviv"})
+
+    def test_trip_list_in_other_time_zone(self):
+        with timezone.override("Europe/Kyiv"):
+            response = self.assert_same_as_serializer(TripViewSet, reverse("station:trip-list"))
+        self.assertNotIn("Z", response.json()["results"][0]["departure"])
+
+    def test_bus_list(self):
+        response = self.assert_same_as_serializer(BusViewSet, reverse("station:buss-list"))
+        self.assertIn("srcset", response.json()[1]["image_variants"])
+        self.assert_same_as_serializer(BusViewSet, reverse("station:buss-list"), {"facilities": "1"})
+
+    def test_order_list(self):
+        url = reverse("station:order-list")
+        self.assert_same_as_serializer(OrderViewSet, url)
+        self.assert_same_as_serializer(OrderViewSet, url, {"page": 2})
+        self.assert_same_as_serializer(OrderViewSet, url, {"page_size": 20})
+
+    def test_order_list_with_archived_tickets(self):
+        Trip.objects.filter(id=self.trips[1].id).update(departure=timezone.now() - datetime.timedelta(days=1))
+        archive.archive_trips(timezone.now())
+
+        response = self.assert_same_as_serializer(OrderViewSet, reverse("station:order-list"), {"page_size": 20})
+        tickets = [ticket for order in response.json()["results"] for ticket in order["tickets"]]
+        self.assertEqual(len(tickets), 6)
+        self.assertIn(self.trips[1].id, [ticket["trip"]["id"] for ticket in tickets])
+
+    def test_browsable_api_is_unchanged(self):
+        response = self.client.get(reverse("station:trip-list"), HTTP_ACCEPT="text/html")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Kyiv")
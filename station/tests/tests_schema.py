@@ -0,0 +1,98 @@
+import gzip
+import json
+import pathlib
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from app import schema
+
+SCHEMA_URL = reverse("schema")
+
+
+class BuildSchemaTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = pathlib.Path(cls.directory.name)
+        call_command("build_schema", output=cls.directory.name, stdout=StringIO(), stderr=StringIO())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        settings = override_settings(OPENAPI_SCHEMA_DIR=self.path)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_documents_jwt_authentication(self):
+        document = json.loads((self.path / schema.FILES["json"]).read_bytes())
+        self.assertEqual(
+            document["components"]["securitySchemes"]["jwtAuth"],
+            {"type": "http", "scheme": "bearer", "bearerFormat": "JWT"}
+        )
+        self.assertIn({"jwtAuth": []}, document["paths"]["/api/v1/stations/trips/"]["get"]["security"])
+
+    def test_writes_every_format(self):
+        for name in schema.FILES.values():
+            content = (self.path / name).read_bytes()
+            self.assertEqual(gzip.decompress((self.path / f"{name}.gz").read_bytes()), content)
+        self.assertIn("/api/v1/stations/trips/", json.loads((self.path / "openapi.json").read_bytes())["paths"])
+
+    def test_check(self):
+        out = StringIO()
+        call_command("build_schema", "--check", stdout=out, stderr=StringIO())
+        self.assertIn("up to date", out.getvalue())
+
+        with tempfile.TemporaryDirectory() as directory:
+            (pathlib.Path(directory) / "openapi.yaml").write_bytes((self.path / "openapi.yaml").read_bytes())
+            (pathlib.Path(directory) / "openapi.json").write_bytes(b"{}")
+            with self.assertRaisesRegex(CommandError, r"out of date \(json\)"):
+                call_command("build_schema", "--check", output=directory, stderr=StringIO())
+
+    def test_serves_stored_file(self):
+        response = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, (self.path / "openapi.yaml").read_bytes())
+        self.assertEqual(response["Content-Type"], "application/vnd.oai.openapi; charset=utf-8")
+        self.assertFalse(response["ETag"].startswith("W/"))
+        self.assertIn("public", response["Cache-Control"])
+
+    def test_json_format(self):
+        response = self.client.get(SCHEMA_URL, {"format": "json"})
+        self.assertEqual(response.content, (self.path / "openapi.json").read_bytes())
+        self.assertEqual(response["Content-Type"], "application/vnd.oai.openapi+json")
+
+    def test_gzip(self):
+        plain = self.client.get(SCHEMA_URL)
+        response = self.client.get(SCHEMA_URL, HTTP_ACCEPT_ENCODING="br, gzip")
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertNotEqual(response["ETag"], plain["ETag"])
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_not_modified(self):
+        etag = self.client.get(SCHEMA_URL)["ETag"]
+        response = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+
+    def test_generates_missing_schema(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(OPENAPI_SCHEMA_DIR=directory):
+            with self.assertLogs("app.schema", "WARNING"):
+                response = self.client.get(SCHEMA_URL, {"format": "json"})
+        self.assertEqual(response.content, (self.path / "openapi.json").read_bytes())
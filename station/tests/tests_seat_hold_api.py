@@ -0,0 +1,168 @@
+import datetime
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from station.models import Buss, Order, Trip, SeatHold, Station, Ticket
+
+HOLD_URL = reverse("station:seathold-list")
+ORDER_URL = reverse("station:order-list")
+TRIP_URL = reverse("station:trip-list")
+
+
+def confirm_url(hold_id: int):
+    return reverse("station:seathold-confirm", args=(hold_id,))
+
+
+def detail_url(hold_id: int):
+    return reverse("station:seathold-detail", args=(hold_id,))
+
+
+class SeatHoldApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test",
+            password="testpassword"
+        )
+        self.other_user = get_user_model().objects.create_user(
+            email="other@test.test",
+            password="testpassword",
+            is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+        self.trip = Trip.objects.create(
+            source=Station.get_for_name("Kyiv"),
+            destination=Station.get_for_name("Lviv"),
+            departure=timezone.now() + datetime.timedelta(days=1),
+            bus=Buss.objects.create(info="AA 0000 BB", num_seats=10)
+        )
+
+    def hold(self, seats):
+        return self.client.post(HOLD_URL, {"trip": self.trip.id, "seats": seats}, format="json")
+
+    def expire_holds(self):
+        SeatHold.objects.update(expires_at=timezone.now() - datetime.timedelta(minutes=1))
+
+    def test_hold_reduces_availability(self):
+        res = self.hold([1, 2])
+
+        self.trip.refresh_from_db()
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["seats"], [1, 2])
+        self.assertEqual(self.trip.held_seats, [1, 2])
+        self.assertEqual(self.trip.tickets_available, 8)
+
+    def test_held_seat_cannot_be_held_again(self):
+        self.hold([1, 2])
+
+        res = self.hold([2, 3])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("seats", res.data)
+
+    def test_held_seat_cannot_be_ordered(self):
+        self.hold([4])
+        admin_client = APIClient()
+        admin_client.force_authenticate(self.other_user)
+
+        res = admin_client.post(
+            ORDER_URL,
+            {"tickets": [{"seat": 4, "trip": self.trip.id}]},
+            format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_confirm_hold_creates_order(self):
+        hold_id = self.hold([3, 5]).data["id"]
+
+        res = self.client.post(confirm_url(hold_id))
+
+        self.trip.refresh_from_db()
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            sorted(Ticket.objects.filter(order_id=res.data["id"]).values_list("seat", flat=True)),
+            [3, 5]
+        )
+        self.assertEqual(self.trip.taken_seats, [3, 5])
+        self.assertEqual(self.trip.held_seats, [])
+        self.assertFalse(SeatHold.objects.exists())
+
+    def test_seat_sold_past_the_hold_is_reported(self):
+        hold_id = self.hold([3, 5]).data["id"]
+        # a ticket written without checking the holds
+        order = Order.objects.create(user=self.other_user)
+        Ticket.objects.bulk_create([Ticket(order=order, trip=self.trip, seat=5)])
+
+        res = self.client.post(confirm_url(hold_id))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data, {"seats": [f"seat 5 is already taken on trip {self.trip.id}"]})
+        self.assertEqual(Ticket.objects.count(), 1)
+        self.assertTrue(SeatHold.objects.filter(id=hold_id).exists())
+
+    def test_expired_hold_not_reported_before_its_release(self):
+        self.hold([1, 2])
+        expired = timezone.now() - datetime.timedelta(minutes=1)
+        SeatHold.objects.update(expires_at=expired)
+        Trip.objects.update(holds_expire_at=expired)
+
+        listed = self.client.get(TRIP_URL).data["results"][0]
+        detail = self.client.get(reverse("station:trip-detail", args=(self.trip.id,))).data
+
+        self.assertEqual(listed["tickets_available"], 10)
+        self.assertEqual(detail["held_seats"], [])
+        # only ignored, the holds are released by the next booking or the sweeper
+        self.assertEqual(Trip.objects.get().held_seats, [])
+        self.assertNotEqual(Trip.objects.get().held_seat_map, b"")
+
+    def test_expired_hold_cannot_be_confirmed(self):
+        hold = SeatHold.place(self.trip.id, self.user, [1], datetime.timedelta(minutes=5))
+        self.expire_holds()
+
+        res = self.client.post(confirm_url(hold.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_expired_holds_released_lazily(self):
+        self.hold([1, 2])
+        self.expire_holds()
+
+        res = self.hold([2])
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(SeatHold.objects.count(), 1)
+
+    def test_sweeper_releases_expired_holds(self):
+        self.hold([1, 2])
+        self.expire_holds()
+
+        call_command("release_expired_holds", stdout=io.StringIO())
+
+        self.trip.refresh_from_db()
+        self.assertEqual(self.trip.held_seats, [])
+        self.assertIsNone(self.trip.holds_expire_at)
+
+    def test_cancel_hold(self):
+        hold_id = self.hold([1]).data["id"]
+
+        res = self.client.delete(detail_url(hold_id))
+
+        self.trip.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.trip.held_seats, [])
+
+    def test_other_users_holds_hidden(self):
+        hold = SeatHold.place(self.trip.id, self.other_user, [1], datetime.timedelta(minutes=5))
+
+        self.assertEqual(self.client.get(detail_url(hold.id)).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.post(confirm_url(hold.id)).status_code, status.HTTP_404_NOT_FOUND)
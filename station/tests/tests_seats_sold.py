@@ -0,0 +1,60 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from station import seats
+from station.models import Buss, Trip, Ticket, Order, Station
+from station.tests.tests_order_api import sample_trip
+
+
+class SeatsSoldTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="test@test.test", password="testpassword")
+        self.bus = Buss.objects.create(info="AA 0000 BB", num_seats=10)
+        self.trip = sample_trip(bus=self.bus)
+        self.order = Order.objects.create(user=self.user)
+
+    def _sold(self, trip=None) -> int:
+        return Trip.objects.get(pk=(trip or self.trip).pk).seats_sold
+
+    def test_counter_follows_tickets(self):
+        Ticket.bulk_book([Ticket(order=self.order, trip=self.trip, seat=seat) for seat in (1, 2, 3)])
+        ticket = Ticket.objects.create(order=self.order, trip=self.trip, seat=4)
+        self.assertEqual(self._sold(), 4)
+
+        ticket.delete()
+        self.assertEqual(self._sold(), 3)
+        self.assertEqual(Trip.objects.select_related("bus").get(pk=self.trip.pk).tickets_available, 7)
+
+    def test_moving_a_ticket_to_another_trip(self):
+        other = sample_trip(bus=self.bus)
+        ticket = Ticket.objects.create(order=self.order, trip=self.trip, seat=1)
+
+        ticket.trip = other
+        ticket.save()
+
+        self.assertEqual((self._sold(), self._sold(other)), (0, 1))
+
+    def test_stale_trip_save_keeps_counter(self):
+        stale = Trip.objects.get(pk=self.trip.pk)
+        Ticket.objects.create(order=self.order, trip=self.trip, seat=1)
+
+        stale.source = Station.get_for_name("Odesa")
+        stale.save()
+
+        self.assertEqual(self._sold(), 1)
+
+    def test_reconcile_repairs_drift(self):
+        Ticket.objects.create(order=self.order, trip=self.trip, seat=2)
+        Trip.objects.filter(pk=self.trip.pk).update(seat_map=seats.occupy(b"", [5]), seats_sold=7)
+        out = io.StringIO()
+
+        call_command("reconcile_seats", stdout=out)
+        self.assertIn("1 drifted", out.getvalue())
+        self.assertEqual(self._sold(), 7)
+
+        call_command("reconcile_seats", fix=True, stdout=out)
+        trip = Trip.objects.get(pk=self.trip.pk)
+        self.assertEqual((trip.taken_seats, trip.seats_sold), ([2], 1))
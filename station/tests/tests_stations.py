@@ -0,0 +1,120 @@
+import datetime
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from station.models import Buss, Station, Trip
+
+TRIP_URL = reverse("station:trip-list")
+
+
+class StationTests(TestCase):
+    def test_names_differing_in_case_and_spacing_are_one_station(self):
+        station = Station.get_for_name("  Ivano-Frankivsk ")
+
+        self.assertEqual(Station.get_for_name("ivano-frankivsk"), station)
+        self.assertEqual(Station.get_for_name("IVANO-FRANKIVSK\t"), station)
+        self.assertEqual(station.name, "Ivano-Frankivsk")
+        self.assertEqual(Station.objects.count(), 1)
+
+    def test_admin_rejects_name_of_another_station(self):
+        Station.get_for_name("Kyiv")
+        lviv = Station.get_for_name("Lviv")
+        form = admin.site._registry[Station].get_form(None, lviv)
+
+        self.assertFalse(form({"name": " KYIV"}, instance=lviv).is_valid())
+        self.assertFalse(form({"name": "kyiv"}).is_valid())
+        self.assertTrue(form({"name": "LVIV"}, instance=lviv).is_valid())
+
+
+class StationTripApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_superuser(email="admin@test.test", password="testpassword")
+        )
+        self.bus = Buss.objects.create(info="AA 0000 BB", num_seats=20)
+        self.kyiv = Station.get_for_name("Kyiv")
+
+    def create_trip(self, source, destination):
+        return self.client.post(TRIP_URL, {
+            "source": source,
+            "destination": destination,
+            "departure": timezone.now() + datetime.timedelta(days=1),
+            "bus": self.bus.id,
+        }, format="json")
+
+    def test_trip_names_resolve_to_stations(self):
+        res = self.create_trip(" kyiv", "Lviv")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((res.data["source"], res.data["destination"]), ("Kyiv", "Lviv"))
+        trip = Trip.objects.get()
+        self.assertEqual(trip.source, self.kyiv)
+        self.assertEqual(trip.destination, Station.objects.get(key="lviv"))
+
+    def test_invalid_trip_creates_no_station(self):
+        res = self.create_trip("Kyiv", "")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Station.objects.count(), 1)
+
+    def test_filter_ignores_case_and_spacing(self):
+        self.create_trip("Kyiv", "Lviv")
+
+        res = self.client.get(TRIP_URL, {"source": "KYIV ", "destination": "lviv"})
+
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"][0]["source"], "Kyiv")
+
+
+class StationMigrationTests(TransactionTestCase):
+    before = [("station", "0011_facility_bit_buss_facility_mask")]
+    after = [("station", "0012_station")]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        executor.loader.build_graph()
+        return executor.loader.project_state(targets).apps
+
+    def test_trip_names_become_deduplicated_stations(self):
+        apps = self.migrate(self.before)
+        bus = apps.get_model("station", "Buss").objects.create(num_seats=10)
+        departure = timezone.now()
+        for source, destination in [
+            ("Kyiv", "Lviv"), ("kyiv ", "Lviv"), ("Kyiv", "LVIV"), ("Odesa", "KYIV"),
+        ]:
+            apps.get_model("station", "Trip").objects.create(
+                source=source, destination=destination, departure=departure, bus=bus
+            )
+
+        apps = self.migrate(self.after)
+
+        Trip = apps.get_model("station", "Trip")
+        self.assertEqual(
+            sorted(apps.get_model("station", "Station").objects.values_list("key", "name")),
+            [("kyiv", "Kyiv"), ("lviv", "Lviv"), ("odesa", "Odesa")]
+        )
+        self.assertEqual(
+            list(Trip.objects.order_by("id").values_list("source__name", "destination__name")),
+            [("Kyiv", "Lviv"), ("Kyiv", "Lviv"), ("Kyiv", "Lviv"), ("Odesa", "Kyiv")]
+        )
+
+        apps = self.migrate(self.before)
+
+        self.assertEqual(
+            list(apps.get_model("station", "Trip").objects.order_by("id").values_list("source", "destination")),
+            [("Kyiv", "Lviv"), ("Kyiv", "Lviv"), ("Kyiv", "Lviv"), ("Odesa", "Kyiv")]
+        )
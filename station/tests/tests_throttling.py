@@ -0,0 +1,75 @@
+import sqlite3
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from station.models import Buss
+from station.throttling import BucketStore, UserRateThrottle, get_store
+from station.tests.tests_order_api import sample_trip, ORDER_URL
+
+
+class BucketStoreTests(TestCase):
+    def test_bucket_refills_at_rate(self):
+        store = BucketStore(":memory:")
+
+        waits = [store.take("key", 2, 0.5, now=100) for _ in range(3)]
+
+        self.assertEqual(waits, [0, 0, 2.0])
+        self.assertEqual(store.take("key", 2, 0.5, now=101), 1.0)
+        self.assertEqual(store.take("key", 2, 0.5, now=102), 0)
+        self.assertEqual(store.take("other", 2, 0.5, now=102), 0)
+
+    def test_state_is_one_row_per_key(self):
+        store = BucketStore(":memory:")
+        for now in range(50):
+            store.take("key", 100, 1, now=now)
+
+        rows = store._connection().execute("SELECT COUNT(*) FROM buckets").fetchone()[0]
+
+        self.assertEqual(rows, 1)
+
+    def test_locked_store_fails_open(self):
+        store = BucketStore(":memory:")
+        locked = mock.Mock(in_transaction=False)
+        locked.execute.side_effect = sqlite3.OperationalError("database is locked")
+
+        with mock.patch.object(store, "_connection", return_value=locked), self.assertLogs("station.throttling"):
+            self.assertEqual(store.take("key", 1, 1, now=100), 0)
+
+
+class OrderCreateThrottleTests(TestCase):
+    def setUp(self):
+        get_store().clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test", password="testpassword", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+        self.trip = sample_trip(bus=Buss.objects.create(info="AA 0000 BB", num_seats=50))
+
+    def test_order_creation_has_its_own_bucket(self):
+        rates = {"anon": "100/day", "user": "1000/day", "order_create": "2/hour"}
+        with mock.patch.object(UserRateThrottle, "THROTTLE_RATES", rates):
+            created = [
+                self.client.post(
+                    ORDER_URL, {"tickets": [{"seat": seat, "trip": self.trip.id}]}, format="json"
+                ).status_code
+                for seat in (1, 2, 3)
+            ]
+            listed = self.client.get(ORDER_URL)
+
+        self.assertEqual(created, [201, 201, 429])
+        self.assertEqual(listed.status_code, status.HTTP_200_OK)
+
+    def test_throttled_response_has_retry_after(self):
+        rates = {"anon": "100/day", "user": "1/minute", "order_create": "30/hour"}
+        with mock.patch.object(UserRateThrottle, "THROTTLE_RATES", rates):
+            self.client.get(reverse("station:trip-list"))
+            res = self.client.get(reverse("station:trip-list"))
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res["Retry-After"], "60")
@@ -0,0 +1,218 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from station.models import Buss, Trip, Ticket, Order, Facility, SeatHold, Station
+
+TRIP_URL = reverse("station:trip-list")
+
+
+def sample_trip(**params) -> Trip:
+    if "bus" not in params:
+        params["bus"] = Buss.objects.create(info="AA 0000 BB", num_seats=50)
+    default = {
+        "source": "Kyiv",
+        "destination": "Lviv",
+        "departure": timezone.now() + datetime.timedelta(days=1)
+    }
+    default.update(params)
+    for field in ("source", "destination"):
+        default[field] = Station.get_for_name(default[field])
+    return Trip.objects.create(**default)
+
+
+def detail_url(trip_id: int):
+    return reverse("station:trip-detail", args=(trip_id,))
+
+
+class TripSeatMapTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test",
+            password="testpassword"
+        )
+        self.trip = sample_trip()
+        self.order = Order.objects.create(user=self.user)
+
+    def test_tickets_fill_seat_map(self):
+        Ticket.objects.create(seat=3, trip=self.trip, order=self.order)
+        Ticket.objects.create(seat=12, trip=self.trip, order=self.order)
+
+        self.trip.refresh_from_db()
+
+        self.assertEqual(self.trip.taken_seats, [3, 12])
+        self.assertEqual(self.trip.tickets_available, 48)
+
+    def test_changing_ticket_seat_moves_it(self):
+        ticket = Ticket.objects.create(seat=3, trip=self.trip, order=self.order)
+
+        ticket.seat = 7
+        ticket.save()
+        self.trip.refresh_from_db()
+
+        self.assertEqual(self.trip.taken_seats, [7])
+
+    def test_deleting_order_releases_seats(self):
+        Ticket.objects.create(seat=3, trip=self.trip, order=self.order)
+        Ticket.objects.create(seat=4, trip=self.trip, order=self.order)
+
+        self.order.delete()
+        self.trip.refresh_from_db()
+
+        self.assertEqual(self.trip.taken_seats, [])
+        self.assertEqual(self.trip.tickets_available, 50)
+
+
+class AuthenticatedTripApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_trips_shows_tickets_available(self):
+        trip = sample_trip()
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(seat=1, trip=trip, order=order)
+
+        res = self.client.get(TRIP_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"][0]["tickets_available"], 49)
+
+    def test_retrieve_trip_shows_taken_seats(self):
+        trip = sample_trip()
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(seat=9, trip=trip, order=order)
+        Ticket.objects.create(seat=2, trip=trip, order=order)
+
+        res = self.client.get(detail_url(trip.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["taken_seats"], [2, 9])
+
+    def test_filter_trips_by_route(self):
+        bus = Buss.objects.create(info="AA 0000 BB", num_seats=50)
+        trip_to_lviv = sample_trip(bus=bus)
+        trip_to_odesa = sample_trip(bus=bus, destination="Odesa")
+
+        res = self.client.get(TRIP_URL, {"source": "Kyiv", "destination": "Odesa"})
+
+        ids = [trip["id"] for trip in res.data["results"]]
+        self.assertEqual(ids, [trip_to_odesa.id])
+        self.assertNotIn(trip_to_lviv.id, ids)
+
+    def test_filter_trips_by_departure_dates(self):
+        bus = Buss.objects.create(info="AA 0000 BB", num_seats=50)
+        early = sample_trip(bus=bus, departure=datetime.datetime(2024, 6, 1, 8, tzinfo=datetime.timezone.utc))
+        late = sample_trip(bus=bus, departure=datetime.datetime(2024, 6, 3, 23, tzinfo=datetime.timezone.utc))
+        sample_trip(bus=bus, departure=datetime.datetime(2024, 6, 4, 1, tzinfo=datetime.timezone.utc))
+
+        res = self.client.get(
+            TRIP_URL,
+            {"departure_after": "2024-06-01", "departure_before": "2024-06-03"}
+        )
+
+        self.assertEqual([trip["id"] for trip in res.data["results"]], [early.id, late.id])
+
+    def test_filter_trips_by_bus_facilities(self):
+        wifi = Facility.objects.create(name="Wifi")
+        bus_with_wifi = Buss.objects.create(info="AA 0001 BB", num_seats=50)
+        bus_with_wifi.facilities.add(wifi)
+        trip_with_wifi = sample_trip(bus=bus_with_wifi)
+        trip_without_wifi = sample_trip()
+
+        with_wifi = self.client.get(TRIP_URL, {"facilities": wifi.id, "facilities_mode": "all"})
+        without_wifi = self.client.get(TRIP_URL, {"facilities": wifi.id, "facilities_mode": "none"})
+
+        self.assertEqual([trip["id"] for trip in with_wifi.data["results"]], [trip_with_wifi.id])
+        self.assertEqual([trip["id"] for trip in without_wifi.data["results"]], [trip_without_wifi.id])
+
+    def test_invalid_departure_filter(self):
+        res = self.client.get(TRIP_URL, {"departure_after": "tomorrow"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_trips_paginated_by_departure_cursor(self):
+        bus = Buss.objects.create(info="AA 0000 BB", num_seats=50)
+        start = timezone.now()
+        trips = [
+            sample_trip(bus=bus, departure=start + datetime.timedelta(hours=hours))
+            for hours in (3, 1, 2)
+        ]
+
+        first_page = self.client.get(TRIP_URL, {"page_size": 2})
+        second_page = self.client.get(first_page.data["next"])
+
+        self.assertEqual(
+            [trip["id"] for trip in first_page.data["results"]],
+            [trips[1].id, trips[2].id]
+        )
+        self.assertEqual([trip["id"] for trip in second_page.data["results"]], [trips[0].id])
+        self.assertIsNone(second_page.data["next"])
+
+
+AVAILABILITY_URL = reverse("station:trip-availability")
+
+
+class TripAvailabilityTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.trips = [sample_trip(bus=Buss.objects.create(info="AA 0000 BB", num_seats=10)) for _ in range(3)]
+        order = Order.objects.create(user=self.user)
+        Ticket.bulk_book([
+            Ticket(order=order, trip=self.trips[0], seat=seat) for seat in (1, 2, 10)
+        ])
+        SeatHold.place(self.trips[1].id, self.user, [4], datetime.timedelta(minutes=10))
+
+    def _ids(self, trips) -> str:
+        return ",".join(str(trip.id) for trip in trips)
+
+    def test_counts_in_requested_order(self):
+        response = self.client.get(AVAILABILITY_URL, {"ids": f"{self._ids(reversed(self.trips))},999"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [
+            {"id": self.trips[2].id, "num_seats": 10, "tickets_available": 10},
+            {"id": self.trips[1].id, "num_seats": 10, "tickets_available": 9},
+            {"id": self.trips[0].id, "num_seats": 10, "tickets_available": 7},
+        ])
+
+    def test_seat_map_encodings(self):
+        ids = self._ids(self.trips[:2])
+        bits = self.client.get(AVAILABILITY_URL, {"ids": ids, "seat_map": "bits"}).data
+        rle = self.client.get(AVAILABILITY_URL, {"ids": ids, "seat_map": "rle"}).data
+
+        self.assertEqual([trip["seat_map"] for trip in bits], ["1100000001", "0001000000"])
+        self.assertEqual([trip["seat_map"] for trip in rle], ["0,2,7,1", "3,1,6"])
+
+    def test_constant_number_of_queries(self):
+        trips = self.trips + [sample_trip() for _ in range(20)]
+        # one query for all of the trips
+        with self.assertNumQueries(1):
+            self.client.get(AVAILABILITY_URL, {"ids": self._ids(trips), "seat_map": "rle"})
+
+    def test_expired_holds_are_free(self):
+        SeatHold.objects.update(expires_at=timezone.now() - datetime.timedelta(minutes=1))
+        Trip.objects.filter(pk=self.trips[1].id).update(holds_expire_at=timezone.now() - datetime.timedelta(minutes=1))
+
+        with self.assertNumQueries(2):
+            response = self.client.get(AVAILABILITY_URL, {"ids": self._ids(self.trips[1:2])})
+        self.assertEqual(response.data[0]["tickets_available"], 10)
+
+    def test_invalid_params(self):
+        for params in ({}, {"ids": "1,a"}, {"ids": "1", "seat_map": "png"}, {"ids": ",".join(map(str, range(101)))}):
+            response = self.client.get(AVAILABILITY_URL, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
@@ -0,0 +1,183 @@
+"""
+Token-bucket throttles backed by a SQLite file shared by all workers.
+
+DRF's rate throttles keep a list of request timestamps per client in the
+cache, so every check rewrites a list as long as the rate, and with the
+local-memory cache each worker process counts on its own. Here a client
+is one row ``(tokens, updated_at)``: a check refills the bucket for the
+time passed since `updated_at` and takes a token, in a single write
+transaction. The rate ``"100/day"`` is a bucket of 100 tokens refilled
+at 100 tokens per day, so bursts up to the full rate are still allowed.
+
+Rows of buckets that would be full again are pruned now and then, which
+keeps the table as small as the number of recently active clients. Each
+process uses one connection, checks of its threads are serialised.
+"""
+import logging
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework import throttling
+
+logger = logging.getLogger(__name__)
+
+PRUNE_EVERY = 1000
+
+
+def _setting(name: str):
+    defaults = {
+        "ENABLED": True,
+        # ":memory:" is not shared between processes
+        "PATH": ":memory:",
+    }
+    return getattr(settings, "THROTTLE_STORE", {}).get(name, defaults[name])
+
+
+class BucketStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._pid = None
+        self._db = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # a connection inherited from the parent of a forked worker is not reused
+        if self._pid != os.getpid():
+            if self.path != ":memory:":
+                pathlib.Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            if self.path != ":memory:":
+                db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                " key TEXT PRIMARY KEY,"
+                " tokens REAL NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " full_at REAL NOT NULL"
+                ")"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS buckets_full_at ON buckets (full_at)")
+            self._db, self._pid = db, os.getpid()
+        return self._db
+
+    def take(self, key: str, capacity: float, refill_rate: float, now: float = None) -> float:
+        """
+        Take a token from the bucket of `key`
+
+        Returns 0 if a token was taken, otherwise the seconds until one is available.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._take(key, capacity, refill_rate, now)
+
+    def _take(self, key, capacity, refill_rate, now) -> float:
+        try:
+            connection = self._connection()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute(
+                    "SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    tokens = capacity
+                else:
+                    tokens = min(capacity, row[0] + max(0.0, now - row[1]) * refill_rate)
+
+                wait = 0.0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / refill_rate
+                connection.execute(
+                    "INSERT INTO buckets (key, tokens, updated_at, full_at) VALUES (?, ?, ?, ?)"
+                    " ON CONFLICT (key) DO UPDATE SET"
+                    " tokens = excluded.tokens, updated_at = excluded.updated_at, full_at = excluded.full_at",
+                    (key, tokens, now, now + (capacity - tokens) / refill_rate)
+                )
+                connection.execute("COMMIT")
+            except BaseException:
+                if connection.in_transaction:
+                    connection.execute("ROLLBACK")
+                raise
+
+            self._calls += 1
+            if self._calls % PRUNE_EVERY == 0:
+                # buckets that are full again behave like missing ones
+                connection.execute("DELETE FROM buckets WHERE full_at <= ?", (now,))
+        except sqlite3.Error as error:
+            # a locked or broken store lets requests through instead of failing them
+            logger.warning("Throttle store %s unavailable, request not throttled: %s", self.path, error)
+            return 0.0
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._connection().execute("DELETE FROM buckets")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> BucketStore:
+    global _store
+    with _store_lock:
+        if _store is None or _store.path != str(_setting("PATH")):
+            _store = BucketStore(str(_setting("PATH")))
+        return _store
+
+
+@receiver(setting_changed)
+def _reset_store(setting, **kwargs):
+    global _store
+    if setting == "THROTTLE_STORE":
+        with _store_lock:
+            _store = None
+
+
+class TokenBucketMixin:
+    """Replace the timestamp history of a DRF rate throttle with a token bucket"""
+
+    def allow_request(self, request, view):
+        if self.rate is None or not _setting("ENABLED"):
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        # a changed rate starts from a full bucket instead of the old level
+        capacity = self.num_requests
+        self._wait = get_store().take(
+            f"{self.key}:{self.rate}", capacity, capacity / self.duration
+        )
+        return self._wait == 0
+
+    def wait(self):
+        return getattr(self, "_wait", None) or None
+
+
+class AnonRateThrottle(TokenBucketMixin, throttling.AnonRateThrottle):
+    pass
+
+
+class UserRateThrottle(TokenBucketMixin, throttling.UserRateThrottle):
+    pass
+
+
+class OrderCreateRateThrottle(UserRateThrottle):
+    """A separate, smaller bucket for requests that buy tickets"""
+    scope = "order_create"
+
+
+class AutocompleteRateThrottle(UserRateThrottle):
+    """A separate bucket for type-ahead, one request per keystroke"""
+    scope = "autocomplete"
@@ -1,5 +1,15 @@
 from django.urls import path, include
-from station.views import BusViewSet, TripViewSet, FacilityViewSet, OrderViewSet
+from station.views import (
+    BusViewSet,
+    TripViewSet,
+    FacilityViewSet,
+    OrderViewSet,
+    RouteViewSet,
+    SeatHoldViewSet,
+    StationViewSet,
+    MetricsView,
+    ExportView
+)
 from rest_framework import routers
 
 app_name = "station"
@@ -10,9 +20,14 @@ router.register("buses", BusViewSet)
 router.register("orders", OrderViewSet)
 router.register("trips", TripViewSet)
 router.register("facilities", FacilityViewSet)
+router.register("routes", RouteViewSet, basename="route")
+router.register("holds", SeatHoldViewSet)
+router.register("stations", StationViewSet, basename="station")
 
 urlpatterns = [
-    path("", include(router.urls))
+    path("", include(router.urls)),
+    path("metrics/", MetricsView.as_view(), name="metrics"),
+    path("exports/<str:kind>/", ExportView.as_view(), name="export")
 ]
 
 # bus_list = BusViewSet.as_view(
@@ -1,37 +1,215 @@
-from django.db.models import Count, F
+import datetime
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework import viewsets, status, mixins
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import IsAdminUser
+from rest_framework.exceptions import ValidationError, NotFound
+from rest_framework.pagination import PageNumberPagination, CursorPagination
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.serializers import as_serializer_error
+from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet
 
+from station.caching import CachedResponseMixin
+from station.rows import FastListMixin
+from station.throttling import AutocompleteRateThrottle, OrderCreateRateThrottle
 from station.models import (
     Buss,
     Trip,
     Facility,
-    Order
+    Order,
+    Ticket,
+    SeatHold,
+    Station
 )
 from station.serializers import (
     BussListSerializer,
     TripSerializer,
     TripListSerializer,
+    TripAvailabilitySerializer,
     BussSerializer,
     FacilitySerializer,
     BussRetrieveSerializer,
     TripRetrieveSerializer,
     OrderSerializer,
     OrderListSerializer,
-    BussImageSerializer
+    BussImageSerializer,
+    JourneySerializer,
+    StationSuggestionSerializer,
+    SeatHoldSerializer,
+    ImportSerializer
 )
+from station import autocomplete, routing, images, importer, exports, metrics, booking, rows, seats
+
+
+def _param_to_datetime(name, value, end_of_day=False):
+    """Convert '2024-06-01' or an ISO datetime to an aware datetime"""
+    try:
+        day = parse_date(value)
+        moment = None if day else parse_datetime(value)
+    except ValueError:
+        day = moment = None
+    if day is not None:
+        moment = datetime.datetime.combine(
+            day, datetime.time.max if end_of_day else datetime.time.min
+        )
+    if moment is None:
+        raise ValidationError({name: f"expected a date or datetime, not '{value}'"})
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _param_to_int(name, value, default, minimum, maximum):
+    if value in (None, ""):
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValidationError({name: f"expected an integer, not '{value}'"})
+    if not (minimum <= number <= maximum):
+        raise ValidationError({name: f"must be in range [{minimum}, {maximum}]"})
+    return number
+
+
+def _param_to_ints(query_string):
+    """Convert a string of format '1,2,3' to a list of integers [1, 2, 3]"""
+    try:
+        return [int(str_id) for str_id in query_string.split(",")]
+    except ValueError:
+        raise ValidationError(f"expected comma separated integers, not '{query_string}'")
+
+
+FACILITIES_MODES = ("any", "all", "none")
+
+FACILITIES_PARAMETERS = [
+    OpenApiParameter(
+        "facilities",
+        type={"type": "array", "items": {"type": "number"}},
+        description="Filter by facility id (ex. ?facilities=2,3)"
+    ),
+    OpenApiParameter(
+        "facilities_mode",
+        enum=list(FACILITIES_MODES),
+        description="Bus has any (default), all or none of the facilities"
+    ),
+]
+
+
+def filter_by_facilities(queryset, params, mask_field="facility_mask"):
+    """
+    Apply ?facilities=1,2&facilities_mode=any|all|none to a queryset of
+    buses (or trips, with `mask_field="bus__facility_mask"`)
+    """
+    facilities = params.get("facilities")
+    if not facilities:
+        return queryset
+    mode = params.get("facilities_mode") or "any"
+    if mode not in FACILITIES_MODES:
+        raise ValidationError(
+            {"facilities_mode": f"expected one of {', '.join(FACILITIES_MODES)}, not '{mode}'"}
+        )
+
+    # subqueries rather than a query now, so async views can apply the filter
+    facility_ids = set(_param_to_ints(facilities))
+    mask, found = Facility.mask_of(facility_ids)
+    queryset = queryset.alias(facilities_mask=mask, facilities_matched=F(mask_field).bitand(mask))
+    if mode == "all":
+        return queryset.alias(facilities_found=found).filter(
+            facilities_found=len(facility_ids), facilities_matched=F("facilities_mask")
+        )
+    if mode == "any":
+        return queryset.filter(facilities_matched__gt=0)
+    return queryset.filter(facilities_matched=0)
+
+
+def _station_name(name: str) -> str:
+    """Name of the station called `name` ignoring case and spacing, `name` if there is none"""
+    station_name = Station.objects.filter(key=Station.normalize(name)).values_list("name", flat=True).first()
+    return station_name or name
+
+
+def filter_buses(queryset, params):
+    """Apply the bus list query params to `queryset`"""
+    return filter_by_facilities(queryset, params)
+
+
+def filter_trips(queryset, params):
+    """Apply the trip list query params to `queryset`"""
+    queryset = filter_by_facilities(queryset, params, "bus__facility_mask")
+
+    source = params.get("source")
+    destination = params.get("destination")
+    if source:
+        queryset = queryset.filter(source__key=Station.normalize(source))
+    if destination:
+        queryset = queryset.filter(destination__key=Station.normalize(destination))
+
+    departure_after = params.get("departure_after")
+    departure_before = params.get("departure_before")
+    if departure_after:
+        queryset = queryset.filter(
+            departure__gte=_param_to_datetime("departure_after", departure_after)
+        )
+    if departure_before:
+        queryset = queryset.filter(
+            departure__lte=_param_to_datetime(
+                "departure_before", departure_before, end_of_day=True
+            )
+        )
+
+    return queryset
 
 
 # AllowANy - None
 # IsAuthenticated - "list", "retrieve" (GET)
 # IsAdminUser - "create", "update", "partial_update", "destroy" (POST, PUT, PATCH, DELETE)
 
-class BusViewSet(mixins.CreateModelMixin,
+class ImportMixin:
+    """Admin upload of a CSV or JSONL file through `station.importer`"""
+    import_kind = None
+    # rejected rows returned in the response, the rest are only counted
+    max_rejects_shown = 100
+
+    @extend_schema(request=ImportSerializer, responses={200: dict})
+    @action(
+        methods=["POST"],
+        detail=False,
+        permission_classes=[IsAdminUser],
+        parser_classes=[MultiPartParser],
+        url_path="import"
+    )
+    def import_rows(self, request):
+        serializer = ImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.validated_data["file"]
+        rejects = []
+
+        def on_reject(record):
+            if len(rejects) < self.max_rejects_shown:
+                rejects.append(record)
+
+        result = importer.import_rows(
+            self.import_kind,
+            importer.text_stream(upload.file),
+            serializer.validated_data.get("format") or importer.detect_format(upload.name),
+            on_reject=on_reject,
+            dry_run=serializer.validated_data["dry_run"]
+        )
+        return Response({**result.as_dict(), "rejects": rejects}, status=status.HTTP_200_OK)
+
+
+class BusViewSet(ImportMixin,
+                 CachedResponseMixin,
+                 FastListMixin,
+                 mixins.CreateModelMixin,
                  mixins.RetrieveModelMixin,
                  mixins.UpdateModelMixin,
                  mixins.ListModelMixin,
@@ -39,11 +217,9 @@ class BusViewSet(mixins.CreateModelMixin,
                  ):
     queryset = Buss.objects.all()
     serializer_class = BussSerializer
-
-    @staticmethod
-    def _param_to_ints(query_string):
-        """Convert a string of format '1,2,3' to a list of integers [1, 2, 3]"""
-        return [int(str_id) for str_id in query_string.split(",")]
+    cache_dependencies = (Buss, Facility)
+    import_kind = "buses"
+    list_format = (rows.bus_rows, rows.bus_list)
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -56,16 +232,12 @@ class BusViewSet(mixins.CreateModelMixin,
         return BussSerializer
 
     def get_queryset(self):
-        queryset = self.queryset
-        facilities = self.request.query_params.get("facilities")
-        if facilities:
-            facilities = self._param_to_ints(facilities)
-            queryset = queryset.filter(facilities__id__in=facilities)
+        queryset = filter_buses(self.queryset, self.request.query_params)
 
         if self.action in ("list", "retrieve"):
             queryset = queryset.prefetch_related("facilities")
 
-        return queryset.distinct()
+        return queryset
 
     @action(
         methods=["POST"],
@@ -75,21 +247,15 @@ class BusViewSet(mixins.CreateModelMixin,
     )
     def upload_image(self, request, pk=None):
         bus = self.get_object()
+        previous = bus.image_variants
         serializer = self.get_serializer(bus, data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            bus = serializer.save(image_variants={})
+            images.replace_variants(bus, previous)
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    @extend_schema(
-        parameters=[
-            OpenApiParameter(
-                "facilities",
-                type={"type": "array", "items": {"type": "number"}},
-                description="Filter by facility id (ex. ?facilities=2,3)"
-            )
-        ]
-    )
+    @extend_schema(parameters=FACILITIES_PARAMETERS)
     def list(self, request, *args, **kwargs):
         """Get list of busses"""
         return super().list(request, *args, **kwargs)
@@ -101,15 +267,19 @@ class OrderSetPagination(PageNumberPagination):
     max_page_size = 20
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     pagination_class = OrderSetPagination
+    list_format = (rows.order_rows, rows.order_list)
 
     def get_queryset(self):
         queryset = self.queryset.filter(user=self.request.user.id)
         if self.action == "list":
-            queryset = queryset.prefetch_related("tickets__trip__bus")
+            queryset = queryset.prefetch_related(
+                "tickets__trip__bus", "tickets__trip__source", "tickets__trip__destination",
+                "archived_tickets__trip__source", "archived_tickets__trip__destination"
+            )
 
         return queryset
 
@@ -121,12 +291,77 @@ class OrderViewSet(viewsets.ModelViewSet):
 
         return serializer_class
 
+    def get_throttles(self):
+        if self.action == "create":
+            return super().get_throttles() + [OrderCreateRateThrottle()]
+        return super().get_throttles()
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+
+class SeatHoldViewSet(mixins.CreateModelMixin,
+                      mixins.RetrieveModelMixin,
+                      mixins.ListModelMixin,
+                      mixins.DestroyModelMixin,
+                      GenericViewSet
+                      ):
+    """Reserve seats for a few minutes while the order is being filled in"""
+    queryset = SeatHold.objects.all()
+    serializer_class = SeatHoldSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return self.queryset.filter(
+            user=self.request.user.id,
+            expires_at__gt=timezone.now()
+        )
+
     def perform_create(self, serializer):
-        serializer.save(self.request.user)
+        serializer.save(user=self.request.user)
+
+    def get_throttles(self):
+        if self.action == "confirm":
+            return super().get_throttles() + [OrderCreateRateThrottle()]
+        return super().get_throttles()
+
+    def perform_destroy(self, instance):
+        instance.release()
+
+    @extend_schema(request=None, responses=OrderSerializer)
+    @action(methods=["POST"], detail=True)
+    def confirm(self, request, pk=None):
+        """Buy the held seats"""
+        hold = self.get_object()
+        try:
+            order = booking.submit(hold.confirm)
+        except DjangoValidationError as error:
+            raise ValidationError(as_serializer_error(error))
+        return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
 
 
-class TripViewSet(viewsets.ModelViewSet):
+class TripSetPagination(CursorPagination):
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("departure", "id")
+
+
+# ?seat_map= value -> encoding of a seat map of `num_seats` seats
+SEAT_MAP_ENCODINGS = {
+    "bits": seats.to_bitstring,
+    "rle": lambda seat_map, num_seats: ",".join(map(str, seats.to_runs(seat_map, num_seats))),
+}
+
+
+class TripViewSet(ImportMixin, CachedResponseMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Trip.objects.all()
+    pagination_class = TripSetPagination
+    cache_dependencies = (Trip, Station, Buss, Facility, Ticket)
+    import_kind = "trips"
+    list_format = (rows.trip_rows, rows.trip_list)
+    # trips per availability request
+    max_availability_trips = 100
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -141,14 +376,242 @@ class TripViewSet(viewsets.ModelViewSet):
         if self.action == "retrieve":
             return queryset.select_related()
         elif self.action == "list":
-            return (
-                queryset
-                .select_related()
-                .annotate(tickets_available=F("bus__num_seats") - Count("tickets"))
+            return filter_trips(queryset, self.request.query_params).select_related(
+                "bus", "source", "destination"
             )
         return self.queryset.order_by("id")
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "source",
+                type=str,
+                description="Filter by source, ignoring case (ex. ?source=Kyiv)"
+            ),
+            OpenApiParameter(
+                "destination",
+                type=str,
+                description="Filter by destination, ignoring case (ex. ?destination=Lviv)"
+            ),
+            OpenApiParameter(
+                "departure_after",
+                type=str,
+                description="Departure on or after a date or datetime (ex. ?departure_after=2024-06-01)"
+            ),
+            OpenApiParameter(
+                "departure_before",
+                type=str,
+                description="Departure on or before a date or datetime (ex. ?departure_before=2024-06-30)"
+            ),
+            *FACILITIES_PARAMETERS,
+        ]
+    )
+    def list(self, request, *args, **kwargs):
+        """Get trips ordered by departure, paginated with a cursor"""
+        return super().list(request, *args, **kwargs)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "ids",
+                type={"type": "array", "items": {"type": "number"}},
+                required=True,
+                description="Trip ids (ex. ?ids=1,2,3), unknown ones are left out"
+            ),
+            OpenApiParameter(
+                "seat_map",
+                enum=[*SEAT_MAP_ENCODINGS],
+                description="Include the sold or held seats of every trip in this encoding"
+            ),
+        ],
+        responses=TripAvailabilitySerializer(many=True)
+    )
+    @action(methods=["GET"], detail=False)
+    def availability(self, request):
+        """Free seats of many trips in one request, in the order of `ids`"""
+        params = request.query_params
+        if not params.get("ids"):
+            raise ValidationError({"ids": "expected comma separated trip ids"})
+        trip_ids = list(dict.fromkeys(_param_to_ints(params["ids"])))
+        if len(trip_ids) > self.max_availability_trips:
+            raise ValidationError({"ids": f"at most {self.max_availability_trips} trips per request"})
+        encoding = params.get("seat_map")
+        if encoding and encoding not in SEAT_MAP_ENCODINGS:
+            raise ValidationError(
+                {"seat_map": f"expected one of {', '.join(SEAT_MAP_ENCODINGS)}, not '{encoding}'"}
+            )
+
+        seat_maps = Trip.unavailable_seat_maps(trip_ids)
+        data = []
+        for trip_id in trip_ids:
+            if trip_id not in seat_maps:
+                continue
+            num_seats, unavailable = seat_maps[trip_id]
+            item = {
+                "id": trip_id,
+                "num_seats": num_seats,
+                "tickets_available": num_seats - seats.count(unavailable),
+            }
+            if encoding:
+                item["seat_map"] = SEAT_MAP_ENCODINGS[encoding](unavailable, num_seats)
+            data.append(item)
+        return Response(TripAvailabilitySerializer(data, many=True).data)
+
+
+class RouteViewSet(viewsets.ViewSet):
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("source", type=str, required=True, description="Start station"),
+            OpenApiParameter("destination", type=str, required=True, description="End station"),
+            OpenApiParameter(
+                "departure_after",
+                type=str,
+                description="Leave on or after a date or datetime (default: now)"
+            ),
+            OpenApiParameter(
+                "max_transfers",
+                type=int,
+                description="Maximum number of changes between trips (default: 2)"
+            ),
+            OpenApiParameter(
+                "min_connection",
+                type=int,
+                description="Minimum minutes between arrival and the next departure (default: 15)"
+            ),
+            OpenApiParameter(
+                "tickets",
+                type=int,
+                description="Only use trips with at least this many free seats (default: 1)"
+            ),
+        ],
+        responses=JourneySerializer(many=True)
+    )
+    def list(self, request):
+        """
+        Find journeys from source to destination, possibly with transfers.
+        Returns the earliest arrival for each number of transfers,
+        fewest transfers first.
+        """
+        params = request.query_params
+        source = params.get("source")
+        destination = params.get("destination")
+        if not source or not destination:
+            raise ValidationError("source and destination are required")
+
+        departure_after = params.get("departure_after")
+        journeys = routing.index.search(
+            _station_name(source),
+            _station_name(destination),
+            departure_after=(
+                _param_to_datetime("departure_after", departure_after)
+                if departure_after else timezone.now()
+            ),
+            max_transfers=_param_to_int(
+                "max_transfers", params.get("max_transfers"), 2,
+                0, routing.max_transfers()
+            ),
+            min_connection=datetime.timedelta(minutes=_param_to_int(
+                "min_connection", params.get("min_connection"), 15, 0, 24 * 60
+            )),
+            tickets=_param_to_int("tickets", params.get("tickets"), 1, 1, 100),
+        )
+        return Response(JourneySerializer(journeys, many=True).data)
+
+
+class StationViewSet(viewsets.ViewSet):
+    throttle_classes = [AutocompleteRateThrottle]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("q", type=str, required=True, description="Typed part of a station name"),
+            OpenApiParameter(
+                "limit",
+                type=int,
+                description="Maximum number of suggestions (default: 10)"
+            ),
+        ],
+        responses=StationSuggestionSerializer(many=True)
+    )
+    @action(methods=["GET"], detail=False)
+    def autocomplete(self, request):
+        """
+        Stations with a word starting with `q` (ignoring case), busiest first,
+        followed by similarly spelt names if there are fewer than `limit`
+        """
+        params = request.query_params
+        query = params.get("q", "")
+        if not query.strip():
+            raise ValidationError({"q": "This parameter is required."})
+        limit = _param_to_int("limit", params.get("limit"), 10, 1, autocomplete.max_results())
+        suggestions = autocomplete.index.search(query, limit)
+        return Response(StationSuggestionSerializer(suggestions, many=True).data)
+
 
-class FacilityViewSet(viewsets.ModelViewSet):
+class FacilityViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Facility.objects.all()
     serializer_class = FacilitySerializer
+    cache_dependencies = (Facility,)
+
+
+class MetricsView(APIView):
+    """Request metrics aggregated by this worker process, DELETE resets them"""
+    permission_classes = [IsAdminUser]
+    throttle_classes = []
+
+    @extend_schema(responses={200: dict})
+    def get(self, request):
+        return Response(metrics.registry.snapshot())
+
+    @extend_schema(responses={204: None})
+    def delete(self, request):
+        metrics.registry.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ExportView(APIView):
+    """Stream every order, ticket or trip, live or archived, as CSV or JSONL"""
+    permission_classes = [IsAdminUser]
+    throttle_classes = []
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "output",
+                enum=list(exports.FORMATS),
+                description="File format, csv by default"
+            ),
+            OpenApiParameter(
+                "after",
+                type=str,
+                description="Only rows created (trips: departing) at or after this date or datetime"
+            ),
+            OpenApiParameter(
+                "before",
+                type=str,
+                description="Only rows created (trips: departing) at or before this date or datetime"
+            ),
+        ],
+        responses={200: bytes}
+    )
+    def get(self, request, kind):
+        if kind not in exports.EXPORTS:
+            raise NotFound(f"Unknown export '{kind}'")
+        params = request.query_params
+        file_format = params.get("output", "csv")
+        if file_format not in exports.FORMATS:
+            raise ValidationError({"output": f"expected one of {', '.join(exports.FORMATS)}"})
+        after = params.get("after")
+        before = params.get("before")
+
+        response = StreamingHttpResponse(
+            exports.stream(
+                kind,
+                file_format,
+                after=_param_to_datetime("after", after) if after else None,
+                before=_param_to_datetime("before", before, end_of_day=True) if before else None
+            ),
+            content_type=exports.FORMATS[file_format]
+        )
+        filename = f"{kind}-{timezone.now():%Y%m%d-%H%M%S}.{file_format}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
@@ -0,0 +1,148 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+def _setting(name: str):
+    defaults = {
+        # users kept per process, least recently used are evicted first
+        "MAX_SIZE": 10000,
+        # seconds a cached user is trusted, bounds staleness across processes
+        "TIMEOUT": 5,
+    }
+    return getattr(settings, "AUTH_USER_CACHE", {}).get(name, defaults[name])
+
+
+class UserCache:
+    """
+    Bounded LRU cache of users by id (as a string, like the token claim)
+    with a time to live.
+
+    Every `get` returns a copy, so a request changing its `request.user`
+    cannot leak the change into other requests. Entries are dropped by
+    the receivers in `user.signals` when a user is saved or deleted, in
+    the process saving it only: other processes keep authenticating a
+    deactivated, demoted or re-passworded user until the entry expires,
+    after AUTH_USER_CACHE["TIMEOUT"] seconds. Views writing the user load
+    it from the database again (see `ManageUserView`).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = OrderedDict()
+
+    def get(self, user_id):
+        user_id = str(user_id)
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._users[user_id]
+                return None
+            self._users.move_to_end(user_id)
+        return copy.copy(user)
+
+    def set(self, user_id, user):
+        max_size = _setting("MAX_SIZE")
+        if max_size <= 0:
+            return
+        user_id = str(user_id)
+        entry = (copy.copy(user), time.monotonic() + _setting("TIMEOUT"))
+        with self._lock:
+            self._users[user_id] = entry
+            self._users.move_to_end(user_id)
+            while len(self._users) > max_size:
+                self._users.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._users.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+user_cache = UserCache()
+
+
+def _user_id(validated_token):
+    try:
+        return validated_token[api_settings.USER_ID_CLAIM]
+    except KeyError as e:
+        raise InvalidToken(
+            _("Token contained no recognizable user identification")
+        ) from e
+
+
+def _check_user(user, validated_token):
+    """The checks `JWTAuthentication.get_user` runs on a freshly loaded user"""
+    if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+        raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+    if api_settings.CHECK_REVOKE_TOKEN:
+        if validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT authentication resolving the user from `user_cache` before the database"""
+
+    def get_user(self, validated_token):
+        user_id = _user_id(validated_token)
+        user = user_cache.get(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user)
+            return user
+
+        _check_user(user, validated_token)
+        return user
+
+
+class AsyncJWTAuthentication(CachedJWTAuthentication):
+    """JWT authentication for plain async views, the user is fetched with the async ORM"""
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = _user_id(validated_token)
+        user = user_cache.get(user_id)
+        if user is None:
+            try:
+                user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(
+                    _("User not found"), code="user_not_found"
+                ) from e
+            _check_user(user, validated_token)
+            user_cache.set(user_id, user)
+            return user
+
+        _check_user(user, validated_token)
+        return user
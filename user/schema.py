@@ -0,0 +1,6 @@
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    """Document `CachedJWTAuthentication` as the bearer scheme of simplejwt"""
+    target_class = "user.authentication.CachedJWTAuthentication"
@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from user.authentication import user_cache
+
+ME_URL = reverse("user:manage_user")
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test",
+            password="testpassword"
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+
+    def test_user_is_loaded_once(self):
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["email"], "test@test.test")
+
+    def test_update_through_me_is_not_served_stale(self):
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {"email": "new@test.test"})
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data["email"], "new@test.test")
+
+    def test_update_through_me_keeps_changes_made_meanwhile(self):
+        self.client.get(ME_URL)
+        # e.g. an admin in another process, whose cache is not cleared here
+        get_user_model().objects.filter(pk=self.user.pk).update(is_staff=True)
+
+        res = self.client.patch(ME_URL, {"email": "new@test.test"})
+
+        self.assertEqual(res.data["is_staff"], True)
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.email, self.user.is_staff), ("new@test.test", True))
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cached_user_is_a_copy(self):
+        self.client.get(ME_URL)
+
+        first = user_cache.get(self.user.id)
+        first.email = "changed@test.test"
+
+        self.assertEqual(user_cache.get(self.user.id).email, "test@test.test")